@@ -0,0 +1,11 @@
+-- 采集水位表：记录各表/连续聚合"已闭合并物化至"的时间点
+-- 由 data-service 在写入并刷新对应窗口后推进（只增不减），下游按表名读取判断是否有新闭合周期
+-- 推进时发送 NOTIFY ingest_watermark，payload: {"table": 表名, "closed_through": ISO 时间}
+
+SET search_path TO market_data, public;
+
+CREATE TABLE IF NOT EXISTS market_data.ingest_watermarks (
+    table_name     TEXT        PRIMARY KEY,   -- candles_1m / candles_5m / metrics_1h / binance_futures_metrics_5m ...
+    closed_through TIMESTAMPTZ NOT NULL,      -- 早于该时间的周期均已闭合并完成刷新（= 当前未闭合周期的起点）
+    updated_at     TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
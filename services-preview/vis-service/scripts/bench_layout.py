@@ -0,0 +1,130 @@
+"""标签布局基准：逐点 Python 循环（bb-zone-strip 旧实现）vs layout.place_labels
+
+用法:
+    cd services-preview/vis-service
+    python scripts/bench_layout.py [--sizes 50,200,500] [--seed 7] [--skip-legacy-above 500]
+
+按 bb-zone-strip 的参数（3 个带宽分区、每区 30 个 x 候选 × 49 个 y 偏移）生成固定随机种子的点，
+其中三分之一集中在 %B 中轨附近（最拥挤的情形）。输出两种实现的耗时、结果是否逐点一致，以及剩余重叠对数。
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from templates.layout import place_labels
+from templates.layout import y_offsets as label_y_offsets
+
+X_BANDS = 3
+
+
+def make_points(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    y = rng.uniform(0.02, 0.98, n)
+    y[: n // 3] = rng.normal(0.5, 0.05, n // 3).clip(0.02, 0.98)
+    size = rng.uniform(0.4, 1.4, n)
+    zone = rng.integers(0, X_BANDS, n)
+    return y, size, zone
+
+
+def zone_bounds(zone: int):
+    start = zone / X_BANDS + 0.02
+    end = (zone + 1) / X_BANDS - 0.02
+    return start, end, (start + end) / 2
+
+
+def legacy(y, size, zone):
+    """旧实现：对每个候选位置逐个检查所有已放置气泡"""
+
+    def check_overlap(x1, y1, r1, placed_list):
+        count = 0
+        for px, py, pr in placed_list:
+            dx = (x1 - px) * 1.5
+            dy = y1 - py
+            if (dx ** 2 + dy ** 2) ** 0.5 < (r1 + pr) * 0.95:
+                count += 1
+        return count
+
+    out = np.zeros((len(y), 2))
+    for z in range(X_BANDS):
+        start, end, center = zone_bounds(z)
+        members = [i for i in np.argsort(-size, kind="stable") if zone[i] == z]
+        x_grid = np.linspace(start + 0.015, end - 0.015, 30)
+        offsets = [0] + [d * s for d in range(1, 25) for s in [-0.01, 0.01]]
+        placed = []
+        for i in members:
+            radius = 0.015 + size[i] * 0.008
+            best_pos, best_score = (center, y[i]), float("inf")
+            for try_x in x_grid:
+                for y_off in offsets:
+                    try_y = y[i] + y_off
+                    if try_y < 0.02 or try_y > 0.98:
+                        continue
+                    overlap = check_overlap(try_x, try_y, radius, placed)
+                    score = overlap * 100 + abs(y_off) * 10 + abs(try_x - center) * 2
+                    if score < best_score:
+                        best_score, best_pos = score, (try_x, try_y)
+                    if overlap == 0:
+                        break
+                if best_score == 0:
+                    break
+            out[i] = best_pos
+            placed.append((*best_pos, radius))
+    return out
+
+
+def vectorized(y, size, zone):
+    out = np.zeros((len(y), 2))
+    for z in range(X_BANDS):
+        start, end, center = zone_bounds(z)
+        members = np.flatnonzero(zone == z)
+        order = np.argsort(-size[members], kind="stable")
+        xs, ys = place_labels(
+            np.full(len(members), center), y[members], 0.015 + size[members] * 0.008,
+            x_grid=np.linspace(start + 0.015, end - 0.015, 30), y_offsets=label_y_offsets(24, 0.01), order=order,
+        )
+        out[members, 0], out[members, 1] = xs, ys
+    return out
+
+
+def overlaps(pos, size) -> int:
+    radius = 0.015 + size * 0.008
+    dx = (pos[:, None, 0] - pos[None, :, 0]) * 1.5
+    dy = pos[:, None, 1] - pos[None, :, 1]
+    hit = np.sqrt(dx ** 2 + dy ** 2) < (radius[:, None] + radius[None, :]) * 0.95
+    return int((hit.sum() - len(pos)) // 2)
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="标签布局基准")
+    parser.add_argument("--sizes", default="50,200,500", help="标签数量（逗号分隔）")
+    parser.add_argument("--seed", type=int, default=7, help="随机种子")
+    parser.add_argument("--skip-legacy-above", type=int, default=500, help="超过该数量不跑旧实现（太慢）")
+    args = parser.parse_args()
+
+    print(f"{'标签数':>6} {'旧实现':>10} {'向量化':>10} {'加速':>8}  一致  剩余重叠")
+    for n in (int(s) for s in args.sizes.split(",")):
+        y, size, zone = make_points(n, args.seed)
+        new, t_new = timed(vectorized, y, size, zone)
+        if n <= args.skip_legacy_above:
+            old, t_old = timed(legacy, y, size, zone)
+            same = "是" if np.array_equal(old, new) else "否"
+            print(f"{n:>6} {t_old * 1000:>8.0f}ms {t_new * 1000:>8.1f}ms {t_old / t_new:>7.0f}x  {same:^4}  {overlaps(new, size)}")
+        else:
+            print(f"{n:>6} {'-':>10} {t_new * 1000:>8.1f}ms {'-':>8}  {'-':^4}  {overlaps(new, size)}")
+
+
+if __name__ == "__main__":
+    main()
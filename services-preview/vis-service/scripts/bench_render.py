@@ -0,0 +1,110 @@
+"""渲染吞吐与尾延迟基准：事件循环内直接渲染（旧路径）vs 常驻渲染进程池
+
+用法:
+    cd services-preview/vis-service
+    python scripts/bench_render.py [--concurrency 8] [--rounds 4] [--workers 4] [--templates line-basic,bb-zone-strip]
+
+只使用模板自带的 sample 参数（带 data 的模板，不访问数据库）。
+输出每种方式的吞吐（张/秒）、单次延迟 p50/p95/p99，以及渲染期间事件循环的最大停顿。
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from templates.registry import register_defaults
+from templates.render_pool import RenderPool
+
+
+def pick_jobs(registry, names):
+    jobs = []
+    for meta in registry.list():
+        if names and meta.template_id not in names:
+            continue
+        params = meta.sample.get("params", {})
+        if params.get("data") or params.get("series"):
+            jobs.append((meta.template_id, params))
+    return jobs
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def watch_loop(stop: asyncio.Event) -> float:
+    """每 10ms 醒来一次，记录事件循环最大停顿"""
+    worst = 0.0
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, time.perf_counter() - t0 - 0.01)
+    return worst
+
+
+async def run(label, render, jobs, concurrency, rounds):
+    latencies = []
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(watch_loop(stop))
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(template_id, params):
+        async with sem:
+            t0 = time.perf_counter()
+            await render(template_id, params)
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(tid, p) for _ in range(rounds) for tid, p in jobs))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    lag = await watcher
+    print(f"{label:<18} {len(latencies):>4} 张  {len(latencies) / elapsed:6.2f} 张/s  "
+          f"p50={percentile(latencies, 0.5) * 1000:7.0f}ms  p95={percentile(latencies, 0.95) * 1000:7.0f}ms  "
+          f"p99={percentile(latencies, 0.99) * 1000:7.0f}ms  loop停顿={lag * 1000:6.0f}ms")
+
+
+async def main_async(args) -> None:
+    registry = register_defaults()
+    names = set(filter(None, args.templates.split(",")))
+    jobs = pick_jobs(registry, names)
+    if not jobs:
+        raise SystemExit("没有可用的模板样例")
+    print(f"模板: {', '.join(tid for tid, _ in jobs)}  并发={args.concurrency}  轮次={args.rounds}")
+
+    async def inline(template_id, params):
+        # 旧实现：每次重建注册表，在事件循环线程内同步渲染
+        register_defaults().get(template_id)[1](params, "png")
+
+    await run("inline (旧)", inline, jobs, args.concurrency, args.rounds)
+
+    pool = RenderPool(workers=args.workers, max_queue=max(args.concurrency, len(jobs)), timeout=120)
+    t0 = time.perf_counter()
+    await asyncio.to_thread(pool.start)
+    await asyncio.gather(*(pool.submit(tid, p) for tid, p in jobs))  # 等待预热完成
+    print(f"进程池启动+预热: {(time.perf_counter() - t0) * 1000:.0f}ms")
+
+    async def pooled(template_id, params):
+        await pool.submit(template_id, params)
+
+    await run(f"pool x{args.workers}", pooled, jobs, args.concurrency, args.rounds)
+    print(pool.info())
+    pool.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="渲染基准")
+    parser.add_argument("--concurrency", type=int, default=8, help="同时进行的渲染数")
+    parser.add_argument("--rounds", type=int, default=4, help="每个模板渲染次数")
+    parser.add_argument("--workers", type=int, default=4, help="渲染进程数")
+    parser.add_argument("--templates", default="", help="只测这些模板（逗号分隔）")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""模板渲染基准与回归检查：每个模板 × 多档数据规模，记录耗时、峰值 RSS、PNG 体积与尺寸，并与基线比较
+
+用法:
+    cd services-preview/vis-service
+    python scripts/bench_templates.py                          # 跑全部模板，与基线比较（基线不存在时只输出结果）
+    python scripts/bench_templates.py --save-baseline          # 跑完写入基线
+    python scripts/bench_templates.py --templates kline-basic,vpvr-ridge --sizes small,large --repeat 5
+
+- 数据全部由固定随机种子合成（vpvr-ridge 直接传 data，不访问数据库），结果只与代码和运行环境有关
+- 每个用例在独立的 spawn 子进程中执行：先渲染一次记为冷启动耗时（含字体查找、首次布局），
+  再渲染 --repeat 次取中位数；峰值 RSS 为子进程 ru_maxrss 减去导入模板模块后的基准值
+- 与基线比较时，耗时 / 内存 / 体积超出容差，或 PNG 像素尺寸变化（dpi、figsize、bbox 变更）记为回归，退出码 1
+- 基线中记录 Python / matplotlib 版本与平台，与当前环境不同时给出提示（耗时不可直接比较）
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from statistics import median
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "bench_templates_baseline.json"
+SIZE_NAMES = ("small", "medium", "large")
+
+
+# ==================== 合成数据 ====================
+def _symbols(n: int) -> List[str]:
+    return [f"C{i:03d}USDT" for i in range(n)]
+
+
+def _walk(rng, n: int, start: float = 100.0, sigma: float = 0.01) -> np.ndarray:
+    return start * np.exp(np.cumsum(rng.normal(0, sigma, n)))
+
+
+def _times(n: int) -> List[str]:
+    stamps = np.datetime64("2024-01-01T00:00") + np.arange(n) * np.timedelta64(1, "h")
+    return [str(t).replace("T", " ") for t in stamps]
+
+
+def fixture_line(rng, n: int) -> Dict:
+    return {"series": _walk(rng, n).round(4).tolist()}
+
+
+def fixture_kline(rng, n: int) -> Dict:
+    close = _walk(rng, n)
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.004, n)) * close
+    return {
+        "open": open_.round(4).tolist(),
+        "high": (np.maximum(open_, close) + spread).round(4).tolist(),
+        "low": (np.minimum(open_, close) - spread).round(4).tolist(),
+        "close": close.round(4).tolist(),
+        "volume": rng.uniform(100, 1000, n).round(2).tolist(),
+        "ma_periods": [7, 25],
+        "timestamps": _times(n),
+        "title": f"bench {n}",
+    }
+
+
+def fixture_macd(rng, n: int) -> Dict:
+    return {"close": _walk(rng, n).round(4).tolist(), "title": f"bench {n}"}
+
+
+def fixture_equity(rng, n: int) -> Dict:
+    return {"equity": _walk(rng, n, 10000, 0.005).round(2).tolist(), "timestamps": _times(n)}
+
+
+def fixture_vpvr_heat(rng, n: int) -> Dict:
+    data = [
+        {"symbol": s, "close": _walk(rng, 200, rng.uniform(1, 1000)).tolist(), "volume": rng.uniform(1, 100, 200).tolist()}
+        for s in _symbols(n)
+    ]
+    return {"bins": 40, "data": data}
+
+
+def fixture_vpvr_zone_strip(rng, n: int) -> Dict:
+    data = []
+    for s in _symbols(n):
+        low = rng.uniform(1, 1000)
+        high = low * rng.uniform(1.02, 1.2)
+        data.append({
+            "symbol": s,
+            "price": low + (high - low) * rng.uniform(-0.3, 1.3),
+            "value_area_low": low,
+            "value_area_high": high,
+            "price_change": rng.normal(0, 0.03),
+            "volume_change": rng.uniform(0.3, 3),
+        })
+    return {"bands": 5, "data": data}
+
+
+def fixture_vpvr_ridge(rng, n: int) -> Dict:
+    data, ohlc = [], []
+    center = 100.0
+    for i in range(n):
+        center *= np.exp(rng.normal(0, 0.02))
+        prices = np.linspace(center * 0.9, center * 1.1, 48)
+        volumes = np.exp(-((prices - center * rng.uniform(0.97, 1.03)) / (center * 0.03)) ** 2) * rng.uniform(50, 100)
+        data.append({"period": f"T-{i}", "prices": prices.tolist(), "volumes": volumes.tolist()})
+        ohlc.append({"period": f"T-{i}", "open": center, "high": center * 1.02, "low": center * 0.98, "close": center * 1.01})
+    return {"data": data, "ohlc_data": ohlc, "bins": 48}
+
+
+def fixture_bb_zone_strip(rng, n: int) -> Dict:
+    data = [
+        {
+            "symbol": s,
+            "percent_b": float(np.clip(rng.normal(0.5, 0.3), -0.2, 1.2)),
+            "bandwidth": rng.uniform(2, 40),
+            "price_change": rng.normal(0, 0.03),
+            "volume": rng.uniform(1e5, 1e8),
+        }
+        for s in _symbols(n)
+    ]
+    return {"bands": 5, "data": data}
+
+
+def fixture_symbol_hours(field: str, low: float, high: float):
+    def build(rng, n: int) -> Dict:
+        data = [
+            {"symbol": s, "hour": h, field: rng.uniform(low, high)}
+            for s in _symbols(n) for h in range(24)
+        ]
+        return {"top_n": n, "data": data}
+    return build
+
+
+def fixture_intraday_volatility(rng, n: int) -> Dict:
+    data = [{"hour": h, "volatility": rng.uniform(0.2, 2.0), "volume": rng.uniform(1e5, 1e7)} for h in range(24)]
+    return {"symbol": "BTCUSDT", "show_volume": True, "data": data}
+
+
+def fixture_long_short(rng, n: int) -> Dict:
+    data = [
+        {"time": t, "top_trader_ratio": a, "global_ratio": b, "taker_ratio": c}
+        for t, a, b, c in zip(_times(n), _walk(rng, n, 1.2), _walk(rng, n, 1.1), _walk(rng, n, 1.0, 0.03))
+    ]
+    return {"symbol": "BTCUSDT", "data": data}
+
+
+def fixture_time_value(field: str, scale: float):
+    def build(rng, n: int) -> Dict:
+        values = np.cumsum(rng.normal(0, scale, n)) if field == "cvd" else _walk(rng, n, scale)
+        data = [{"time": t, field: float(v), "price": float(p)} for t, v, p in zip(_times(n), values, _walk(rng, n, 42000))]
+        return {"symbol": "BTCUSDT", "show_price": True, "data": data}
+    return build
+
+
+# 模板 → (数据构造函数, small/medium/large 对应的规模：K 线根数 / 币种数 / 周期数)
+FIXTURES: Dict[str, Tuple[Callable, Tuple[int, int, int]]] = {
+    "line-basic": (fixture_line, (50, 500, 5000)),
+    "kline-basic": (fixture_kline, (60, 300, 1500)),
+    "macd": (fixture_macd, (100, 1000, 5000)),
+    "equity-drawdown": (fixture_equity, (100, 1000, 5000)),
+    "market-vpvr-heat": (fixture_vpvr_heat, (10, 50, 200)),
+    "vpvr-zone-strip": (fixture_vpvr_zone_strip, (20, 100, 300)),
+    "vpvr-ridge": (fixture_vpvr_ridge, (5, 10, 30)),
+    "bb-zone-strip": (fixture_bb_zone_strip, (20, 100, 300)),
+    "intraday-volume-heatmap": (fixture_symbol_hours("volume", 1e4, 1e7), (10, 30, 100)),
+    "intraday-volatility": (fixture_intraday_volatility, (24, 24, 24)),
+    "taker-ratio-heatmap": (fixture_symbol_hours("taker_buy_ratio", 0.3, 0.7), (10, 30, 100)),
+    "long-short-ratio": (fixture_long_short, (50, 500, 3000)),
+    "cvd-cumulative": (fixture_time_value("cvd", 100), (50, 500, 3000)),
+    "oi-change": (fixture_time_value("oi", 50000), (50, 500, 3000)),
+}
+
+
+# ==================== 子进程执行 ====================
+def _peak_rss_mb() -> float:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # macOS 为字节，Linux 为 KB
+
+
+def _png_size(data: bytes) -> Tuple[int, int]:
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        return 0, 0
+    return struct.unpack(">II", data[16:24])
+
+
+def run_case(template_id: str, size: str, count: int, repeat: int, seed: int) -> Dict:
+    """在子进程中渲染一个用例（模块级函数，供 spawn 进程池调用）"""
+    sys.path.insert(0, str(SRC_DIR))
+    import matplotlib
+    from templates.registry import register_defaults
+
+    render = register_defaults().get(template_id)[1]
+    params = FIXTURES[template_id][0](np.random.default_rng(seed), count)
+    rss_base = _peak_rss_mb()
+
+    t0 = time.perf_counter()
+    png, _ = render(params, "png")
+    cold = time.perf_counter() - t0
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        png, _ = render(params, "png")
+        times.append(time.perf_counter() - t0)
+
+    width, height = _png_size(png)
+    return {
+        "template_id": template_id,
+        "size": size,
+        "count": count,
+        "cold_ms": round(cold * 1000, 1),
+        "median_ms": round(median(times) * 1000, 1),
+        "min_ms": round(min(times) * 1000, 1),
+        "rss_mb": round(_peak_rss_mb() - rss_base, 1),
+        "bytes": len(png),
+        "width": width,
+        "height": height,
+        "matplotlib": matplotlib.__version__,
+    }
+
+
+# ==================== 基线比较 ====================
+def compare(current: List[Dict], baseline: Dict, args) -> List[str]:
+    """返回回归描述列表"""
+    base_cases = {(c["template_id"], c["size"]): c for c in baseline.get("cases", [])}
+    regressions = []
+    print(f"\n与基线比较（{baseline.get('created')}，容差 耗时 {args.time_tolerance:.0%} / 内存 {args.rss_tolerance:.0%} / 体积 {args.bytes_tolerance:.0%}）")
+    for case in current:
+        key = (case["template_id"], case["size"])
+        base = base_cases.get(key)
+        name = f"{key[0]}/{key[1]}"
+        if base is None:
+            print(f"  {name:<36} 基线中没有该用例")
+            continue
+        if base["count"] != case["count"]:
+            print(f"  {name:<36} 数据规模已变更（{base['count']} → {case['count']}），跳过")
+            continue
+        problems = []
+        for field, tol, floor, unit in (
+            ("median_ms", args.time_tolerance, args.min_ms, "ms"),
+            ("cold_ms", args.time_tolerance, args.min_ms, "ms"),
+            ("rss_mb", args.rss_tolerance, args.min_rss_mb, "MB"),
+            ("bytes", args.bytes_tolerance, 0, "B"),
+        ):
+            old, new = base[field], case[field]
+            if new > old * (1 + tol) and new - old > floor:
+                change = f"+{(new / old - 1):.0%}" if old else "新增"
+                problems.append(f"{field} {old}{unit} → {new}{unit} ({change})")
+        if (base["width"], base["height"]) != (case["width"], case["height"]):
+            problems.append(f"尺寸 {base['width']}x{base['height']} → {case['width']}x{case['height']}")
+        if problems:
+            regressions.append(f"{name}: " + "; ".join(problems))
+            print(f"  {name:<36} 回归  " + "; ".join(problems))
+        else:
+            delta = case["median_ms"] / base["median_ms"] - 1 if base["median_ms"] else 0.0
+            print(f"  {name:<36} 通过  耗时 {delta:+.0%}")
+    return regressions
+
+
+def environment() -> Dict:
+    return {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="模板渲染基准与回归检查")
+    parser.add_argument("--templates", default="", help="只测这些模板（逗号分隔，默认全部）")
+    parser.add_argument("--sizes", default=",".join(SIZE_NAMES), help="数据规模档位（small,medium,large）")
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例预热后的渲染次数")
+    parser.add_argument("--seed", type=int, default=7, help="随机种子")
+    parser.add_argument("--jobs", type=int, default=1, help="并行子进程数（>1 会互相干扰耗时）")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果写入基线")
+    parser.add_argument("--output", type=Path, help="另存本次结果（JSON）")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="耗时允许增幅")
+    parser.add_argument("--rss-tolerance", type=float, default=0.25, help="峰值内存允许增幅")
+    parser.add_argument("--bytes-tolerance", type=float, default=0.10, help="PNG 体积允许增幅")
+    parser.add_argument("--min-ms", type=float, default=20.0, help="耗时增量低于该值不算回归（过滤噪声）")
+    parser.add_argument("--min-rss-mb", type=float, default=16.0, help="内存增量低于该值不算回归")
+    args = parser.parse_args()
+
+    names = [t for t in args.templates.split(",") if t] or list(FIXTURES)
+    unknown = [t for t in names if t not in FIXTURES]
+    if unknown:
+        raise SystemExit(f"未知模板: {', '.join(unknown)}（可选: {', '.join(FIXTURES)}）")
+    sizes = [s for s in args.sizes.split(",") if s]
+    if any(s not in SIZE_NAMES for s in sizes):
+        raise SystemExit(f"规模档位只能是 {', '.join(SIZE_NAMES)}")
+
+    cases = [(t, s, FIXTURES[t][1][SIZE_NAMES.index(s)]) for t in names for s in sizes]
+    print(f"{'模板/规模':<36} {'数据量':>6} {'冷启动':>9} {'中位数':>9} {'最快':>9} {'峰值RSS':>9} {'PNG':>9}  尺寸")
+    results, failures = [], []
+    ctx = get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.jobs, mp_context=ctx, max_tasks_per_child=1) as pool:
+        futures = [(t, s, pool.submit(run_case, t, s, n, args.repeat, args.seed)) for t, s, n in cases]
+        for t, s, future in futures:
+            try:
+                r = future.result()
+            except Exception as exc:  # noqa: BLE001
+                failures.append(f"{t}/{s}: {exc}")
+                print(f"{t + '/' + s:<36} 渲染失败: {exc}")
+                continue
+            results.append(r)
+            print(f"{t + '/' + s:<36} {r['count']:>6} {r['cold_ms']:>7.0f}ms {r['median_ms']:>7.0f}ms {r['min_ms']:>7.0f}ms "
+                  f"{r['rss_mb']:>7.1f}MB {r['bytes'] / 1024:>7.0f}KB  {r['width']}x{r['height']}")
+
+    env = {**environment(), "matplotlib": results[0]["matplotlib"] if results else None}
+    report = {"created": time.strftime("%Y-%m-%d %H:%M:%S"), "environment": env, "repeat": args.repeat,
+              "seed": args.seed, "cases": [{k: v for k, v in r.items() if k != "matplotlib"} for r in results]}
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    regressions: List[str] = []
+    if args.save_baseline:
+        if failures:
+            raise SystemExit("存在渲染失败的用例，未写入基线")
+        args.baseline.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n基线已写入 {args.baseline}")
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("environment") != env:
+            print(f"\n⚠️ 运行环境与基线不同，耗时仅供参考：基线 {baseline.get('environment')} / 当前 {env}")
+        if baseline.get("seed") != args.seed:
+            print("⚠️ 随机种子与基线不同，PNG 体积不可直接比较")
+        regressions = compare(results, baseline, args)
+    else:
+        print(f"\n未找到基线 {args.baseline}，使用 --save-baseline 生成")
+
+    if failures or regressions:
+        print(f"\n失败 {len(failures)} 个，回归 {len(regressions)} 个")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
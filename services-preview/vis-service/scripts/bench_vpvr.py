@@ -0,0 +1,89 @@
+"""VPVR 成交量分布基准：逐币种逐 K 线 Python 循环（旧实现）vs build_vpvr_profiles 批量计算
+
+用法:
+    cd services-preview/vis-service
+    python scripts/bench_vpvr.py [--symbols 10,100,500] [--lookback 200] [--bins 48] [--seed 7]
+
+用固定随机种子生成随机游走 K 线，不访问数据库。输出两种实现的耗时，以及 POC / 价值区是否逐个一致。
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "services" / "trading-service" / "src"))
+
+from indicators.batch.vpvr import build_vpvr_profiles
+
+
+def make_candles(symbols: int, lookback: int, seed: int):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (symbols, lookback)), axis=1))
+    high = close * (1 + rng.random((symbols, lookback)) * 0.004)
+    low = close * (1 - rng.random((symbols, lookback)) * 0.004)
+    volume = rng.uniform(0, 1000, (symbols, lookback))
+    return high, low, close, volume
+
+
+def legacy(high, low, close, volume, bins):
+    """旧实现：每个币种逐根 K 线分桶，再逐桶扩展价值区"""
+    out = []
+    for h, lo, c, v in zip(high.tolist(), low.tolist(), close.tolist(), volume.tolist()):
+        price_low, price_high = min(lo), max(h)
+        width = (price_high - price_low) / bins
+        buckets = [0.0] * bins
+        total = 0.0
+        for hi_, lo_, c_, v_ in zip(h, lo, c, v):
+            if v_ <= 0:
+                continue
+            relative = ((hi_ + lo_ + c_) / 3 - price_low) / (price_high - price_low)
+            buckets[min(max(int(relative * bins), 0), bins - 1)] += v_
+            total += v_
+        poc = max(range(bins), key=lambda i: buckets[i])
+        left = right = poc
+        covered = buckets[poc] / total
+        while covered < 0.7 and (left > 0 or right < bins - 1):
+            lv = buckets[left - 1] if left > 0 else -1
+            rv = buckets[right + 1] if right < bins - 1 else -1
+            if lv >= rv and left > 0:
+                left -= 1
+                covered += buckets[left] / total
+            elif right < bins - 1:
+                right += 1
+                covered += buckets[right] / total
+            else:
+                break
+        out.append((poc, price_low + left * width, price_low + (right + 1) * width))
+    return out
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="VPVR 分布基准")
+    parser.add_argument("--symbols", default="10,100,500", help="币种数量（逗号分隔）")
+    parser.add_argument("--lookback", type=int, default=200, help="每个币种的 K 线数")
+    parser.add_argument("--bins", type=int, default=48, help="价格分桶数")
+    parser.add_argument("--seed", type=int, default=7, help="随机种子")
+    args = parser.parse_args()
+
+    print(f"{'币种数':>6} {'旧实现':>10} {'批量':>10} {'加速':>8}  一致")
+    for n in (int(s) for s in args.symbols.split(",")):
+        high, low, close, volume = make_candles(n, args.lookback, args.seed)
+        old, t_old = timed(legacy, high, low, close, volume, args.bins)
+        profiles, t_new = timed(build_vpvr_profiles, high, low, close, volume, args.bins)
+        new = list(zip(profiles["poc"].tolist(), profiles["va_low"].tolist(), profiles["va_high"].tolist()))
+        same = "是" if old == new else "否"
+        print(f"{n:>6} {t_old * 1000:>8.0f}ms {t_new * 1000:>8.1f}ms {t_old / t_new:>7.0f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,19 @@
 """
 REST 路由定义。
 
-当前暴露健康检查、模板列表、示例渲染接口。
+当前暴露健康检查、模板列表、渲染（进程池执行 + 结果缓存）与缓存/进程池统计接口。
 """
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 
+from core.render_cache import get_render_cache, make_key
 from core.settings import Settings, get_settings
 from templates.registry import TemplateMeta, register_defaults
+from templates.render_pool import RenderQueueFull, get_render_pool
 
 router = APIRouter()
 registry = register_defaults()
@@ -23,6 +25,8 @@ class RenderRequest(BaseModel):
     template_id: str = Field(..., description="模板标识，如 line-basic")
     params: Dict[str, Any] = Field(default_factory=dict, description="模板参数")
     output: str = Field("png", description="输出类型：png 或 json")
+    data_version: Optional[str] = Field(None, description="数据版本，留空按参数自动推断")
+    no_cache: bool = Field(False, description="跳过缓存强制重新渲染")
 
 
 def require_token(
@@ -60,18 +64,39 @@ def render(req: RenderRequest, settings: Settings = Depends(require_token)):
     if not meta_and_fn:
         raise HTTPException(status_code=404, detail="模板不存在")
 
-    meta, render_fn = meta_and_fn
+    meta, _ = meta_and_fn
     if req.output not in meta.outputs:
         raise HTTPException(status_code=400, detail=f"输出类型不支持: {req.output}")
 
+    def render_once():
+        # 在常驻渲染进程中执行，不占用本进程的线程池与 pyplot 全局状态
+        return get_render_pool().render(req.template_id, req.params, req.output)
+
     try:
-        content, media_type = render_fn(req.params, req.output)
+        if req.no_cache:
+            result, source = render_once(), "bypass"
+        else:
+            key = make_key(req.template_id, req.output, req.params, req.data_version)
+            result, source = get_render_cache().get_or_render(key, render_once)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except RenderQueueFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    except TimeoutError as exc:
+        raise HTTPException(status_code=504, detail=str(exc)) from exc
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=f"渲染失败: {exc}") from exc
 
+    content, media_type = result
+    headers = {"X-Cache": source}
     if media_type == "application/json":
-        return JSONResponse(content=content, media_type=media_type)
+        return JSONResponse(content=content, media_type=media_type, headers=headers)
+
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+@router.get("/cache")
+def cache_info(_: Settings = Depends(require_token)) -> Dict[str, Any]:
+    """渲染缓存统计。"""
 
-    return Response(content=content, media_type=media_type)
+    return {**get_render_cache().info(), "pool": get_render_pool().info()}
@@ -0,0 +1,190 @@
+"""
+渲染结果缓存。
+
+- 键：模板 ID + 输出类型 + 规范化参数摘要 + 数据版本
+- 数据版本：调用方显式传入优先；参数自带数据时由参数摘要覆盖；
+  按 symbol/interval 从库里取数的模板取当前 K 线序号，K 线收盘后自然换键
+- 两级缓存：内存 LRU（cache_max_items）+ 可选 diskcache 磁盘层（cache_dir），均按 cache_ttl_seconds 过期
+- 相同键的并发渲染只执行一次，其余请求等待同一结果；渲染异常不缓存
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+RenderResult = Tuple[object, str]
+
+INTERVAL_SECONDS = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "2h": 7200, "4h": 14400, "6h": 21600, "12h": 43200,
+    "1d": 86400, "1w": 604800,
+}
+
+
+def normalize_params(params: Dict[str, Any]) -> str:
+    """参数规范化为稳定的 JSON 文本（键排序、紧凑分隔）。"""
+
+    return json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def data_version(params: Dict[str, Any], now: Optional[float] = None) -> str:
+    """推断数据版本：自带数据为 inline，按 symbol 取数为当前 K 线序号，否则为 static。"""
+
+    if params.get("data"):
+        return "inline"
+    if params.get("symbol"):
+        seconds = INTERVAL_SECONDS.get(str(params.get("interval", "1h")), 3600)
+        now = time.time() if now is None else now
+        return f"bar:{int(now // seconds)}"
+    return "static"
+
+
+def make_key(template_id: str, output: str, params: Dict[str, Any], version: Optional[str] = None) -> str:
+    digest = hashlib.sha256(normalize_params(params).encode("utf-8")).hexdigest()[:32]
+    return f"{template_id}:{output}:{digest}:{version or data_version(params)}"
+
+
+class RenderCache:
+    """线程安全的两级渲染缓存（FastAPI 同步路由在线程池中并发调用）。"""
+
+    def __init__(self, ttl_seconds: int = 300, max_items: int = 128, directory: Optional[str] = None) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self._memory: "OrderedDict[str, Tuple[float, RenderResult]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._disk = self._open_disk(directory) if directory else None
+        self.stats = {"hits": 0, "disk_hits": 0, "coalesced": 0, "misses": 0, "errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_items > 0
+
+    @staticmethod
+    def _open_disk(directory: str):
+        try:
+            from diskcache import Cache
+        except ImportError:
+            logger.warning("未安装 diskcache，渲染缓存仅使用内存")
+            return None
+        try:
+            return Cache(directory, size_limit=512 * 1024 * 1024)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("磁盘缓存不可用，仅使用内存: %s", exc)
+            return None
+
+    # ==================== 内存层 ====================
+    def _memory_get(self, key: str, now: float) -> Optional[RenderResult]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return entry[1]
+
+    def _memory_put(self, key: str, expires_at: float, result: RenderResult) -> None:
+        self._memory[key] = (expires_at, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    # ==================== 对外接口 ====================
+    def get_or_render(self, key: str, render: Callable[[], RenderResult]) -> Tuple[RenderResult, str]:
+        """返回 (渲染结果, 来源)；来源为 hit / disk / coalesced / miss / off。"""
+
+        if not self.enabled:
+            return render(), "off"
+
+        now = time.time()
+        with self._lock:
+            cached = self._memory_get(key, now)
+            if cached is not None:
+                self.stats["hits"] += 1
+                return cached, "hit"
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            return future.result(), "coalesced"
+
+        source = "miss"
+        try:
+            result = self._disk_get(key)
+            if result is not None:
+                source = "disk"
+            else:
+                result = render()
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self.stats["errors"] += 1
+            future.set_exception(exc)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._memory_put(key, time.time() + self.ttl_seconds, result)
+            self.stats["disk_hits" if source == "disk" else "misses"] += 1
+        future.set_result(result)
+        if source == "miss":
+            self._disk_set(key, result)
+        return result, source
+
+    def _disk_get(self, key: str) -> Optional[RenderResult]:
+        if self._disk is None:
+            return None
+        try:
+            return self._disk.get(key)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("读取磁盘缓存失败: %s", exc)
+            return None
+
+    def _disk_set(self, key: str, result: RenderResult) -> None:
+        if self._disk is None:
+            return
+        try:
+            self._disk.set(key, result, expire=self.ttl_seconds)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("写入磁盘缓存失败: %s", exc)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "memory": len(self._memory),
+            "inflight": len(self._inflight),
+            "disk": self._disk is not None,
+            "ttl_seconds": self.ttl_seconds,
+            "max_items": self.max_items,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_render_cache() -> RenderCache:
+    """按服务配置构建的全局渲染缓存。"""
+
+    settings = get_settings()
+    return RenderCache(settings.cache_ttl_seconds, settings.cache_max_items, settings.cache_dir or None)
@@ -39,6 +39,7 @@ class Settings(BaseSettings):
 
     cache_ttl_seconds: int = Field(300, description="渲染结果缓存时间，秒")
     cache_max_items: int = Field(128, description="缓存条目上限")
+    cache_dir: Optional[str] = Field(None, description="渲染结果磁盘缓存目录，留空仅用内存缓存")
 
     class Config:
         env_prefix = "VIS_SERVICE_"
@@ -60,4 +61,6 @@ def get_settings() -> Settings:
 
     settings = Settings()
     settings.indicator_sqlite_path = _resolve_sqlite(settings.indicator_sqlite_path)
+    if settings.cache_dir:
+        settings.cache_dir = _resolve_sqlite(settings.cache_dir)
     return settings
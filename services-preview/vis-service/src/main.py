@@ -4,7 +4,7 @@ vis-service 入口。
 提供最小可运行的 FastAPI 应用，包含：
 - /health 健康检查
 - /templates 模板列表
-- /render 渲染示例折线图
+- /render 模板渲染（常驻进程池 + 结果缓存）
 """
 
 import logging
@@ -14,6 +14,7 @@ from fastapi.responses import JSONResponse
 
 from api.routes import router
 from core.settings import get_settings
+from templates.render_pool import get_render_pool
 
 
 def create_app() -> FastAPI:
@@ -22,6 +23,16 @@ def create_app() -> FastAPI:
     app = FastAPI(title="TradeCat Visualization Service", version="0.1.0")
     app.include_router(router, prefix="")
 
+    @app.on_event("startup")
+    def start_render_pool():
+        """启动时拉起并预热渲染进程，首个请求无需等待导入绘图库。"""
+
+        get_render_pool().start()
+
+    @app.on_event("shutdown")
+    def stop_render_pool():
+        get_render_pool().shutdown(wait=False)
+
     @app.middleware("http")
     async def add_settings_header(request: Request, call_next):
         """在响应头中附加服务名，便于排查。"""
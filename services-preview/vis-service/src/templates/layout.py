@@ -0,0 +1,148 @@
+"""
+气泡标签防重叠布局（NumPy 向量化）。
+
+与 bb-zone-strip 原有的贪心算法等价：标签按给定顺序逐个放置，在候选位置中选
+  得分 = 重叠数 * 100 + |y 偏移| * 10 + |x - 锚点 x| * 2
+最小的位置（同分取候选顺序靠前者），结果确定、不依赖随机数。
+
+加速方式：
+- 候选位置按不含重叠项的得分下界排序，分块计算重叠，下界超过当前最优时停止，
+  通常第一块（最靠近目标的位置）即可找到无重叠位置
+- 只与候选区域附近的已放置气泡比较（按包围盒裁剪），单个标签的开销与总数基本无关
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# 超过该数量的标签不再调用 adjustText 迭代微调（耗时随标签数平方增长）
+ADJUST_TEXT_MAX_LABELS = 60
+
+_CHUNK = 64
+
+
+def y_offsets(steps: int = 24, step: float = 0.01) -> np.ndarray:
+    """y 方向偏移序列：0, -1, +1, -2, +2 ...（乘以 step）。"""
+
+    out = [0.0]
+    for d in range(1, steps + 1):
+        out += [-d * step, d * step]
+    return np.asarray(out)
+
+
+def bubble_radius(labels: Sequence[str], font_sizes: Sequence[float], pad: float, axes_height_in: float) -> np.ndarray:
+    """估算 circle 文本框半径（y 轴单位，y 轴范围按 0-1 计）。
+
+    文本宽度按粗体约 0.62 * 字号 / 字符估算；pad 与 bbox boxstyle 的 pad 一致（字号倍数）。
+    """
+
+    sizes = np.asarray(font_sizes, dtype=float)
+    widths = np.fromiter((len(s) for s in labels), dtype=float, count=len(sizes)) * 0.62 * sizes
+    radius_pt = np.maximum(widths, sizes) / 2 + pad * sizes
+    return radius_pt / 72 / axes_height_in
+
+
+def place_labels(
+    x: Sequence[float],
+    y: Sequence[float],
+    radius: Sequence[float],
+    *,
+    x_grid: Optional[Sequence[float]] = None,
+    x_offsets: Optional[Sequence[float]] = None,
+    y_offsets: Sequence[float] = y_offsets(),
+    y_bounds: Tuple[float, float] = (0.02, 0.98),
+    x_bounds: Optional[Tuple[float, float]] = None,
+    x_scale: float = 1.5,
+    gap: float = 0.95,
+    order: Optional[Sequence[int]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    逐个放置圆形标签，返回最终 (x, y)。
+
+    - x, y: 锚点（期望位置），radius: 半径（y 轴单位）
+    - x_grid: 绝对 x 候选位置（所有标签共用）；x_offsets: 相对锚点的 x 偏移；都不传时 x 固定为锚点
+    - y_bounds / x_bounds: 候选位置的取值范围（超出的候选跳过）
+    - x_scale: x 距离换算到 y 单位的系数（坐标轴宽高比）
+    - gap: 圆心距离小于 (r1 + r2) * gap 视为重叠
+    - order: 放置顺序（默认按输入顺序）
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    radius = np.asarray(radius, dtype=float)
+    n = len(x)
+    out_x, out_y = x.copy(), y.copy()
+    if n == 0:
+        return out_x, out_y
+
+    y_off = np.asarray(y_offsets, dtype=float)
+    if x_grid is not None:
+        grid = np.asarray(x_grid, dtype=float)
+    else:
+        grid = np.asarray(x_offsets if x_offsets is not None else [0.0], dtype=float)
+    relative_x = x_grid is None
+    # 候选按 (x 外层, y 内层) 展开，与原算法的遍历顺序一致
+    cand_dx = np.repeat(grid, len(y_off))
+    cand_dy = np.tile(y_off, len(grid))
+    y_penalty = np.abs(cand_dy) * 10
+
+    placed_x = np.empty(n)
+    placed_y = np.empty(n)
+    placed_r = np.empty(n)
+    count = 0
+    r_max = float(radius.max())
+    lo, hi = y_bounds
+
+    for i in (range(n) if order is None else order):
+        cx = x[i] + cand_dx if relative_x else cand_dx
+        cy = y[i] + cand_dy
+        r = radius[i]
+        valid = (cy >= lo) & (cy <= hi)
+        if x_bounds is not None:
+            valid &= (cx >= x_bounds[0]) & (cx <= x_bounds[1])
+        if not valid.any():
+            placed_x[count], placed_y[count], placed_r[count] = x[i], y[i], r
+            count += 1
+            continue
+
+        x_penalty = np.abs(cx - x[i]) * 2
+        base = y_penalty + x_penalty  # 得分下界（无重叠时即得分）
+        idx = np.flatnonzero(valid)
+        idx = idx[np.argsort(base[idx], kind="stable")]
+
+        # 裁剪到候选区域附近的已放置气泡
+        reach = (r + r_max) * gap
+        px, py, pr = placed_x[:count], placed_y[:count], placed_r[:count]
+        near = (
+            (py > cy[idx].min() - reach) & (py < cy[idx].max() + reach)
+            & (px > cx[idx].min() - reach / x_scale) & (px < cx[idx].max() + reach / x_scale)
+        )
+        px, py, pr = px[near], py[near], pr[near]
+
+        best_score, best = np.inf, -1
+        for start in range(0, len(idx), _CHUNK):
+            chunk = idx[start:start + _CHUNK]
+            if base[chunk[0]] > best_score:
+                break
+            if len(px):
+                dx = (cx[chunk, None] - px[None, :]) * x_scale
+                dy = cy[chunk, None] - py[None, :]
+                overlap = ((dx ** 2 + dy ** 2) ** 0.5 < (r + pr[None, :]) * gap).sum(axis=1)
+            else:
+                overlap = 0
+            # 与原算法相同的加法顺序，保证同分判断一致
+            score = overlap * 100 + y_penalty[chunk] + x_penalty[chunk]
+            k = int(np.argmin(score))
+            # 同分时取原始候选顺序靠前者
+            ties = chunk[score == score[k]]
+            cand = int(ties.min())
+            if score[k] < best_score or (score[k] == best_score and cand < best):
+                best_score, best = float(score[k]), cand
+
+        out_x[i], out_y[i] = cx[best], cy[best]
+        placed_x[count], placed_y[count], placed_r[count] = cx[best], cy[best], r
+        count += 1
+
+    return out_x, out_y
@@ -23,6 +23,8 @@ import plotly.graph_objects as go
 import seaborn as sns
 from adjustText import adjust_text
 from pydantic import BaseModel
+from templates.layout import ADJUST_TEXT_MAX_LABELS, bubble_radius, place_labels
+from templates.layout import y_offsets as label_y_offsets
 
 # 使用无界面后端，避免服务器缺乏显示设备时报错
 matplotlib.use("Agg")
@@ -534,21 +536,39 @@ def render_vpvr_zone_strip(params: Dict, output: str) -> Tuple[object, str]:
         df.loc[idx, "x"] = x
     df["x"] = df["x"].clip(0.03, 0.97)
 
+    df["label"] = df["symbol"].astype(str).str.replace("USDT", "")
+    df.loc[df["label"].str.len() > 6, "label"] = df["label"].str[:6] + ".."
+    base_font = 5.0
+    df["font_size"] = base_font * (0.8 + df["size_factor"] * 0.7)
+
+    # 标签多时 adjustText 迭代过慢：用网格候选贪心布局去重叠（大圆优先）
+    use_adjust_text = n <= ADJUST_TEXT_MAX_LABELS
+    if not use_adjust_text:
+        axes_height_in = fig_height * 0.9
+        xs, ys = place_labels(
+            df["x"].to_numpy(), df["y"].to_numpy(),
+            bubble_radius(df["label"], df["font_size"], 0.4, axes_height_in),
+            x_offsets=np.linspace(-0.15, 0.15, 31),
+            y_offsets=label_y_offsets(6, 0.005),
+            y_bounds=(0.0, 1.0),
+            x_bounds=(0.03, 0.97),
+            x_scale=16 * 0.92 / axes_height_in,
+            order=np.argsort(-df["size_factor"].to_numpy(), kind="stable"),
+        )
+        df["x"], df["y"] = xs, ys
+
     # 绘制圆圈 - 参数调大
     # 绘制圆圈 - v13 参数
-    base_font = 5.0
     texts = []
 
     vol_cmap = plt.cm.RdYlGn  # 红到绿：低成交量红，高成交量绿
 
     for _, row in df.iterrows():
-        label = str(row["symbol"]).replace("USDT", "")
-        if len(label) > 6:
-            label = label[:6] + ".."
+        label = row["label"]
 
         # 市值决定大小
         size_factor = row.get("size_factor", 1.0)
-        font_size = base_font * (0.8 + size_factor * 0.7)
+        font_size = row["font_size"]
 
         # 成交量决定填充颜色
         vol_factor = row.get("vol_factor", 0.5)
@@ -579,22 +599,23 @@ def render_vpvr_zone_strip(params: Dict, output: str) -> Tuple[object, str]:
         texts.append(txt)
 
     # adjustText 微调 - 更紧凑，限制迭代
-    try:
-        adjust_text(
-            texts,
-            x=df["x"].tolist(),
-            y=df["y"].tolist(),
-            ax=ax,
-            expand=(1.03, 1.05),  # 更紧凑
-            force_text=(0.2, 0.3),  # 减小推力
-            force_static=(0.05, 0.08),
-            force_pull=(0.02, 0.02),  # 增加回拉力
-            arrowprops=dict(arrowstyle="-", color="#666666", lw=0.3, alpha=0.4),
-            time_lim=1.5,
-            only_move={"text": "xy"},
-        )
-    except Exception as e:
-        logger.warning("adjustText failed: %s", e)
+    if use_adjust_text:
+        try:
+            adjust_text(
+                texts,
+                x=df["x"].tolist(),
+                y=df["y"].tolist(),
+                ax=ax,
+                expand=(1.03, 1.05),  # 更紧凑
+                force_text=(0.2, 0.3),  # 减小推力
+                force_static=(0.05, 0.08),
+                force_pull=(0.02, 0.02),  # 增加回拉力
+                arrowprops=dict(arrowstyle="-", color="#666666", lw=0.3, alpha=0.4),
+                time_lim=1.5,
+                only_move={"text": "xy"},
+            )
+        except Exception as e:
+            logger.warning("adjustText failed: %s", e)
 
     # 样式
     for spine in ["top", "right", "bottom"]:
@@ -1000,78 +1021,32 @@ def render_bb_zone_strip(params: Dict, output: str) -> Tuple[object, str]:
     for i in range(1, x_bands):
         ax.axvline(x=i/x_bands, color="white", linewidth=2, alpha=0.9)
 
-    # 贪心算法防重叠布局 v3
-    def get_radius(size_factor):
-        return 0.015 + size_factor * 0.008  # 缩小气泡
-
-    def check_overlap(x1, y1, r1, placed_list):
-        """检查与所有已放置气泡的重叠数"""
-        count = 0
-        for px, py, pr in placed_list:
-            dx = (x1 - px) * 1.5
-            dy = y1 - py
-            dist = (dx**2 + dy**2) ** 0.5
-            if dist < (r1 + pr) * 0.95:
-                count += 1
-        return count
-
+    # 贪心算法防重叠布局 v3（向量化实现见 layout.place_labels）
     df["x"] = 0.5
-    df["y_final"] = df["y"]
+    df["radius"] = 0.015 + df["size_factor"] * 0.008  # 缩小气泡
 
     for zone in range(x_bands):
-        zone_mask = df["x_zone"] == zone
-        zone_indices = df[zone_mask].index.tolist()
-        if not zone_indices:
+        zone_df = df[df["x_zone"] == zone]
+        if zone_df.empty:
             continue
 
         zone_x_start = zone / x_bands + 0.02
         zone_x_end = (zone + 1) / x_bands - 0.02
+        zone_center = (zone_x_start + zone_x_end) / 2
 
         # 按 size_factor 降序（大气泡优先放）
-        zone_df = df.loc[zone_indices].sort_values("size_factor", ascending=False)
-        zone_placed = []
-
-        # X 方向搜索点（更密集）
-        x_grid = np.linspace(zone_x_start + 0.015, zone_x_end - 0.015, 30)
-        # Y 方向偏移（更大范围）
-        y_offsets = [0] + [d * s for d in range(1, 25) for s in [-0.01, 0.01]]
-
-        for idx in zone_df.index:
-            row = df.loc[idx]
-            target_y = row["y"]
-            radius = get_radius(row["size_factor"])
-
-            best_pos = None
-            best_score = float("inf")
-
-            for try_x in x_grid:
-                for y_off in y_offsets:
-                    try_y = target_y + y_off
-                    if try_y < 0.02 or try_y > 0.98:
-                        continue
-
-                    overlap = check_overlap(try_x, try_y, radius, zone_placed)
-                    score = overlap * 100 + abs(y_off) * 10 + abs(try_x - (zone_x_start + zone_x_end)/2) * 2
-
-                    if score < best_score:
-                        best_score = score
-                        best_pos = (try_x, try_y)
-
-                    if overlap == 0:
-                        break
-                if best_score == 0:
-                    break
-
-            if best_pos:
-                df.loc[idx, "x"] = best_pos[0]
-                df.loc[idx, "y_final"] = best_pos[1]
-                zone_placed.append((best_pos[0], best_pos[1], radius))
-            else:
-                df.loc[idx, "x"] = (zone_x_start + zone_x_end) / 2
-                df.loc[idx, "y_final"] = target_y
-                zone_placed.append(((zone_x_start + zone_x_end) / 2, target_y, radius))
-
-    df["y"] = df["y_final"]
+        ranked = zone_df.sort_values("size_factor", ascending=False)
+        order = zone_df.index.get_indexer(ranked.index)
+
+        xs, ys = place_labels(
+            np.full(len(zone_df), zone_center), zone_df["y"].to_numpy(), zone_df["radius"].to_numpy(),
+            x_grid=np.linspace(zone_x_start + 0.015, zone_x_end - 0.015, 30),  # X 方向搜索点
+            y_offsets=label_y_offsets(24, 0.01),  # Y 方向偏移
+            order=order,
+        )
+        df.loc[zone_df.index, "x"] = xs
+        df.loc[zone_df.index, "y"] = ys
+
     df["x"] = df["x"].clip(0.02, 0.98)
 
     # 绘制气泡
@@ -1112,16 +1087,17 @@ def render_bb_zone_strip(params: Dict, output: str) -> Tuple[object, str]:
         )
         texts.append(txt)
 
-    # adjustText
-    try:
-        adjust_text(
-            texts, x=df["x"].tolist(), y=df["y"].tolist(), ax=ax,
-            expand=(1.02, 1.03), force_text=(0.15, 0.2), force_static=(0.03, 0.05),
-            force_pull=(0.01, 0.01), time_lim=1.2, only_move={"text": "xy"},
-            arrowprops=dict(arrowstyle="-", color="#666666", lw=0.3, alpha=0.3),
-        )
-    except Exception as e:
-        logger.warning("adjustText failed: %s", e)
+    # adjustText 微调（标签多时布局已无重叠，跳过迭代）
+    if len(texts) <= ADJUST_TEXT_MAX_LABELS:
+        try:
+            adjust_text(
+                texts, x=df["x"].tolist(), y=df["y"].tolist(), ax=ax,
+                expand=(1.02, 1.03), force_text=(0.15, 0.2), force_static=(0.03, 0.05),
+                force_pull=(0.01, 0.01), time_lim=1.2, only_move={"text": "xy"},
+                arrowprops=dict(arrowstyle="-", color="#666666", lw=0.3, alpha=0.3),
+            )
+        except Exception as e:
+            logger.warning("adjustText failed: %s", e)
 
     # 样式
     for spine in ax.spines.values():
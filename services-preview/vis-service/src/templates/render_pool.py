@@ -0,0 +1,230 @@
+"""
+常驻渲染进程池。
+
+- 工作进程启动时导入 matplotlib/mplfinance、构建模板注册表并试渲染一次（加载字体缓存），
+  之后的渲染直接复用，不再重复导入与注册
+- 进程使用 spawn 启动，不继承调用方（Bot 事件循环、数据库连接等）的线程与句柄，
+  且不在子进程中重新导入调用方的 __main__（Bot 入口导入时会启动后台线程）
+- 放在 templates 包内：Bot 进程的 sys.path 中还有 trading-service/src，其 core 包会遮蔽本服务的 core
+- 排队有上限（VIS_SERVICE_RENDER_QUEUE），满时立即拒绝；每个任务有独立超时
+- 同步调用 render()（FastAPI 同步路由）与异步调用 submit()（Bot 事件循环）共用同一个池
+- VIS_SERVICE_RENDER_WORKERS=0 时在调用线程内直接渲染（开发调试用）
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import types
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.context import SpawnContext, SpawnProcess
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RENDER_WORKERS = int(os.getenv("VIS_SERVICE_RENDER_WORKERS", "2"))
+RENDER_QUEUE = int(os.getenv("VIS_SERVICE_RENDER_QUEUE", "16"))
+RENDER_TIMEOUT = float(os.getenv("VIS_SERVICE_RENDER_TIMEOUT", "30"))
+# 每个工作进程最多处理的任务数，之后自动替换（回收 matplotlib 累积的内存）
+RENDER_MAX_TASKS = int(os.getenv("VIS_SERVICE_RENDER_MAX_TASKS", "200"))
+
+RenderResult = Tuple[object, str]
+
+# ==================== 工作进程 ====================
+_registry = None
+
+
+def _warm_worker() -> None:
+    """工作进程初始化：导入绘图库、注册模板并试渲染。"""
+
+    global _registry
+    from templates.registry import register_defaults
+
+    logging.getLogger("templates.registry").setLevel(logging.WARNING)
+    _registry = register_defaults()
+    meta_and_fn = _registry.get("line-basic")
+    if meta_and_fn:
+        try:
+            meta_and_fn[1]({"series": [1, 3, 2], "title": "warmup"}, "png")
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("渲染进程预热失败: %s", exc)
+
+
+def _render_job(template_id: str, params: Dict[str, Any], output: str) -> RenderResult:
+    if _registry is None:
+        _warm_worker()
+    meta_and_fn = _registry.get(template_id)
+    if not meta_and_fn:
+        raise ValueError(f"模板不存在: {template_id}")
+    return meta_and_fn[1](params, output)
+
+
+# ==================== 进程池 ====================
+_BARE_MAIN = types.ModuleType("__main__")
+
+
+class _IsolatedSpawnProcess(SpawnProcess):
+    """启动时以空 __main__ 生成准备数据，子进程只导入渲染所需模块。"""
+
+    @staticmethod
+    def _Popen(process_obj):
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = _BARE_MAIN
+        try:
+            return SpawnProcess._Popen(process_obj)
+        finally:
+            sys.modules["__main__"] = main
+
+
+class _IsolatedSpawnContext(SpawnContext):
+    Process = _IsolatedSpawnProcess
+
+
+class RenderQueueFull(RuntimeError):
+    """排队任务已达上限。"""
+
+
+class RenderPool:
+    """渲染进程池（线程安全，可同时被多个线程和事件循环使用）。"""
+
+    def __init__(
+        self,
+        workers: int = RENDER_WORKERS,
+        max_queue: int = RENDER_QUEUE,
+        timeout: float = RENDER_TIMEOUT,
+        max_tasks_per_child: int = RENDER_MAX_TASKS,
+    ) -> None:
+        self.workers = max(0, workers)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child or None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, self.workers) + self.max_queue)
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "timeouts": 0, "restarts": 0}
+
+    # ==================== 生命周期 ====================
+    def start(self) -> "RenderPool":
+        """启动并预热全部工作进程（可重复调用）。"""
+
+        if self.workers <= 0:
+            return self
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=_IsolatedSpawnContext(),
+                    initializer=_warm_worker,
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+                # 每个进程提交一个空任务，促使进程立即拉起并完成初始化
+                for _ in range(self.workers):
+                    self._executor.submit(time.time)
+                logger.info("渲染进程池已启动: workers=%d queue=%d", self.workers, self.max_queue)
+        return self
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = None
+            self.stats["restarts"] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+        logger.warning("渲染进程异常退出，进程池已重建")
+
+    # ==================== 提交 ====================
+    def _submit(self, template_id: str, params: Dict[str, Any], output: str) -> Future:
+        if not self._slots.acquire(blocking=False):
+            self.stats["rejected"] += 1
+            raise RenderQueueFull(f"渲染排队已满（{self.max_queue}）")
+        self.stats["submitted"] += 1
+        executor = None
+        try:
+            if self.workers <= 0:
+                future: Future = Future()
+                try:
+                    future.set_result(_render_job(template_id, params, output))
+                except Exception as exc:  # noqa: BLE001
+                    future.set_exception(exc)
+            else:
+                executor = self.start()._executor
+                try:
+                    future = executor.submit(_render_job, template_id, params, output)
+                except RuntimeError:  # 含 BrokenProcessPool
+                    self._restart(executor)
+                    executor = self.start()._executor
+                    future = executor.submit(_render_job, template_id, params, output)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._on_done(f, executor))
+        return future
+
+    def _on_done(self, future: Future, executor: Optional[ProcessPoolExecutor]) -> None:
+        self._slots.release()
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is None:
+            self.stats["completed"] += 1
+            return
+        self.stats["failed"] += 1
+        if isinstance(exc, BrokenProcessPool) and executor is not None:
+            self._restart(executor)
+
+    def render(self, template_id: str, params: Dict[str, Any], output: str = "png",
+               timeout: Optional[float] = None) -> RenderResult:
+        """同步渲染（阻塞调用线程，不阻塞其他线程）。"""
+
+        future = self._submit(template_id, params, output)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError:
+            self._on_timeout(future)
+            raise TimeoutError(f"渲染超时: {template_id}") from None
+
+    async def submit(self, template_id: str, params: Dict[str, Any], output: str = "png",
+                     timeout: Optional[float] = None) -> RenderResult:
+        """异步渲染：在工作进程中执行，等待期间不占用事件循环。"""
+
+        future = self._submit(template_id, params, output)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self._on_timeout(future)
+            raise TimeoutError(f"渲染超时: {template_id}") from None
+
+    def _on_timeout(self, future: Future) -> None:
+        # 尚未开始的任务直接取消；已在执行的任务无法中断，由进程完成后丢弃结果
+        future.cancel()
+        self.stats["timeouts"] += 1
+
+    def info(self) -> Dict[str, Any]:
+        return {**self.stats, "workers": self.workers, "max_queue": self.max_queue, "running": self._executor is not None}
+
+
+_pool: Optional[RenderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> RenderPool:
+    """全局渲染进程池（首次调用时创建，进程在首次渲染或 start() 时拉起）。"""
+
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = RenderPool()
+    return _pool
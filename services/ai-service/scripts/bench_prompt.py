@@ -0,0 +1,120 @@
+"""提示词构建基准：原样 JSON（旧路径）vs 列式紧凑编码 + token 预算
+
+用法:
+    python scripts/bench_prompt.py [--repeat 50] [--budget 24000] [--interval 1h]
+
+使用固定随机种子生成与 fetch_payload 同结构的负载（7 周期 K 线、期货指标、指标表、快照面板），
+不访问数据库；输出各方案的数据字节数、估算 token 数与构建耗时（列式编码分别统计首次编码与缓存命中）。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.prompt import encoder
+from src.prompt.builder import PROMPT_DIR, build_prompt
+from src.prompt.encoder import encode_payload, estimate_tokens
+
+INTERVAL_MINUTES = {"1m": 1, "5m": 5, "15m": 15, "1h": 60, "4h": 240, "1d": 1440, "1w": 10080}
+PERIODS = list(INTERVAL_MINUTES)
+PROMPT_NAME = "市场全局解析"
+
+
+def make_payload(seed: int = 42, interval: str = "1h") -> dict:
+    rng = random.Random(seed)
+    now = datetime(2025, 1, 6, tzinfo=timezone.utc)
+
+    candles = {}
+    for iv, minutes in INTERVAL_MINUTES.items():
+        price, rows = 95000.0, []
+        for i in range(50):
+            ts = now - timedelta(minutes=minutes * i)
+            o = price
+            c = o * (1 + rng.gauss(0, 0.002))
+            volume = rng.uniform(50, 500) * minutes
+            rows.append({
+                "bucket_ts": str(ts), "open": o, "high": max(o, c) * (1 + rng.random() * 0.001),
+                "low": min(o, c) * (1 - rng.random() * 0.001), "close": c, "volume": volume,
+                "quote_volume": volume * c, "trade_count": rng.randint(1000, 90000) * minutes,
+                "taker_buy_volume": volume * rng.uniform(0.3, 0.7), "taker_buy_quote_volume": volume * c * 0.5,
+            })
+            price = o * (1 + rng.gauss(0, 0.002))
+        candles[iv] = rows
+
+    metrics = [{
+        "create_time": str(now - timedelta(minutes=5 * i)), "symbol": "BTCUSDT",
+        "sum_open_interest": str(round(rng.uniform(80000, 90000), 4)),
+        "sum_open_interest_value": str(round(rng.uniform(8e9, 9e9), 8)),
+        "sum_toptrader_long_short_ratio": str(round(rng.uniform(0.8, 1.6), 8)),
+        "sum_taker_long_short_vol_ratio": str(round(rng.uniform(0.5, 1.5), 8)),
+    } for i in range(50)]
+
+    fields = ["当前价格", "成交额", "信号概述", "强度", "上轨价格", "下轨价格", "中轨价格", "带宽", "百分比b", "斜率"]
+
+    def indicator_row(table: str, period: str) -> dict:
+        row = {"交易对": "BTCUSDT", "周期": period, "数据时间": (now - timedelta(minutes=rng.randint(0, 5))).isoformat()}
+        for f in fields:
+            row[f] = rng.choice(["多头延续", "空头", "震荡"]) if f == "信号概述" else rng.uniform(-100, 100000)
+        row["备注"] = None
+        return row
+
+    tables = [f"指标表{i:02d}.py" for i in range(38)]
+    indicators = {t: [indicator_row(t, p) for p in PERIODS] for t in tables}
+    snapshot = {
+        "basic": {t: {p: indicator_row(t, p) for p in PERIODS} for t in tables[:8]},
+        "futures": {"期货情绪聚合表": {p: indicator_row("期货情绪聚合表", p) for p in PERIODS[1:]}},
+        "advanced": {t: {p: indicator_row(t, p) for p in PERIODS} for t in tables[8:18]},
+    }
+    return {
+        "symbol": "BTCUSDT", "interval": interval, "generated_at": now.isoformat(),
+        "candles": candles, "metrics": metrics, "indicators": indicators, "snapshot": snapshot,
+    }
+
+
+def legacy_build(payload: dict) -> tuple[str, str]:
+    """旧实现：每次读提示词文件 + 原样 json.dumps"""
+    base = (PROMPT_DIR / f"{PROMPT_NAME}.txt").read_text(encoding="utf-8")
+    return base, json.dumps(payload, ensure_ascii=False)
+
+
+def bench(label: str, fn, repeat: int, setup=None) -> None:
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        _, data = fn()
+        times.append(time.perf_counter() - t0)
+    print(f"{label:<24} {len(data.encode('utf-8')):>9,} B  ~{estimate_tokens(data):>8,} tok  "
+          f"p50={statistics.median(times) * 1000:7.2f}ms  max={max(times) * 1000:7.2f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="提示词构建基准")
+    parser.add_argument("--repeat", type=int, default=50, help="重复次数")
+    parser.add_argument("--budget", type=int, default=24000, help="token 预算")
+    parser.add_argument("--interval", default="1h", help="分析周期（决定序列重要度）")
+    args = parser.parse_args()
+
+    payload = make_payload(interval=args.interval)
+    cold = encoder._cache.clear
+    bench("json (旧)", lambda: legacy_build(payload), args.repeat)
+    bench("columnar", lambda: build_prompt(PROMPT_NAME, payload, budget=0), args.repeat, cold)
+    bench(f"columnar budget={args.budget}",
+          lambda: build_prompt(PROMPT_NAME, payload, budget=args.budget), args.repeat, cold)
+    bench("columnar (缓存命中)", lambda: build_prompt(PROMPT_NAME, payload, budget=args.budget), args.repeat)
+
+    _, stats = encode_payload(payload, budget=args.budget)
+    print(f"序列 {stats['series']} 个，降采样 {stats['downsampled']} 次，超出预算: {stats['over_budget']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ AI 分析服务
 """
 from src.bot import (
     AIAnalysisHandler,
+    StreamingReply,
     get_ai_handler,
     register_ai_handlers,
 )
@@ -18,4 +19,5 @@ __all__ = [
     "register_ai_handlers",
     "run_analysis",
     "PromptRegistry",
+    "StreamingReply",
 ]
@@ -7,6 +7,7 @@ from .handler import (
     SELECTING_COIN,
     SELECTING_INTERVAL,
 )
+from .streaming import StreamingReply
 
 __all__ = [
     "AIAnalysisHandler",
@@ -14,4 +15,5 @@ __all__ = [
     "register_ai_handlers",
     "SELECTING_COIN",
     "SELECTING_INTERVAL",
+    "StreamingReply",
 ]
@@ -15,6 +15,7 @@ from telegram.ext import ContextTypes
 
 from src.prompt import PromptRegistry
 from src.pipeline import run_analysis
+from src.bot.streaming import StreamingReply
 from src.config import PROJECT_ROOT
 from libs.common.i18n import normalize_locale, build_i18n_from_env
 
@@ -275,14 +276,22 @@ class AIAnalysisHandler:
     # -------- 分析执行 --------
     async def _run_analysis(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
                             symbol: str, interval: str, prompt: str):
-        """执行 AI 分析"""
+        """执行 AI 分析（API 后端流式输出时逐步刷新按钮所在消息）"""
+        reply = None
         try:
             preferred_lang = None
             if context and hasattr(context, "user_data"):
                 preferred_lang = context.user_data.get("lang_preference")
             if not preferred_lang and update.effective_user and update.effective_user.language_code:
                 preferred_lang = normalize_locale(update.effective_user.language_code)
-            result = await run_analysis(symbol, interval, prompt, lang=preferred_lang)
+            if update.callback_query:
+                reply = StreamingReply(update.callback_query.edit_message_text)
+            result = await run_analysis(
+                symbol, interval, prompt, lang=preferred_lang,
+                on_delta=reply.feed if reply else None,
+            )
+            if reply:
+                await reply.close()
             analysis_text = result.get("analysis", "未生成 AI 分析结果")
 
             # Telegram 消息限制 4096 字符
@@ -307,6 +316,8 @@ class AIAnalysisHandler:
 
         except Exception as exc:
             logger.exception("AI 分析失败")
+            if reply:
+                await reply.close()
             error_msg = f"❌ AI 分析失败：{exc}"
             if update.callback_query:
                 await update.callback_query.edit_message_text(error_msg)
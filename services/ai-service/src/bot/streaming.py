@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""流式回复 - 把 LLM 增量文本节流后逐步编辑到同一条 Telegram 消息
+
+- feed() 只追加缓冲并按需排程，不等待网络，可直接作为 on_delta 回调
+- 同一时刻最多一个编辑请求；两次编辑间隔不少于 interval 秒
+- 遇到 429 按 retry_after 推迟下一次编辑；“内容未变化”等错误忽略
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 流式编辑最小间隔（秒）：Telegram 同一聊天约 1 条/秒
+STREAM_EDIT_INTERVAL = float(os.getenv("LLM_STREAM_EDIT_INTERVAL", "1.5"))
+
+_TG_LIMIT = 4000
+_CURSOR = " ▍"
+
+EditFunc = Callable[[str], Awaitable]
+
+
+class StreamingReply:
+    """节流的渐进式消息编辑器"""
+
+    def __init__(self, edit: EditFunc, *, header: str = "",
+                 interval: float = STREAM_EDIT_INTERVAL, limit: int = _TG_LIMIT) -> None:
+        self._edit = edit
+        self.header = header
+        self.interval = interval
+        self.limit = limit
+        self._parts: List[str] = []
+        self._shown = ""
+        self._next = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._closed = False
+        self.edits = 0
+
+    @property
+    def text(self) -> str:
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def feed(self, delta: str) -> None:
+        """追加增量文本（on_delta 回调）"""
+        if not delta or self._closed:
+            return
+        self._parts.append(delta)
+        self._schedule()
+
+    def _render(self) -> str:
+        body = self.text
+        room = self.limit - len(self.header) - len(_CURSOR)
+        if len(body) > room:
+            body = body[:room - 2] + " …"  # 超长部分在最终结果中分条发送
+        return f"{self.header}{body}{_CURSOR}"
+
+    def _schedule(self) -> None:
+        if self._handle is not None or (self._task is not None and not self._task.done()):
+            return
+        loop = asyncio.get_running_loop()
+        delay = self._next - loop.time()
+        if delay > 0:
+            self._handle = loop.call_later(delay, self._fire)
+        else:
+            self._fire()
+
+    def _fire(self) -> None:
+        self._handle = None
+        if not self._closed:
+            self._task = asyncio.ensure_future(self._push())
+
+    async def _push(self) -> None:
+        loop = asyncio.get_running_loop()
+        text = self._render()
+        self._next = loop.time() + self.interval
+        if text != self._shown:
+            try:
+                await self._edit(text)
+                self._shown = text
+                self.edits += 1
+            except Exception as e:
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after is not None:
+                    delay = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+                    self._next = loop.time() + delay
+                elif "not modified" not in str(e).lower():
+                    logger.debug("流式编辑失败: %s", e)
+        self._task = None
+        if not self._closed and self._render() != self._shown:
+            self._schedule()
+
+    async def close(self) -> str:
+        """停止刷新并等待进行中的编辑完成（之后调用方再写入最终结果），返回累计文本"""
+        self._closed = True
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        task = self._task
+        if task is not None and not task.done():
+            try:
+                await task
+            except Exception:
+                pass
+        return self.text
+
+
+__all__ = ["StreamingReply", "STREAM_EDIT_INTERVAL"]
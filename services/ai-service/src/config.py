@@ -35,3 +35,8 @@ PROMPTS_DIR = SERVICE_ROOT / "prompts"
 
 # LLM 后端: cli (默认) 或 api
 LLM_BACKEND = os.getenv("LLM_BACKEND", "cli")
+
+# 分析结果缓存：同一 (币种, 周期, 提示词版本, 语言, K线) 复用结果，持久化到本地 SQLite
+RESULT_CACHE_ENABLED = os.getenv("AI_RESULT_CACHE", "1").strip().lower() not in ("0", "false", "no")
+RESULT_CACHE_SIZE = int(os.getenv("AI_RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_DB = PROJECT_ROOT / "libs" / "database" / "services" / "ai-service" / "analysis_cache.db"
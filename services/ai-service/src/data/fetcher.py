@@ -4,12 +4,18 @@
 - 从 TimescaleDB 获取 K线数据（50条）
 - 从 SQLite 获取全部指标数据
 - 复用 telegram-service 的 data_provider
+- fetch_payload 并发获取各部分（PG 连接池 + SQLite 连接池），结果按 (币种, 数据版本) 缓存
 """
 from __future__ import annotations
 
 import os
 import sys
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional, Set
 
@@ -43,53 +49,100 @@ def _get_ai_tables_config() -> Optional[Set[str]]:
 AI_TABLES_ENABLED, AI_TABLES_DISABLED = _get_ai_tables_config()
 
 
+# 并发与缓存配置
+PG_POOL_SIZE = int(os.getenv("AI_PG_POOL_SIZE", "4"))
+FETCH_WORKERS = int(os.getenv("AI_FETCH_WORKERS", "8"))
+PAYLOAD_CACHE_SIZE = int(os.getenv("AI_PAYLOAD_CACHE_SIZE", "64"))
+# 同一根 K 线（秒）内视为同一数据版本
+PAYLOAD_BAR_SECONDS = int(os.getenv("AI_PAYLOAD_BAR_SECONDS", "60"))
+
+_CANDLE_COLUMNS = (
+    "bucket_ts, open, high, low, close, volume, quote_volume, "
+    "trade_count, taker_buy_volume, taker_buy_quote_volume"
+)
+
+
+def _conninfo() -> str:
+    return f"host={DB_HOST} port={DB_PORT} user={DB_USER} password={DB_PASS} dbname={DB_NAME}"
+
+
 def _get_pg_conn():
     """获取 PostgreSQL 连接"""
     import psycopg
-    conninfo = f"host={DB_HOST} port={DB_PORT} user={DB_USER} password={DB_PASS} dbname={DB_NAME}"
-    return psycopg.connect(conninfo)
+    return psycopg.connect(_conninfo())
+
+
+_pg_pool = None
+_pg_pool_lock = threading.Lock()
+
+
+def _get_pg_pool():
+    """懒加载连接池（未安装 psycopg_pool 时返回 None）"""
+    global _pg_pool
+    if _pg_pool is None:
+        with _pg_pool_lock:
+            if _pg_pool is None:
+                try:
+                    from psycopg_pool import ConnectionPool
+                except ImportError:
+                    return None
+                _pg_pool = ConnectionPool(
+                    _conninfo(), min_size=1, max_size=PG_POOL_SIZE, timeout=30, open=True,
+                )
+    return _pg_pool
+
+
+@contextmanager
+def _pg_connection():
+    """从连接池借用连接，无连接池时临时建连"""
+    pool = _get_pg_pool()
+    if pool is not None:
+        with pool.connection() as conn:
+            yield conn
+        return
+    conn = _get_pg_conn()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def _parse_candle(row) -> Dict[str, Any]:
+    return {
+        "bucket_ts": str(row[0]) if row[0] else None,
+        "open": float(row[1]) if row[1] else None,
+        "high": float(row[2]) if row[2] else None,
+        "low": float(row[3]) if row[3] else None,
+        "close": float(row[4]) if row[4] else None,
+        "volume": float(row[5]) if row[5] else None,
+        "quote_volume": float(row[6]) if row[6] else None,
+        "trade_count": int(row[7]) if row[7] else None,
+        "taker_buy_volume": float(row[8]) if row[8] else None,
+        "taker_buy_quote_volume": float(row[9]) if row[9] else None,
+    }
 
 
 def fetch_candles(symbol: str, intervals: List[str] = None, limit: int = 50) -> Dict[str, List[Dict[str, Any]]]:
-    """获取多周期 K线数据（全量 50 条）"""
+    """获取多周期 K线数据（全量 50 条），全部周期合并为一条 UNION ALL 查询"""
     intervals = intervals or ALL_INTERVALS
-    candles: Dict[str, List[Dict[str, Any]]] = {}
+    candles: Dict[str, List[Dict[str, Any]]] = {iv: [] for iv in intervals}
 
-    try:
-        conn = _get_pg_conn()
-        cur = conn.cursor()
-
-        for iv in intervals:
-            table = f"market_data.candles_{iv}"
-            sql = f"""
-                SELECT bucket_ts, open, high, low, close, volume, quote_volume, 
-                       trade_count, taker_buy_volume, taker_buy_quote_volume
-                FROM {table} 
-                WHERE symbol = %s 
-                ORDER BY bucket_ts DESC 
-                LIMIT %s
-            """
-            cur.execute(sql, (symbol, limit))
-            rows = cur.fetchall()
-
-            parsed = []
-            for row in rows:
-                parsed.append({
-                    "bucket_ts": str(row[0]) if row[0] else None,
-                    "open": float(row[1]) if row[1] else None,
-                    "high": float(row[2]) if row[2] else None,
-                    "low": float(row[3]) if row[3] else None,
-                    "close": float(row[4]) if row[4] else None,
-                    "volume": float(row[5]) if row[5] else None,
-                    "quote_volume": float(row[6]) if row[6] else None,
-                    "trade_count": int(row[7]) if row[7] else None,
-                    "taker_buy_volume": float(row[8]) if row[8] else None,
-                    "taker_buy_quote_volume": float(row[9]) if row[9] else None,
-                })
-            candles[iv] = parsed
+    parts = []
+    params: List[Any] = []
+    for iv in intervals:
+        parts.append(
+            f"(SELECT %s AS iv, {_CANDLE_COLUMNS} FROM market_data.candles_{iv} "
+            "WHERE symbol = %s ORDER BY bucket_ts DESC LIMIT %s)"
+        )
+        params.extend([iv, symbol, limit])
+    sql = "\nUNION ALL\n".join(parts)
 
-        cur.close()
-        conn.close()
+    try:
+        with _pg_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                for row in cur.fetchall():
+                    candles[row[0]].append(_parse_candle(row[1:]))
     except Exception:
         # 回退到 psql CLI
         candles = _fetch_candles_psql(symbol, intervals, limit)
@@ -117,7 +170,11 @@ def _fetch_candles_psql(symbol: str, intervals: List[str], limit: int) -> Dict[s
         env = os.environ.copy()
         env["PGPASSWORD"] = DB_PASS
 
-        res = subprocess.run(cmd, capture_output=True, text=True, env=env)
+        try:
+            res = subprocess.run(cmd, capture_output=True, text=True, env=env)
+        except OSError:
+            candles[iv] = []
+            continue
         if res.returncode != 0:
             candles[iv] = []
             continue
@@ -148,9 +205,6 @@ def _fetch_candles_psql(symbol: str, intervals: List[str], limit: int) -> Dict[s
 def fetch_metrics(symbol: str, limit: int = 50) -> List[Dict[str, Any]]:
     """获取期货指标数据（全量 50 条）"""
     try:
-        conn = _get_pg_conn()
-        cur = conn.cursor()
-
         sql = """
             SELECT create_time, symbol, sum_open_interest, sum_open_interest_value,
                    sum_toptrader_long_short_ratio, sum_taker_long_short_vol_ratio
@@ -159,8 +213,10 @@ def fetch_metrics(symbol: str, limit: int = 50) -> List[Dict[str, Any]]:
             ORDER BY create_time DESC
             LIMIT %s
         """
-        cur.execute(sql, (symbol, limit))
-        rows = cur.fetchall()
+        with _pg_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (symbol, limit))
+                rows = cur.fetchall()
 
         result = []
         for row in rows:
@@ -172,33 +228,26 @@ def fetch_metrics(symbol: str, limit: int = 50) -> List[Dict[str, Any]]:
                 "sum_toptrader_long_short_ratio": str(row[4]) if row[4] else None,
                 "sum_taker_long_short_vol_ratio": str(row[5]) if row[5] else None,
             })
-
-        cur.close()
-        conn.close()
         return result
     except Exception:
         return []
 
 
-def fetch_indicators_full(symbol: str) -> Dict[str, Any]:
-    """从 SQLite 获取指标数据（每个周期只取最新一条，按配置过滤表）"""
-    db_path = INDICATOR_DB
-    indicators: Dict[str, Any] = {}
-
-    if not db_path.exists():
-        return {"error": f"数据库不存在: {db_path}"}
-
+def _indicator_cache():
+    """telegram-service 的快照缓存：提供数据版本、表结构缓存与只读连接池"""
     try:
-        conn = sqlite3.connect(str(db_path))
+        from cards.data_provider import get_snapshot_cache
+        return get_snapshot_cache(INDICATOR_DB)
     except Exception:
-        try:
-            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
-        except Exception as e:
-            return {"error": str(e)}
+        return None
 
-    cur = conn.cursor()
-    tables = [r[0] for r in cur.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()]
 
+_tables_cache: Dict[str, Any] = {"version": None, "tables": []}
+
+
+def _query_indicators(cur, symbol: str, tables: List[str], columns) -> Dict[str, Any]:
+    """逐表取该币种每个周期的最新一行（按配置过滤表）"""
+    indicators: Dict[str, Any] = {}
     for tbl in tables:
         # 按配置过滤表
         if AI_TABLES_ENABLED and tbl not in AI_TABLES_ENABLED:
@@ -207,7 +256,7 @@ def fetch_indicators_full(symbol: str) -> Dict[str, Any]:
             continue
 
         try:
-            cols = [d[1] for d in cur.execute(f"PRAGMA table_info('{tbl}')").fetchall()]
+            cols = columns(tbl)
             if not cols:
                 continue
 
@@ -232,86 +281,101 @@ def fetch_indicators_full(symbol: str) -> Dict[str, Any]:
                 indicators[tbl] = [dict(zip(cols, r)) for r in rows]
         except Exception as e:
             indicators[tbl] = {"error": str(e)}
-
-    cur.close()
-    conn.close()
     return indicators
 
 
-def fetch_single_token_data(symbol: str) -> Dict[str, Any]:
-    """
-    获取单币种完整数据（复用 telegram-service 的 data_provider）
-    返回与单币查询相同的完整字段
-    """
-    try:
-        from cards.data_provider import get_ranking_provider, format_symbol
-
-        provider = get_ranking_provider()
-        sym = format_symbol(symbol)
-        if not sym:
-            return {}
+def fetch_indicators_full(symbol: str) -> Dict[str, Any]:
+    """从 SQLite 获取指标数据（每个周期只取最新一条，按配置过滤表）
 
-        sym_full = sym if sym.endswith("USDT") else sym + "USDT"
+    表清单与表结构按数据版本缓存，连接复用快照缓存的只读连接池。
+    """
+    db_path = INDICATOR_DB
 
-        # 获取所有面板数据
-        data = {
-            "basic": {},      # 基础面板
-            "futures": {},    # 合约面板
-            "advanced": {},   # 高级面板
-        }
+    if not db_path.exists():
+        return {"error": f"数据库不存在: {db_path}"}
 
-        # 基础面板表
-        basic_tables = [
-            "布林带扫描器", "成交量比率扫描器", "全量支撑阻力扫描器",
-            "主动买卖比扫描器", "KDJ随机指标扫描器", "MACD柱状扫描器",
-            "OBV能量潮扫描器", "谐波信号扫描器"
-        ]
+    cache = _indicator_cache()
+    if cache is not None:
+        with cache.connection() as conn:
+            if conn is None:
+                return {"error": f"数据库不可用: {db_path}"}
+            version = cache.version()
+            if _tables_cache["version"] != version:
+                _tables_cache["tables"] = [r[0] for r in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table'").fetchall()]
+                _tables_cache["version"] = version
+            return _query_indicators(conn.cursor(), symbol, _tables_cache["tables"],
+                                     lambda tbl: cache.columns(conn, tbl))
 
-        # 合约面板表
-        futures_tables = ["期货情绪聚合表"]
+    try:
+        conn = sqlite3.connect(str(db_path))
+    except Exception:
+        try:
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        except Exception as e:
+            return {"error": str(e)}
 
-        # 高级面板表
-        advanced_tables = [
-            "ATR波幅扫描器", "CVD信号排行榜", "G，C点扫描器",
-            "K线形态扫描器", "MFI资金流量扫描器", "VPVR排行生成器",
-            "VWAP离线信号扫描", "流动性扫描器", "超级精准趋势扫描器", "趋势线榜单"
-        ]
+    cur = conn.cursor()
+    try:
+        tables = [r[0] for r in cur.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()]
+        return _query_indicators(
+            cur, symbol, tables,
+            lambda tbl: [d[1] for d in cur.execute(f"PRAGMA table_info('{tbl}')").fetchall()],
+        )
+    finally:
+        cur.close()
+        conn.close()
 
-        periods = ["1m", "5m", "15m", "1h", "4h", "1d", "1w"]
 
-        # 获取基础面板数据
-        for tbl in basic_tables:
-            data["basic"][tbl] = {}
-            for p in periods:
-                try:
-                    row = provider._fetch_single_row(tbl, p, sym_full)
-                    if row:
-                        data["basic"][tbl][p] = row
-                except Exception:
-                    pass
+# 单币快照面板 → (表, 周期)
+_PERIODS = ["1m", "5m", "15m", "1h", "4h", "1d", "1w"]
+SNAPSHOT_PANELS = {
+    # 基础面板
+    "basic": ([
+        "布林带扫描器", "成交量比率扫描器", "全量支撑阻力扫描器",
+        "主动买卖比扫描器", "KDJ随机指标扫描器", "MACD柱状扫描器",
+        "OBV能量潮扫描器", "谐波信号扫描器"
+    ], _PERIODS),
+    # 合约面板（不含 1m）
+    "futures": (["期货情绪聚合表"], _PERIODS[1:]),
+    # 高级面板
+    "advanced": ([
+        "ATR波幅扫描器", "CVD信号排行榜", "G，C点扫描器",
+        "K线形态扫描器", "MFI资金流量扫描器", "VPVR排行生成器",
+        "VWAP离线信号扫描", "流动性扫描器", "超级精准趋势扫描器", "趋势线榜单"
+    ], _PERIODS),
+}
+
+
+def _snapshot_symbol(symbol: str) -> Optional[str]:
+    from cards.data_provider import format_symbol
+    sym = format_symbol(symbol)
+    if not sym:
+        return None
+    return sym if sym.endswith("USDT") else sym + "USDT"
+
+
+def fetch_snapshot_panel(symbol: str, panel: str) -> Dict[str, Dict[str, Any]]:
+    """获取单币快照的一个面板 {表: {周期: 行}}"""
+    try:
+        from cards.data_provider import get_ranking_provider
 
-        # 获取合约面板数据
-        for tbl in futures_tables:
-            data["futures"][tbl] = {}
-            for p in periods[1:]:  # 合约不含 1m
-                try:
-                    row = provider._fetch_single_row(tbl, p, sym_full)
-                    if row:
-                        data["futures"][tbl][p] = row
-                except Exception:
-                    pass
+        provider = get_ranking_provider()
+        sym_full = _snapshot_symbol(symbol)
+        if not sym_full:
+            return {}
 
-        # 获取高级面板数据
-        for tbl in advanced_tables:
-            data["advanced"][tbl] = {}
+        tables, periods = SNAPSHOT_PANELS[panel]
+        data: Dict[str, Dict[str, Any]] = {}
+        for tbl in tables:
+            data[tbl] = {}
             for p in periods:
                 try:
                     row = provider._fetch_single_row(tbl, p, sym_full)
                     if row:
-                        data["advanced"][tbl][p] = row
+                        data[tbl][p] = row
                 except Exception:
                     pass
-
         return data
     except ImportError:
         return {}
@@ -319,33 +383,122 @@ def fetch_single_token_data(symbol: str) -> Dict[str, Any]:
         return {}
 
 
-def fetch_payload(symbol: str, interval: str) -> Dict[str, Any]:
+def fetch_single_token_data(symbol: str) -> Dict[str, Any]:
     """
-    获取完整数据负载（全量版）
-    
-    包含：
-    - K线数据：全部 7 个周期，每个 50 条
-    - 期货指标：50 条
-    - SQLite 指标：全部表的全部数据
-    - 单币快照数据：基础/合约/高级三面板完整字段
+    获取单币种完整数据（复用 telegram-service 的 data_provider）
+    返回与单币查询相同的完整字段
     """
+    try:
+        if not _snapshot_symbol(symbol):
+            return {}
+    except Exception:
+        return {}
+    return {panel: fetch_snapshot_panel(symbol, panel) for panel in SNAPSHOT_PANELS}
+
+
+# ==================== 负载缓存 ====================
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_payload_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_payload_cache_lock = threading.Lock()
+_payload_building: Dict[tuple, threading.Lock] = {}
+payload_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="ai-fetch")
+    return _executor
+
+
+def data_version() -> tuple:
+    """数据版本：指标库 data_version + 当前 K 线时间桶（PG 数据按桶更新）"""
+    cache = _indicator_cache()
+    sqlite_version = cache.version() if cache is not None else None
+    bar = int(time.time() // PAYLOAD_BAR_SECONDS) if PAYLOAD_BAR_SECONDS > 0 else time.time()
+    return sqlite_version, bar
+
+
+def _with_interval(cached: Dict[str, Any], interval: str) -> Dict[str, Any]:
+    """缓存的负载与周期无关，返回时补上 interval（保持原字段顺序）"""
+    return {"symbol": cached["symbol"], "interval": interval,
+            **{k: v for k, v in cached.items() if k != "symbol"}}
+
+
+def _build_payload(symbol: str) -> Dict[str, Any]:
+    """并发获取各部分：K线（一次往返）、期货指标、SQLite 指标、三个快照面板"""
+    executor = _get_executor()
+    candles = executor.submit(fetch_candles, symbol, ALL_INTERVALS, 50)
+    metrics = executor.submit(fetch_metrics, symbol, 50)
+    indicators = executor.submit(fetch_indicators_full, symbol)
+    panels = {panel: executor.submit(fetch_snapshot_panel, symbol, panel) for panel in SNAPSHOT_PANELS}
+    try:
+        snapshot = {panel: fut.result() for panel, fut in panels.items()} if _snapshot_symbol(symbol) else {}
+    except Exception:
+        snapshot = {}
     return {
         "symbol": symbol,
-        "interval": interval,
         "generated_at": datetime.now(timezone.utc).isoformat(),
         # K线数据（全量）
-        "candles": fetch_candles(symbol, ALL_INTERVALS, limit=50),
+        "candles": candles.result(),
         # 期货指标（全量）
-        "metrics": fetch_metrics(symbol, limit=50),
+        "metrics": metrics.result(),
         # SQLite 指标（全量）
-        "indicators": fetch_indicators_full(symbol),
+        "indicators": indicators.result(),
         # 单币快照数据（复用 telegram-service）
-        "snapshot": fetch_single_token_data(symbol),
+        "snapshot": snapshot,
     }
 
 
+def fetch_payload(symbol: str, interval: str) -> Dict[str, Any]:
+    """
+    获取完整数据负载（全量版）
+    
+    包含：
+    - K线数据：全部 7 个周期，每个 50 条
+    - 期货指标：50 条
+    - SQLite 指标：全部表的全部数据
+    - 单币快照数据：基础/合约/高级三面板完整字段
+
+    同一 (币种, 数据版本) 只获取一次；返回的嵌套数据为共享对象，调用方只读。
+    """
+    key = (symbol, data_version())
+    with _payload_cache_lock:
+        cached = _payload_cache.get(key)
+        if cached is not None:
+            _payload_cache.move_to_end(key)
+            payload_cache_stats["hits"] += 1
+            return _with_interval(cached, interval)
+        build_lock = _payload_building.setdefault(key, threading.Lock())
+
+    # 同一 key 的并发请求只获取一次
+    with build_lock:
+        with _payload_cache_lock:
+            cached = _payload_cache.get(key)
+        if cached is None:
+            payload_cache_stats["misses"] += 1
+            try:
+                cached = _build_payload(symbol)
+                with _payload_cache_lock:
+                    if PAYLOAD_CACHE_SIZE > 0:
+                        _payload_cache[key] = cached
+                        while len(_payload_cache) > PAYLOAD_CACHE_SIZE:
+                            _payload_cache.popitem(last=False)
+            finally:
+                with _payload_cache_lock:
+                    _payload_building.pop(key, None)
+        else:
+            payload_cache_stats["hits"] += 1
+    return _with_interval(cached, interval)
+
+
 __all__ = [
     "fetch_payload",
+    "data_version",
+    "fetch_snapshot_panel",
     "fetch_candles",
     "fetch_metrics",
     "fetch_indicators_full",
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 """LLM 客户端模块"""
 from .client import call_llm, call_gemini
+from .async_client import AsyncLLMClient, LLMError, get_llm_client
 
-__all__ = ["call_llm", "call_gemini"]
+__all__ = ["call_llm", "call_gemini", "AsyncLLMClient", "LLMError", "get_llm_client"]
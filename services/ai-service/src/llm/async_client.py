@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""异步 LLM 网关客户端（OpenAI 兼容 /v1/chat/completions）
+
+- aiohttp 长连接会话，请求全程 await，不阻塞调用方事件循环
+- FairLimiter 限制同时进行的请求数，超出的按到达顺序排队（先到先得）
+- 总超时 + 分块空闲超时；调用方取消任务时连接随之关闭
+- stream=True 时逐块解析 SSE，把增量文本交给 on_delta 回调
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from src.config import PROJECT_ROOT
+
+logger = logging.getLogger(__name__)
+
+# 同时进行的 LLM 请求数（含 CLI 后端），超出的排队
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# 单次请求总超时（秒，不含排队）；流式分块之间的最长间隔（秒）
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "300"))
+LLM_IDLE_TIMEOUT = float(os.getenv("LLM_IDLE_TIMEOUT", "60"))
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "8192"))
+
+DeltaCallback = Callable[[str], Any]
+
+
+class LLMError(Exception):
+    """网关返回错误"""
+
+
+class FairLimiter:
+    """FIFO 并发闸门：名额释放时直接交给最早的等待者，排队中取消会让出位置"""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(1, limit)
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for fut in self._waiters if not fut.done())
+
+    async def acquire(self) -> None:
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # 名额已交到手上才被取消：转交下一位
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(fut)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # 名额直接转交，active 不变
+                return
+        self.active -= 1
+
+    async def __aenter__(self) -> "FairLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+
+class AsyncLLMClient:
+    """异步 LLM 客户端（会话与闸门绑定到首次使用的事件循环，换循环时重建）"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        *,
+        concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT,
+        idle_timeout: float = LLM_IDLE_TIMEOUT,
+        max_tokens: int = LLM_MAX_TOKENS,
+    ) -> None:
+        self._base_url = base_url
+        self._api_key = api_key
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_tokens = max_tokens
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._limiter: Optional[FairLimiter] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.stats = {"requests": 0, "streamed": 0, "errors": 0, "timeouts": 0, "cancelled": 0}
+
+    # ==================== 配置与会话 ====================
+    def _credentials(self) -> Tuple[str, str]:
+        if self._api_key is None and not os.getenv("EXTERNAL_API_KEY"):
+            try:
+                from dotenv import load_dotenv
+                load_dotenv(PROJECT_ROOT / ".env")
+            except ImportError:
+                pass
+        base_url = (self._base_url or os.getenv("LLM_API_BASE_URL", "http://localhost:8000")).rstrip("/")
+        api_key = self._api_key or os.getenv("EXTERNAL_API_KEY")
+        if not api_key:
+            raise LLMError("未找到 EXTERNAL_API_KEY 配置")
+        return base_url, api_key
+
+    @property
+    def limiter(self) -> FairLimiter:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._limiter = FairLimiter(self.concurrency)
+            self._session = None  # 旧会话属于其他循环，不复用
+        return self._limiter
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=max(self.concurrency, 1) * 2, keepalive_timeout=60),
+                trust_env=True,  # 读取 HTTP(S)_PROXY
+            )
+        return self._session
+
+    # ==================== 请求 ====================
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        *,
+        temperature: float = 0.5,
+        max_tokens: Optional[int] = None,
+        on_delta: Optional[DeltaCallback] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """排队 → 请求 → 返回 (content, response)
+
+        on_delta 收到每段增量文本（同步或异步函数均可，应尽快返回）；
+        超时抛 TimeoutError，取消会中断请求并向上传播。
+        """
+        async with self.limiter:
+            self.stats["requests"] += 1
+            try:
+                async with asyncio.timeout(timeout or self.timeout):
+                    return await self._request(messages, model, temperature, max_tokens or self.max_tokens, on_delta)
+            except TimeoutError:
+                self.stats["timeouts"] += 1
+                raise
+            except asyncio.CancelledError:
+                self.stats["cancelled"] += 1
+                raise
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+
+    async def _request(self, messages, model, temperature, max_tokens, on_delta) -> Tuple[str, Dict[str, Any]]:
+        base_url, api_key = self._credentials()
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": on_delta is not None,
+        }
+        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        client_timeout = aiohttp.ClientTimeout(total=None, sock_read=self.idle_timeout)
+        async with self._get_session().post(
+            f"{base_url}/v1/chat/completions", json=payload, headers=headers, timeout=client_timeout
+        ) as resp:
+            if resp.status >= 400:
+                body = await resp.text()
+                raise LLMError(f"HTTP {resp.status}: {body[:500]}")
+            if resp.content_type == "text/event-stream":
+                self.stats["streamed"] += 1
+                return await self._read_stream(resp, on_delta)
+            data = await resp.json(content_type=None)
+
+        content = (data.get("choices") or [{}])[0].get("message", {}).get("content") or ""
+        if content and on_delta is not None:
+            await _emit(on_delta, content)  # 网关不支持流式时一次性交付
+        return content, data
+
+    async def _read_stream(self, resp: aiohttp.ClientResponse, on_delta: Optional[DeltaCallback]):
+        parts: List[str] = []
+        meta: Dict[str, Any] = {}
+        finish_reason = None
+        async for raw in resp.content:
+            line = raw.decode("utf-8", "replace").strip()
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                continue
+            if "error" in chunk:
+                raise LLMError(json.dumps(chunk["error"], ensure_ascii=False))
+            for key in ("id", "model", "usage"):
+                if chunk.get(key):
+                    meta[key] = chunk[key]
+            choice = (chunk.get("choices") or [{}])[0]
+            finish_reason = choice.get("finish_reason") or finish_reason
+            delta = (choice.get("delta") or {}).get("content")
+            if delta:
+                parts.append(delta)
+                if on_delta is not None:
+                    await _emit(on_delta, delta)
+
+        content = "".join(parts)
+        response = {
+            **meta,
+            "object": "chat.completion",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+            }],
+        }
+        return content, response
+
+    def get_stats(self) -> Dict[str, int]:
+        limiter = self._limiter
+        return {
+            **self.stats,
+            "active": limiter.active if limiter else 0,
+            "waiting": limiter.waiting if limiter else 0,
+        }
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+async def _emit(on_delta: DeltaCallback, text: str) -> None:
+    """调用增量回调；回调异常只记录，不中断请求"""
+    try:
+        result = on_delta(text)
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        logger.debug("增量回调异常: %s", e)
+
+
+_client: Optional[AsyncLLMClient] = None
+
+
+def get_llm_client() -> AsyncLLMClient:
+    """全局异步客户端（所有分析共享并发闸门）"""
+    global _client
+    if _client is None:
+        _client = AsyncLLMClient()
+    return _client
+
+
+__all__ = ["AsyncLLMClient", "FairLimiter", "LLMError", "get_llm_client"]
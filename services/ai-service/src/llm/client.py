@@ -2,17 +2,20 @@
 """LLM 客户端封装
 
 支持两种调用方式：
-1. API 网关（默认）- 通过 LLM客户端 调用
-2. Gemini CLI - 本地命令行调用
+1. API 网关 - 异步流式调用（见 async_client）
+2. Gemini CLI - 本地命令行调用（默认）
+
+两种后端共用同一个并发闸门，超出 LLM_MAX_CONCURRENCY 的调用按到达顺序排队。
 """
 from __future__ import annotations
 
 import json
 import os
 import sys
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Optional
 
-from src.config import PROJECT_ROOT, HTTP_PROXY
+from src.config import PROJECT_ROOT
+from src.llm.async_client import LLM_TIMEOUT, DeltaCallback, get_llm_client
 
 # 导入工具
 sys.path.insert(0, str(PROJECT_ROOT)) if str(PROJECT_ROOT) not in sys.path else None
@@ -25,6 +28,7 @@ async def call_llm(
     messages: List[Dict[str, str]],
     model: str = "gemini-2.5-flash",
     backend: str = None,
+    on_delta: Optional[DeltaCallback] = None,
 ) -> Tuple[str, str]:
     """
     调用 LLM
@@ -33,40 +37,32 @@ async def call_llm(
         messages: OpenAI 兼容的消息列表
         model: 模型名称
         backend: 后端选择 (api/cli)，默认读取环境变量 LLM_BACKEND
-        
+        on_delta: 增量文本回调（仅 API 后端流式输出；CLI 后端不回调）
+
     Returns:
         (content, raw_response): 回复内容和原始响应
     """
     backend = backend or LLM_BACKEND
 
     if backend == "cli":
-        return await _call_gemini_cli(messages, model)
+        async with get_llm_client().limiter:
+            return await _call_gemini_cli(messages, model)
     else:
-        return await _call_api(messages, model)
+        return await _call_api(messages, model, on_delta)
 
 
-async def _call_api(messages: List[Dict[str, str]], model: str) -> Tuple[str, str]:
-    """通过 API 网关调用"""
+async def _call_api(
+    messages: List[Dict[str, str]], model: str, on_delta: Optional[DeltaCallback] = None
+) -> Tuple[str, str]:
+    """通过 API 网关调用（异步，取消会向上传播）"""
     try:
-        from libs.common.utils.LLM客户端 import 创建LLM客户端
-
-        if HTTP_PROXY:
-            os.environ["HTTP_PROXY"] = HTTP_PROXY
-            os.environ["HTTPS_PROXY"] = HTTP_PROXY
-
-        client = 创建LLM客户端()
-        resp = client.聊天(
-            messages=messages,
-            model=model,
-            temperature=0.5,
-            max_tokens=1000000,
-            stream=False,
-            req_timeout=600,
-        )
-        content = resp.get("choices", [{}])[0].get("message", {}).get("content")
+        content, resp = await get_llm_client().chat(messages, model, temperature=0.5, on_delta=on_delta)
         if not content:
             content = json.dumps(resp, ensure_ascii=False)
         return content, json.dumps(resp, ensure_ascii=False)
+    except TimeoutError:
+        error = f"请求超时（{LLM_TIMEOUT:.0f}s）"
+        return f"[API_ERROR] {error}", json.dumps({"error": error}, ensure_ascii=False)
     except Exception as e:
         return f"[API_ERROR] {e}", json.dumps({"error": str(e)}, ensure_ascii=False)
 
@@ -100,7 +96,7 @@ async def _call_gemini_cli(messages: List[Dict[str, str]], model: str) -> Tuple[
                 system_prompt=system_prompt,
                 user_content=user_content,
                 model=model,
-                timeout=300,
+                timeout=int(LLM_TIMEOUT),
                 use_proxy=True,  # 使用代理
             )
         )
@@ -120,7 +116,8 @@ async def _call_gemini_cli(messages: List[Dict[str, str]], model: str) -> Tuple[
 async def call_gemini(prompt: str, model: str = "gemini-2.5-flash") -> str:
     """简单调用 Gemini（使用 CLI）"""
     messages = [{"role": "user", "content": prompt}]
-    content, _ = await _call_gemini_cli(messages, model)
+    async with get_llm_client().limiter:
+        content, _ = await _call_gemini_cli(messages, model)
     return content
 
 
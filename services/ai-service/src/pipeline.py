@@ -2,31 +2,60 @@
 """
 AI 分析管道
 - 获取全量数据 -> 构建提示词 -> 调用 LLM -> 保存结果
-- 不做数据精简，完整喂给 LLM
+- 同一 (币种, 周期, 提示词版本, 语言) 在同一根 K 线内只调用一次 LLM（见 utils.result_cache）
 """
 from __future__ import annotations
 
 import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from src.data import fetch_payload
-from src.prompt import build_prompt
+from src.config import RESULT_CACHE_ENABLED
+from src.prompt import build_prompt, prompt_version
 from src.llm import call_llm
-from src.utils.run_recorder import RunRecorder
+from src.llm.async_client import DeltaCallback
+from src.utils.result_cache import get_result_cache
+from src.utils.run_recorder import get_default_recorder
 
 
-async def run_analysis(symbol: str, interval: str, prompt_name: str, lang: str | None = None) -> Dict[str, Any]:
+async def run_analysis(
+    symbol: str,
+    interval: str,
+    prompt_name: str,
+    lang: str | None = None,
+    on_delta: Optional[DeltaCallback] = None,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
     """
     执行 AI 分析
-    
+
     Args:
         symbol: 交易对，如 BTCUSDT
         interval: 时间周期，如 1h
         prompt_name: 提示词名称
-        
+        on_delta: LLM 流式增量回调（用于逐步刷新消息）
+        use_cache: 是否复用同一根 K 线内的结果 / 合并并发的相同请求
+
     Returns:
-        分析结果字典
+        分析结果字典（命中缓存时 cached=True，payload 为 None）
     """
+    if not (use_cache and RESULT_CACHE_ENABLED):
+        return await _analyze(symbol, interval, prompt_name, lang, on_delta)
+    version = await asyncio.to_thread(prompt_version, prompt_name, lang)
+    return await get_result_cache().run(
+        symbol, interval, prompt_name, version, lang,
+        lambda emit: _analyze(symbol, interval, prompt_name, lang, emit),
+        on_delta,
+    )
+
+
+async def _analyze(
+    symbol: str,
+    interval: str,
+    prompt_name: str,
+    lang: Optional[str],
+    on_delta: Optional[DeltaCallback],
+) -> Dict[str, Any]:
     # 1. 获取全量数据
     payload = await asyncio.to_thread(fetch_payload, symbol, interval)
 
@@ -47,20 +76,15 @@ async def run_analysis(symbol: str, interval: str, prompt_name: str, lang: str |
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_content},
     ]
-    analysis_text, raw_response = await call_llm(messages)
+    analysis_text, raw_response = await call_llm(messages, on_delta=on_delta)
 
-    # 4. 保存结果
-    recorder = RunRecorder()
-    await asyncio.to_thread(
-        recorder.save_run,
-        symbol,
-        interval,
-        prompt_name,
-        payload,
-        system_prompt,
-        analysis_text,
-        messages,
-    )
+    # 4. 保存结果（归档模式只入队，不等待写盘）
+    recorder = get_default_recorder()
+    record_args = (symbol, interval, prompt_name, payload, system_prompt, analysis_text, messages)
+    if recorder.mode == "dir":
+        await asyncio.to_thread(recorder.save_run, *record_args)
+    else:
+        recorder.save_run(*record_args)
 
     return {
         "analysis": analysis_text,
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 """提示词管理模块"""
 from .registry import PromptRegistry
-from .builder import build_prompt
+from .builder import build_prompt, prompt_version
 
-__all__ = ["PromptRegistry", "build_prompt"]
+__all__ = ["PromptRegistry", "build_prompt", "prompt_version"]
@@ -2,25 +2,42 @@
 """提示词构建器"""
 from __future__ import annotations
 
+import hashlib
 import json
+import logging
+import os
+import threading
 from pathlib import Path
 from typing import Dict, Any, Tuple, Optional
 
+from .encoder import PRECISION, TOKEN_BUDGET, encode_payload
+
+logger = logging.getLogger(__name__)
+
 # 提示词目录（ai-service/prompts/）
 PROMPT_DIR = Path(__file__).resolve().parents[2] / "prompts"
 
+# 数据编码：columnar（列式紧凑 + token 预算）/ json（原样全量 JSON）
+PROMPT_FORMAT = os.getenv("AI_PROMPT_FORMAT", "columnar").strip().lower()
 
-def build_prompt(prompt_name: str, payload: Dict[str, Any], lang: Optional[str] = None) -> Tuple[str, str]:
-    """
-    构建提示词
-    
-    Args:
-        prompt_name: 提示词名称（不含 .txt 后缀）
-        payload: 数据负载
-        
-    Returns:
-        (system_prompt, data_json): 系统提示词和数据 JSON
-    """
+# 提示词模板缓存 {路径: (mtime_ns, 内容, 版本摘要)}，文件修改后自动重新读取
+_template_cache: Dict[Path, Tuple[int, str, str]] = {}
+_template_lock = threading.Lock()
+
+
+def _load_template(path: Path) -> Tuple[str, str]:
+    mtime = path.stat().st_mtime_ns
+    cached = _template_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+    text = path.read_text(encoding="utf-8")
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+    with _template_lock:
+        _template_cache[path] = (mtime, text, digest)
+    return text, digest
+
+
+def _resolve_prompt(prompt_name: str, lang: Optional[str]) -> Path:
     candidates = []
     if lang:
         candidates.append(PROMPT_DIR / lang / f"{prompt_name}.txt")
@@ -32,10 +49,40 @@ def build_prompt(prompt_name: str, payload: Dict[str, Any], lang: Optional[str]
     prompt_path = next((p for p in candidates if p.is_file()), None)
     if not prompt_path:
         raise FileNotFoundError(f"提示词不存在: {candidates[0] if candidates else prompt_name}")
+    return prompt_path
 
-    base = prompt_path.read_text(encoding="utf-8")
-    data_json = json.dumps(payload, ensure_ascii=False)
+
+def prompt_version(prompt_name: str, lang: Optional[str] = None) -> str:
+    """提示词版本（内容摘要 + 数据编码参数），提示词文件或编码方式变化时改变"""
+    _, digest = _load_template(_resolve_prompt(prompt_name, lang))
+    return f"{digest}:{PROMPT_FORMAT}:{TOKEN_BUDGET}:{PRECISION}"
+
+
+def build_prompt(
+    prompt_name: str,
+    payload: Dict[str, Any],
+    lang: Optional[str] = None,
+    budget: Optional[int] = None,
+) -> Tuple[str, str]:
+    """
+    构建提示词
+
+    Args:
+        prompt_name: 提示词名称（不含 .txt 后缀）
+        payload: 数据负载
+        budget: 数据部分的 token 预算（默认 AI_PROMPT_TOKEN_BUDGET）
+
+    Returns:
+        (system_prompt, data_json): 系统提示词和数据 JSON
+    """
+    base, _ = _load_template(_resolve_prompt(prompt_name, lang))
+    if PROMPT_FORMAT == "json":
+        data_json = json.dumps(payload, ensure_ascii=False)
+    else:
+        data_json, stats = encode_payload(payload, budget=budget)
+        if stats["over_budget"]:
+            logger.warning("数据降采样后仍超出 token 预算: %s", stats)
     return base, data_json
 
 
-__all__ = ["build_prompt"]
+__all__ = ["build_prompt", "prompt_version"]
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""数据负载的列式紧凑编码
+
+- 行字典列表 → {"cols", "rows"}；全空列删除，各行相同的列提到 "const"
+- 数值统一为有效数字 AI_PROMPT_PRECISION 位（数字字符串同样转换）
+- 时间列改为 t0 + 分钟偏移；等间隔时只保留 t0 与 step_min
+- 超出 token 预算时，按重要度从低到高逐个降采样序列：
+  K 线两两合并为更大周期的 K 线，其他序列隔行抽取（始终保留最新一行）
+- 编码结果按 (币种, 负载生成时间, 周期, 预算, 精度) 缓存：同一数据版本的重复分析不再编码
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+# token 预算（0=不限制）与数值有效位数
+TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "24000"))
+PRECISION = int(os.getenv("AI_PROMPT_PRECISION", "6"))
+# 降采样后序列至少保留的行数
+MIN_ROWS = 6
+
+FORMAT_NOTE = (
+    "表格式: cols=列名, rows=各行取值(与cols对应, 新→旧); const=所有行相同的字段; "
+    "t0=首行时间, step_min=相邻行间隔分钟(负数表示往前), dt_min=相对t0的分钟偏移; "
+    "downsampled=每行合并的原始行数(K线为合并后的更大周期)"
+)
+
+_TIME_COLS = ("bucket_ts", "create_time", "数据时间", "timestamp", "time")
+_OHLC = ("open", "high", "low", "close")
+_SUM_COLS = ("volume", "quote_volume", "trade_count", "taker_buy_volume", "taker_buy_quote_volume")
+_NUM_RE = re.compile(r"[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?")
+_INTERVALS = ["1m", "5m", "15m", "1h", "4h", "1d", "1w"]
+
+_CACHE_SIZE = 32
+_cache: "OrderedDict[tuple, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：ASCII 约 3.5 字符/token，其他字符（中文等）约 1 字符/token"""
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return int(ascii_chars / 3.5 + (len(text) - ascii_chars)) + 1
+
+
+def _num(value: Any, precision: int = PRECISION) -> Any:
+    kind = type(value)
+    if kind is float or kind is Decimal:
+        value = float(value)
+        if not math.isfinite(value):
+            return None
+        value = float(f"{value:.{precision}g}")
+        return int(value) if value.is_integer() and -1e15 < value < 1e15 else value
+    if value is None or kind is int or kind is bool:
+        return value
+    if isinstance(value, float):
+        return _num(float(value), precision)
+    if isinstance(value, str):
+        text = value.strip()
+        if _NUM_RE.fullmatch(text):
+            return _num(float(text), precision)
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value if isinstance(value, (list, dict)) else str(value)
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+@dataclass
+class _Series:
+    """一张表：列 + 行（行按原顺序，时间序列为新→旧）"""
+
+    path: Tuple[str, ...]
+    cols: List[str]
+    rows: List[list]
+    importance: float = 1.0
+    encoded: Dict[str, Any] = field(default_factory=dict)
+    tokens: int = 0
+    downsampled: int = 0
+
+    @property
+    def is_ohlc(self) -> bool:
+        return all(c in self.cols for c in _OHLC)
+
+    def encode(self) -> None:
+        cols, rows = self.cols, self.rows
+        out: Dict[str, Any] = {}
+        keep = []
+        const: Dict[str, Any] = {}
+        for i, col in enumerate(cols):
+            values = [r[i] for r in rows]
+            if all(v is None for v in values):
+                continue
+            if len(rows) > 1 and all(v == values[0] for v in values):
+                const[col] = values[0]
+                continue
+            keep.append(i)
+        if const:
+            out["const"] = const
+
+        time_idx = next((i for i in keep if cols[i] in _TIME_COLS), None)
+        if time_idx is not None:
+            times = [_parse_time(r[time_idx]) for r in rows]
+            if all(times):
+                t0 = times[0]
+                offsets = [round((t - t0).total_seconds() / 60) for t in times]
+                steps = {b - a for a, b in zip(offsets, offsets[1:])}
+                out["t0"] = t0.isoformat(timespec="minutes")
+                if len(steps) <= 1:
+                    if steps:
+                        out["step_min"] = steps.pop()
+                    keep.remove(time_idx)
+                else:
+                    out["cols"] = ["dt_min" if i == time_idx else cols[i] for i in keep]
+                    out["rows"] = [[off if i == time_idx else r[i] for i in keep] for off, r in zip(offsets, rows)]
+        if "rows" not in out:
+            out["cols"] = [cols[i] for i in keep]
+            out["rows"] = [[r[i] for i in keep] for r in rows]
+        if self.downsampled:
+            out["downsampled"] = 2 ** self.downsampled
+        self.encoded = out
+        self.tokens = 0
+
+    def count_tokens(self) -> int:
+        if not self.tokens:
+            self.tokens = estimate_tokens(json.dumps(self.encoded, ensure_ascii=False, separators=(",", ":")))
+        return self.tokens
+
+    def downsample(self) -> bool:
+        """行数减半（不少于 MIN_ROWS），返回是否有变化"""
+        if (len(self.rows) + 1) // 2 < MIN_ROWS:
+            return False
+        if self.is_ohlc:
+            idx = {c: i for i, c in enumerate(self.cols)}
+            merged = []
+            for n in range(0, len(self.rows), 2):
+                pair = self.rows[n:n + 2]
+                if len(pair) == 1:
+                    merged.append(pair[0])
+                    continue
+                newer, older = pair
+                row = list(older)  # 时间取较早一根（桶起点）
+                row[idx["close"]] = newer[idx["close"]]
+                highs = [v for v in (newer[idx["high"]], older[idx["high"]]) if v is not None]
+                lows = [v for v in (newer[idx["low"]], older[idx["low"]]) if v is not None]
+                row[idx["high"]] = max(highs) if highs else None
+                row[idx["low"]] = min(lows) if lows else None
+                for col in _SUM_COLS:
+                    if col in idx:
+                        a, b = newer[idx[col]], older[idx[col]]
+                        row[idx[col]] = _num((a or 0) + (b or 0)) if a is not None or b is not None else None
+                merged.append(row)
+            self.rows = merged
+        else:
+            self.rows = self.rows[::2]
+        self.downsampled += 1
+        self.encode()
+        return True
+
+
+def _table(path: Tuple[str, ...], rows: List[Dict[str, Any]], precision: int) -> _Series:
+    cols: List[str] = []
+    seen = set()
+    for row in rows:
+        for key in row:
+            if key not in seen:
+                seen.add(key)
+                cols.append(key)
+    return _Series(path, cols, [[_num(row.get(c), precision) for c in cols] for row in rows])
+
+
+def _is_table(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(r, dict) for r in value)
+
+
+def _is_row_map(value: Any) -> bool:
+    """{键(如周期): 行字典}"""
+    return (
+        isinstance(value, dict) and bool(value)
+        and all(isinstance(r, dict) and r and not any(isinstance(v, (dict, list)) for v in r.values())
+                for r in value.values())
+    )
+
+
+def _compact(value: Any, path: Tuple[str, ...], series: List[_Series], precision: int) -> Any:
+    if _is_table(value) and not any(isinstance(v, (dict, list)) for r in value for v in r.values()):
+        s = _table(path, value, precision)
+        series.append(s)
+        return s
+    if _is_row_map(value):
+        rows = []
+        for key, row in value.items():
+            if key in row.values():
+                rows.append(row)
+            else:
+                rows.append({"key": key, **row})
+        s = _table(path, rows, precision)
+        series.append(s)
+        return s
+    if isinstance(value, dict):
+        return {k: _compact(v, path + (str(k),), series, precision) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_compact(v, path, series, precision) for v in value]
+    return _num(value, precision)
+
+
+def _importance(path: Tuple[str, ...], interval: Optional[str]) -> float:
+    """分析周期的 K 线最重要，周期相差越远越不重要；期货指标次之"""
+    if path[:1] == ("candles",) and len(path) > 1:
+        if interval in _INTERVALS and path[1] in _INTERVALS:
+            distance = abs(_INTERVALS.index(path[1]) - _INTERVALS.index(interval))
+            return max(0.1, 1.0 - 0.15 * distance)
+        return 0.5
+    if path[:1] == ("metrics",):
+        return 0.6
+    return 0.8
+
+
+def encode_payload(payload: Dict[str, Any], budget: Optional[int] = None,
+                   precision: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+    """编码数据负载，返回 (文本, 统计)
+
+    budget 为 token 预算（None 取 AI_PROMPT_TOKEN_BUDGET，0 不限制）。
+    """
+    budget = TOKEN_BUDGET if budget is None else budget
+    precision = PRECISION if precision is None else precision
+    key = None
+    if payload.get("generated_at"):
+        key = (payload.get("symbol"), payload["generated_at"], payload.get("interval"), budget, precision)
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached is not None:
+                _cache.move_to_end(key)
+                return cached
+
+    result = _encode(payload, budget, precision)
+    if key is not None:
+        with _cache_lock:
+            _cache[key] = result
+            while len(_cache) > _CACHE_SIZE:
+                _cache.popitem(last=False)
+    return result
+
+
+def _encode(payload: Dict[str, Any], budget: int, precision: int) -> Tuple[str, Dict[str, Any]]:
+    series: List[_Series] = []
+    tree = _compact(payload, (), series, precision)
+    if isinstance(tree, dict):
+        tree = {"_format": FORMAT_NOTE, **tree}
+
+    interval = payload.get("interval")
+    for s in series:
+        s.importance = _importance(s.path, interval)
+        s.encode()
+
+    def dump() -> str:
+        return json.dumps(tree, ensure_ascii=False, separators=(",", ":"), default=lambda s: s.encoded)
+
+    text = dump()
+    tokens = estimate_tokens(text)
+    downsampled = 0
+    if budget and tokens > budget:
+        # 结构部分的 token 不随降采样变化，只需累计各序列的增减
+        for s in sorted(series, key=lambda s: s.importance):
+            while tokens > budget:
+                before = s.count_tokens()
+                if not s.downsample():
+                    break
+                tokens += s.count_tokens() - before
+                downsampled += 1
+            if tokens <= budget:
+                break
+        text = dump()
+        tokens = estimate_tokens(text)
+
+    return text, {
+        "bytes": len(text.encode("utf-8")),
+        "tokens": tokens,
+        "series": len(series),
+        "downsampled": downsampled,
+        "over_budget": bool(budget and tokens > budget),
+    }
+
+
+__all__ = ["encode_payload", "estimate_tokens", "FORMAT_NOTE", "TOKEN_BUDGET"]
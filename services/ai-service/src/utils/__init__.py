@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 """工具模块"""
-from .run_recorder import RunRecorder, get_default_recorder
+from .run_archive import RunArchive
+from .run_recorder import RunRecorder, get_default_recorder, get_run_archive
 
-__all__ = ["RunRecorder", "get_default_recorder"]
+__all__ = ["RunArchive", "RunRecorder", "get_default_recorder", "get_run_archive"]
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+分析结果缓存（single-flight + 按 K 线失效 + SQLite 持久化）
+
+- 键：(币种, 周期, 提示词版本, 语言, 当前 K 线序号)；K 线收盘后自然换键
+- 相同键的并发请求共享同一次 LLM 调用；流式增量同时分发给所有等待者（后加入的先补发已有文本）
+- 单个等待者取消不影响其他人；全部等待者都取消时才取消底层调用
+- 结果先查内存 LRU，再查本地 SQLite（重启后仍可命中），读写都不在事件循环线程上执行
+- 错误结果（[API_ERROR] / [CLI_ERROR]）不缓存
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.config import RESULT_CACHE_DB, RESULT_CACHE_SIZE
+from src.llm.async_client import DeltaCallback
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_SECONDS = {
+    "1m": 60, "5m": 300, "15m": 900, "1h": 3600, "4h": 14400, "1d": 86400, "1w": 604800,
+}
+# 周线从周一 00:00 UTC 开始（1970-01-01 为周四）
+_WEEK_OFFSET = 4 * 86400
+
+_ERROR_PREFIXES = ("[API_ERROR]", "[CLI_ERROR]")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_cache (
+    key          TEXT PRIMARY KEY,
+    symbol       TEXT NOT NULL,
+    interval     TEXT NOT NULL,
+    prompt       TEXT NOT NULL,
+    expires_at   REAL NOT NULL,
+    created_at   REAL NOT NULL,
+    analysis     TEXT NOT NULL,
+    raw_response TEXT
+)
+"""
+
+Result = Dict[str, Any]
+
+
+def bar_window(interval: str, now: Optional[float] = None) -> Tuple[int, float]:
+    """当前 K 线的 (序号, 收盘时间戳)；未知周期按 1h 处理"""
+    now = time.time() if now is None else now
+    seconds = INTERVAL_SECONDS.get(interval, 3600)
+    offset = _WEEK_OFFSET if interval == "1w" else 0
+    index = int((now - offset) // seconds)
+    return index, (index + 1) * seconds + offset
+
+
+def _deliver(on_delta: DeltaCallback, text: str) -> None:
+    """调用增量回调（异步回调放到后台执行），异常只记录"""
+    try:
+        result = on_delta(text)
+        if inspect.isawaitable(result):
+            asyncio.ensure_future(result)
+    except Exception as e:
+        logger.debug("增量回调异常: %s", e)
+
+
+class _Flight:
+    """一次进行中的计算及其等待者"""
+
+    def __init__(self) -> None:
+        self.task: Optional[asyncio.Task] = None
+        self.callbacks: List[DeltaCallback] = []
+        self.parts: List[str] = []
+        self.waiters = 0
+
+    def emit(self, delta: str) -> None:
+        self.parts.append(delta)
+        for cb in list(self.callbacks):
+            _deliver(cb, delta)
+
+    def join(self, on_delta: Optional[DeltaCallback]) -> None:
+        self.waiters += 1
+        if on_delta is None:
+            return
+        if self.parts:
+            _deliver(on_delta, "".join(self.parts))
+        self.callbacks.append(on_delta)
+
+
+class _Store:
+    """SQLite 持久层（线程安全，仅在工作线程中调用）"""
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def get(self, key: str, now: float) -> Optional[Tuple[float, str, Optional[str]]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT expires_at, analysis, raw_response FROM analysis_cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+
+    def put(self, key: str, parts: Tuple[str, str, str], expires_at: float, analysis: str, raw: Optional[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache "
+                "(key, symbol, interval, prompt, expires_at, created_at, analysis, raw_response) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, *parts, expires_at, now, analysis, raw),
+            )
+            self._conn.execute("DELETE FROM analysis_cache WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+
+
+class ResultCache:
+    """分析结果缓存（绑定到调用方事件循环使用；持久层可跨循环共享）"""
+
+    def __init__(self, db_path: Optional[str] = None, max_items: int = RESULT_CACHE_SIZE) -> None:
+        self.db_path = str(db_path or RESULT_CACHE_DB)
+        self.max_items = max_items
+        self._memory: "OrderedDict[str, Tuple[float, Result]]" = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._store: Optional[_Store] = None
+        self._store_lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "coalesced": 0, "misses": 0, "errors": 0}
+
+    # ==================== 持久层 ====================
+    def _get_store(self) -> Optional[_Store]:
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    try:
+                        self._store = _Store(self.db_path)
+                    except sqlite3.Error as e:
+                        logger.warning("分析缓存库不可用，仅使用内存缓存: %s", e)
+                        return None
+        return self._store
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, str, Optional[str]]]:
+        store = self._get_store()
+        if store is None:
+            return None
+        try:
+            return store.get(key, now)
+        except sqlite3.Error as e:
+            logger.warning("读取分析缓存失败: %s", e)
+            return None
+
+    def _disk_put(self, *args) -> None:
+        store = self._get_store()
+        if store is None:
+            return
+        try:
+            store.put(*args)
+        except sqlite3.Error as e:
+            logger.warning("写入分析缓存失败: %s", e)
+
+    def _remember(self, key: str, expires_at: float, result: Result) -> None:
+        self._memory[key] = (expires_at, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    # ==================== 对外接口 ====================
+    async def run(
+        self,
+        symbol: str,
+        interval: str,
+        prompt: str,
+        version: str,
+        lang: Optional[str],
+        compute: Callable[[DeltaCallback], Awaitable[Result]],
+        on_delta: Optional[DeltaCallback] = None,
+    ) -> Result:
+        """命中缓存直接返回（不回调 on_delta）；否则与同键的进行中请求合并，或调用 compute(emit) 计算并缓存"""
+        bar, expires_at = bar_window(interval)
+        key = "|".join((symbol, interval, prompt, version, lang or "", str(bar)))
+        now = time.time()
+
+        cached = self._memory.get(key)
+        if cached and cached[0] > now:
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+            return cached[1]
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            row = await asyncio.to_thread(self._disk_get, key, now)
+            if row is not None:
+                result = {"analysis": row[1], "raw_response": row[2], "payload": None, "cached": True}
+                self._remember(key, row[0], result)
+                self.stats["disk_hits"] += 1
+                return result
+            flight = self._inflight.get(key)  # 读盘期间可能已有人发起
+
+        if flight is None:
+            self.stats["misses"] += 1
+            flight = _Flight()
+            self._inflight[key] = flight
+            flight.task = asyncio.ensure_future(
+                self._compute(key, (symbol, interval, prompt), expires_at, compute, flight)
+            )
+        else:
+            self.stats["coalesced"] += 1
+
+        flight.join(on_delta)
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done():
+                flight.waiters -= 1
+                if on_delta is not None and on_delta in flight.callbacks:
+                    flight.callbacks.remove(on_delta)
+                if flight.waiters <= 0:
+                    flight.task.cancel()
+                    # 立即摘除，任务真正结束前到达的同键请求另起计算，不会加入已取消的这次
+                    if self._inflight.get(key) is flight:
+                        self._inflight.pop(key)
+            raise
+
+    async def _compute(self, key, parts, expires_at, compute, flight: _Flight) -> Result:
+        try:
+            result = await compute(flight.emit)
+        except BaseException:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            if self._inflight.get(key) is flight:
+                self._inflight.pop(key)
+        analysis = result.get("analysis") or ""
+        if analysis and not analysis.startswith(_ERROR_PREFIXES):
+            stored = {"analysis": analysis, "raw_response": result.get("raw_response"),
+                      "payload": None, "cached": True}
+            self._remember(key, expires_at, stored)
+            # 落盘不阻塞返回
+            asyncio.get_running_loop().run_in_executor(
+                None, self._disk_put, key, parts, expires_at, analysis, result.get("raw_response")
+            )
+        return result
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, "memory": len(self._memory), "inflight": len(self._inflight)}
+
+
+_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    global _cache
+    if _cache is None:
+        _cache = ResultCache()
+    return _cache
+
+
+__all__ = ["ResultCache", "bar_window", "get_result_cache", "INTERVAL_SECONDS"]
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+RunArchive - AI 分析运行记录的压缩归档
+
+- 每次运行序列化为一条 JSON，压缩成独立的 gzip 成员追加到当前分段（runs-000001.gz ...）；
+  多成员 gzip 可直接用 zcat 查看
+- 分段超过 AI_RUN_SEGMENT_MB 后轮转；按总大小（AI_RUN_MAX_MB）与保留天数（AI_RUN_RETENTION_DAYS）整段删除最旧分段
+- SQLite 索引 (run_id, 币种, 周期, 提示词, 时间, 分段, 偏移, 长度)：按条件查询只读索引，
+  读取单条记录只 seek 到对应偏移解压一个成员，不扫描目录、不解析其他记录
+- record() 只入队，由后台线程序列化、压缩和写盘，不占用请求路径
+"""
+from __future__ import annotations
+
+import atexit
+import difflib
+import gzip
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_BYTES = int(float(os.getenv("AI_RUN_SEGMENT_MB", "32")) * 1024 * 1024)
+MAX_BYTES = int(float(os.getenv("AI_RUN_MAX_MB", "1024")) * 1024 * 1024)
+RETENTION_DAYS = float(os.getenv("AI_RUN_RETENTION_DAYS", "30"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id     TEXT PRIMARY KEY,
+    symbol     TEXT NOT NULL,
+    interval   TEXT,
+    prompt     TEXT,
+    created_at REAL NOT NULL,
+    segment    INTEGER NOT NULL,
+    offset     INTEGER NOT NULL,
+    length     INTEGER NOT NULL,
+    raw_size   INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_symbol_time ON runs(symbol, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_prompt_time ON runs(prompt, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_time ON runs(created_at);
+"""
+
+_INDEX_COLUMNS = ("run_id", "symbol", "interval", "prompt", "created_at", "segment", "offset", "length", "raw_size")
+_STOP = object()
+
+
+class RunArchive:
+    """分段压缩归档 + SQLite 索引（线程安全）"""
+
+    def __init__(
+        self,
+        base_dir: Path | str,
+        *,
+        segment_bytes: int = SEGMENT_BYTES,
+        max_bytes: int = MAX_BYTES,
+        retention_days: float = RETENTION_DAYS,
+    ) -> None:
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.base_dir / "index.db"), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+        segments = self._segments()
+        self._segment = segments[-1] if segments else 1
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._last_prune = 0.0
+        self.stats = {"queued": 0, "written": 0, "errors": 0, "pruned_segments": 0}
+
+    # ==================== 分段 ====================
+    def _segment_path(self, segment: int) -> Path:
+        return self.base_dir / f"runs-{segment:06d}.gz"
+
+    def _segments(self) -> List[int]:
+        out = []
+        for path in self.base_dir.glob("runs-*.gz"):
+            try:
+                out.append(int(path.stem.split("-", 1)[1]))
+            except ValueError:
+                continue
+        return sorted(out)
+
+    def size_bytes(self) -> int:
+        total = 0
+        for seg in self._segments():
+            try:
+                total += self._segment_path(seg).stat().st_size
+            except OSError:
+                pass
+        return total
+
+    # ==================== 写入 ====================
+    def record(self, run: Dict[str, Any]) -> str:
+        """入队一条运行记录（需含 run_id、symbol；created_at 缺省为当前时间），返回 run_id"""
+        if self._closed:
+            raise RuntimeError("归档已关闭")
+        run.setdefault("created_at", time.time())
+        self._ensure_writer()
+        self._queue.put(run)
+        self.stats["queued"] += 1
+        return run["run_id"]
+
+    def _ensure_writer(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="run-archive", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                if isinstance(item, threading.Event):
+                    item.set()  # flush 栅栏
+                    continue
+                self._write(item)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning("写入运行归档失败: %s", e)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, run: Dict[str, Any]) -> None:
+        raw = json.dumps(run, ensure_ascii=False, default=str).encode("utf-8")
+        blob = gzip.compress(raw, compresslevel=6)
+
+        path = self._segment_path(self._segment)
+        if path.exists() and path.stat().st_size + len(blob) > self.segment_bytes:
+            self._segment += 1
+            path = self._segment_path(self._segment)
+        with open(path, "ab") as f:
+            offset = f.tell()
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run["run_id"], run.get("symbol", ""), run.get("interval"), run.get("prompt_name"),
+                 float(run["created_at"]), self._segment, offset, len(blob), len(raw)),
+            )
+            self._conn.commit()
+        self.stats["written"] += 1
+        # 新开分段时或每小时检查一次保留策略
+        if offset == 0 or time.monotonic() - self._last_prune > 3600:
+            self._last_prune = time.monotonic()
+            self.prune()
+
+    def prune(self) -> int:
+        """删除超出保留天数或总大小上限的最旧分段（当前分段除外），返回删除的分段数"""
+        segments = [s for s in self._segments() if s != self._segment]
+        if not segments:
+            return 0
+        cutoff = time.time() - self.retention_days * 86400 if self.retention_days > 0 else None
+        total = self.size_bytes()
+        removed = 0
+        for seg in segments:
+            with self._lock:
+                newest = self._conn.execute("SELECT MAX(created_at) FROM runs WHERE segment = ?", (seg,)).fetchone()[0]
+            expired = cutoff is not None and (newest is None or newest < cutoff)
+            if not expired and not (self.max_bytes > 0 and total > self.max_bytes):
+                break
+            path = self._segment_path(seg)
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                size = 0
+            with self._lock:
+                self._conn.execute("DELETE FROM runs WHERE segment = ?", (seg,))
+                self._conn.commit()
+            total -= size
+            removed += 1
+        self.stats["pruned_segments"] += removed
+        return removed
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """等待已入队的记录全部写入"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout=10)
+        with self._lock:
+            self._conn.close()
+
+    # ==================== 查询 ====================
+    def find(
+        self,
+        symbol: Optional[str] = None,
+        prompt: Optional[str] = None,
+        interval: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """按条件查询索引（新→旧），只返回索引字段"""
+        conds, params = [], []
+        for col, value in (("symbol", symbol), ("prompt", prompt), ("interval", interval)):
+            if value is not None:
+                conds.append(f"{col} = ?")
+                params.append(value)
+        if since is not None:
+            conds.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conds.append("created_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conds)}" if conds else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_INDEX_COLUMNS)} FROM runs {where} ORDER BY created_at DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """读取单条完整记录（只解压该记录所在的 gzip 成员）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT segment, offset, length FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(self._segment_path(row["segment"]), "rb") as f:
+                f.seek(row["offset"])
+                blob = f.read(row["length"])
+            return json.loads(gzip.decompress(blob))
+        except (OSError, ValueError) as e:
+            logger.warning("读取运行记录 %s 失败: %s", run_id, e)
+            return None
+
+    def latest(self, symbol: str, prompt: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        hits = self.find(symbol=symbol, prompt=prompt, limit=1)
+        return self.load(hits[0]["run_id"]) if hits else None
+
+    def diff(self, run_a: str, run_b: str, field: str = "analysis_text") -> str:
+        """两次运行某个文本字段的 unified diff（默认比较分析结果）"""
+        a, b = self.load(run_a) or {}, self.load(run_b) or {}
+        text_a = a.get(field) if isinstance(a.get(field), str) else json.dumps(a.get(field), ensure_ascii=False, indent=1)
+        text_b = b.get(field) if isinstance(b.get(field), str) else json.dumps(b.get(field), ensure_ascii=False, indent=1)
+        return "".join(difflib.unified_diff(
+            (text_a or "").splitlines(keepends=True), (text_b or "").splitlines(keepends=True),
+            fromfile=run_a, tofile=run_b,
+        ))
+
+
+__all__ = ["RunArchive", "SEGMENT_BYTES", "MAX_BYTES", "RETENTION_DAYS"]
@@ -1,29 +1,57 @@
 # -*- coding: utf-8 -*-
 """
 RunRecorder
-- 为每次 AI 分析落盘一套完整的数据快照，便于排查与复现。
-- 目录结构：data/ai/{symbol}_{timestamp}/
+- 为每次 AI 分析记录一套完整的数据快照，便于排查与复现。
+- 默认写入压缩归档（AI_RUN_RECORDER=archive）：data/ai/archive/ 下的分段 gzip + SQLite 索引，
+  由后台线程写盘，按 (币种, 时间, 提示词) 查询，见 run_archive.RunArchive
+- AI_RUN_RECORDER=dir 时沿用旧的目录结构：data/ai/{symbol}_{timestamp}/
   - raw_payload.json : AICoinQueryManager 返回的完整字典
   - prompt.txt       : 本次使用的提示词内容（可选）
   - analysis.txt     : LLM 输出文本（可选）
   - meta.json        : 请求参数、时间戳等元信息
+- AI_RUN_RECORDER=off 时不记录
 """
 from __future__ import annotations
 
 import json
+import os
+import threading
+import time
+import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, Optional, List
 
 from .data_docs import DATA_DOCS
+from .run_archive import RunArchive
+
+# 记录方式：archive（压缩归档，默认）/ dir（每次一个目录）/ off
+RECORDER_MODE = os.getenv("AI_RUN_RECORDER", "archive").strip().lower()
+
+_archives: Dict[Path, RunArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def _get_archive(path: Path) -> RunArchive:
+    with _archives_lock:
+        archive = _archives.get(path)
+        if archive is None:
+            archive = _archives[path] = RunArchive(path)
+        return archive
 
 
 class RunRecorder:
-    def __init__(self, base_dir: Optional[str] = None) -> None:
+    def __init__(self, base_dir: Optional[str] = None, mode: Optional[str] = None) -> None:
         default_dir = Path(__file__).resolve().parents[2] / "data" / "ai"
         self.base_dir = Path(base_dir) if base_dir else default_dir
+        self.mode = (mode or RECORDER_MODE).lower()
         self.base_dir.mkdir(parents=True, exist_ok=True)
 
+    @property
+    def archive(self) -> RunArchive:
+        """压缩归档（查询接口：find / load / latest / diff）"""
+        return _get_archive((self.base_dir / "archive").resolve())
+
     def save_run(
         self,
         symbol: str,
@@ -34,7 +62,24 @@ class RunRecorder:
         analysis_text: Optional[str] = None,
         request_messages: Optional[List[Dict[str, Any]]] = None,
     ) -> str:
+        """记录一次运行；archive 模式只入队并返回 run_id，dir 模式同步写目录并返回目录路径"""
+        if self.mode == "off":
+            return ""
         timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        if self.mode != "dir":
+            # payload 为只读共享对象，序列化在归档线程中进行
+            return self.archive.record({
+                "run_id": f"{symbol}_{timestamp}_{uuid.uuid4().hex[:6]}",
+                "symbol": symbol,
+                "interval": interval,
+                "prompt_name": prompt_name,
+                "created_at": time.time(),
+                "prompt_text": prompt_text,
+                "analysis_text": analysis_text,
+                "request_messages": request_messages,
+                "payload": payload,
+            })
+
         folder = self.base_dir / f"{symbol}_{timestamp}"
         folder.mkdir(parents=True, exist_ok=True)
 
@@ -131,5 +176,16 @@ class RunRecorder:
 
 
 # 便捷实例（可在全局复用）
+_default_recorder: Optional[RunRecorder] = None
+
+
 def get_default_recorder() -> RunRecorder:
-    return RunRecorder()
+    global _default_recorder
+    if _default_recorder is None:
+        _default_recorder = RunRecorder()
+    return _default_recorder
+
+
+def get_run_archive() -> RunArchive:
+    """默认记录器的压缩归档"""
+    return get_default_recorder().archive
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""ai-service 测试公共配置"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+SERVICE_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVICE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVICE_ROOT))
+
+
+@pytest.fixture(autouse=True)
+def _no_proxy(monkeypatch):
+    """客户端 trust_env=True，避免本地假网关的请求被代理转走"""
+    for name in ("HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "http_proxy", "https_proxy", "all_proxy"):
+        monkeypatch.delenv(name, raising=False)
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""AsyncLLMClient / FairLimiter：本地 aiohttp 假网关（SSE 流式）"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs
+
+import pytest
+from aiohttp import web
+from src.llm.async_client import AsyncLLMClient, FairLimiter, LLMError
+
+
+# ==================== 假网关 ====================
+def fake_model(chunks: int = 5, delay: float = 0.0, stall: float = 0.0) -> str:
+    """模型名携带假网关的行为：分块数、块间隔、首块后的停顿"""
+    return f"fake?chunks={chunks}&delay={delay}&stall={stall}"
+
+
+class FakeGateway:
+    """OpenAI 兼容 /v1/chat/completions；记录到达顺序、并发峰值与中途断开的请求"""
+
+    def __init__(self) -> None:
+        self.arrivals = []
+        self.active = 0
+        self.peak = 0
+        self.aborted = 0
+        self.completed = 0
+        self.base_url = ""
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.arrivals.append(body["messages"][-1]["content"])
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if body["model"] == "error":
+                return web.Response(status=500, text="upstream down")
+            opts = {k: float(v[0]) for k, v in parse_qs(body["model"].split("?", 1)[1]).items()}
+            pieces = [f"{body['messages'][-1]['content']}-{i};" for i in range(int(opts["chunks"]))]
+            if not body["stream"]:
+                await asyncio.sleep(opts["delay"])
+                self.completed += 1
+                return web.json_response({"choices": [{"message": {"content": "".join(pieces)}}]})
+
+            resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await resp.prepare(request)
+            for i, piece in enumerate(pieces):
+                chunk = {"id": "fake", "model": body["model"], "choices": [{"delta": {"content": piece}}]}
+                await resp.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                await asyncio.sleep(opts["stall"] if i == 0 and opts["stall"] else opts["delay"])
+            await resp.write(b'data: {"choices": [{"delta": {}, "finish_reason": "stop"}]}\n\n')
+            await resp.write(b"data: [DONE]\n\n")
+            self.completed += 1
+            return resp
+        except (ConnectionResetError, asyncio.CancelledError):
+            self.aborted += 1
+            raise
+        finally:
+            self.active -= 1
+
+
+@asynccontextmanager
+async def serve():
+    gateway = FakeGateway()
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", gateway.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    gateway.base_url = f"http://127.0.0.1:{port}"
+    try:
+        yield gateway
+    finally:
+        await runner.cleanup()
+
+
+@asynccontextmanager
+async def client_for(gateway: FakeGateway, **kwargs):
+    client = AsyncLLMClient(gateway.base_url, "test-key", **kwargs)
+    try:
+        yield client
+    finally:
+        await client.close()
+
+
+def ask(tag: str):
+    return [{"role": "user", "content": tag}]
+
+
+async def wait_until(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待条件超时")
+        await asyncio.sleep(0.01)
+
+
+# ==================== FairLimiter ====================
+def test_limiter_grants_in_arrival_order():
+    async def main():
+        limiter = FairLimiter(2)
+        order = []
+
+        async def worker(i):
+            async with limiter:
+                order.append(i)
+                await asyncio.sleep(0.01)
+
+        tasks = []
+        for i in range(10):
+            tasks.append(asyncio.create_task(worker(i)))
+            await asyncio.sleep(0)  # 保证按 i 的顺序进入队列
+        await asyncio.gather(*tasks)
+        assert order == list(range(10))
+        assert limiter.active == 0 and limiter.waiting == 0
+
+    asyncio.run(main())
+
+
+def test_limiter_cancel_while_queued_keeps_order():
+    async def main():
+        limiter = FairLimiter(1)
+        await limiter.acquire()
+        order = []
+
+        async def worker(i):
+            async with limiter:
+                order.append(i)
+
+        tasks = [asyncio.create_task(worker(i)) for i in range(4)]
+        await asyncio.sleep(0)
+        assert limiter.waiting == 4
+        tasks[1].cancel()
+        await asyncio.sleep(0)
+        assert limiter.waiting == 3
+
+        limiter.release()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert order == [0, 2, 3]
+        assert limiter.active == 0 and limiter.waiting == 0
+
+    asyncio.run(main())
+
+
+def test_limiter_cancel_after_handoff_passes_slot_on():
+    async def main():
+        limiter = FairLimiter(1)
+        await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire())
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        limiter.release()  # 名额交给 first，但 first 尚未恢复执行
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await asyncio.wait_for(second, 1)  # 名额转交给 second
+        assert limiter.active == 1
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(main())
+
+
+# ==================== AsyncLLMClient ====================
+def test_stream_collects_deltas_in_order():
+    async def main():
+        async with serve() as gateway, client_for(gateway) as client:
+            deltas = []
+            content, response = await client.chat(ask("a"), fake_model(chunks=5), on_delta=deltas.append)
+            assert content == "a-0;a-1;a-2;a-3;a-4;"
+            assert "".join(deltas) == content and len(deltas) == 5
+            assert response["choices"][0]["finish_reason"] == "stop"
+            assert client.get_stats()["streamed"] == 1
+
+    asyncio.run(main())
+
+
+def test_non_stream_and_http_error():
+    async def main():
+        async with serve() as gateway, client_for(gateway) as client:
+            content, _ = await client.chat(ask("b"), fake_model(chunks=2))
+            assert content == "b-0;b-1;"
+            with pytest.raises(LLMError, match="HTTP 500"):
+                await client.chat(ask("c"), "error")
+            assert client.get_stats()["errors"] == 1
+
+    asyncio.run(main())
+
+
+def test_requests_reach_gateway_fifo():
+    async def main():
+        # 单名额时到达网关的顺序即名额发放顺序（多名额时连接建立快慢会打乱到达顺序）
+        async with serve() as gateway, client_for(gateway, concurrency=1) as client:
+            tasks = []
+            for i in range(8):
+                tasks.append(asyncio.create_task(client.chat(ask(str(i)), fake_model(chunks=3, delay=0.01))))
+                await asyncio.sleep(0)
+            await asyncio.gather(*tasks)
+            assert gateway.arrivals == [str(i) for i in range(8)]
+            assert gateway.peak == 1
+
+    asyncio.run(main())
+
+
+def test_cancel_while_queued_never_reaches_gateway():
+    async def main():
+        async with serve() as gateway, client_for(gateway, concurrency=1) as client:
+            running = asyncio.create_task(client.chat(ask("running"), fake_model(chunks=5, delay=0.05), on_delta=lambda _: None))
+            await wait_until(lambda: gateway.active == 1)
+            queued = asyncio.create_task(client.chat(ask("queued"), fake_model()))
+            after = asyncio.create_task(client.chat(ask("after"), fake_model()))
+            await asyncio.sleep(0.01)
+            assert client.get_stats()["waiting"] == 2
+
+            queued.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+            assert client.get_stats()["waiting"] == 1
+
+            await asyncio.gather(running, after)
+            assert gateway.arrivals == ["running", "after"]
+            stats = client.get_stats()
+            assert stats["active"] == 0 and stats["waiting"] == 0
+
+    asyncio.run(main())
+
+
+def test_cancel_while_running_closes_connection():
+    async def main():
+        async with serve() as gateway, client_for(gateway, concurrency=1) as client:
+            got = []
+            task = asyncio.create_task(client.chat(ask("long"), fake_model(chunks=200, delay=0.02), on_delta=got.append))
+            await wait_until(lambda: len(got) >= 2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+            await wait_until(lambda: gateway.aborted == 1)  # 服务端观察到连接断开
+            assert gateway.completed == 0
+            stats = client.get_stats()
+            assert stats["cancelled"] == 1 and stats["active"] == 0
+
+            content, _ = await client.chat(ask("next"), fake_model(chunks=1))  # 名额已归还
+            assert content == "next-0;"
+
+    asyncio.run(main())
+
+
+def test_total_timeout():
+    async def main():
+        async with serve() as gateway, client_for(gateway, idle_timeout=5) as client:
+            started = time.monotonic()
+            with pytest.raises(TimeoutError):
+                await client.chat(ask("t"), fake_model(chunks=100, delay=0.02), on_delta=lambda _: None, timeout=0.3)
+            assert time.monotonic() - started < 1.5
+            stats = client.get_stats()
+            assert stats["timeouts"] == 1 and stats["active"] == 0
+
+    asyncio.run(main())
+
+
+def test_idle_timeout_between_chunks():
+    async def main():
+        async with serve() as gateway, client_for(gateway, timeout=30, idle_timeout=0.2) as client:
+            got = []
+            started = time.monotonic()
+            with pytest.raises(TimeoutError):
+                await client.chat(ask("i"), fake_model(chunks=3, stall=3), on_delta=got.append)
+            assert got == ["i-0;"]
+            assert time.monotonic() - started < 1.5
+            assert client.get_stats()["timeouts"] == 1
+
+    asyncio.run(main())
+
+
+def test_event_loop_stays_responsive_while_streaming():
+    async def main():
+        async with serve() as gateway, client_for(gateway, concurrency=4) as client:
+            lag = 0.0
+            done = asyncio.Event()
+
+            async def ticker():
+                nonlocal lag
+                while not done.is_set():
+                    t0 = time.perf_counter()
+                    await asyncio.sleep(0.005)
+                    lag = max(lag, time.perf_counter() - t0 - 0.005)
+
+            watcher = asyncio.create_task(ticker())
+            results = await asyncio.gather(*(
+                client.chat(ask(str(i)), fake_model(chunks=100, delay=0.002), on_delta=lambda _: None)
+                for i in range(6)
+            ))
+            done.set()
+            await watcher
+
+            assert [r[0].count(";") for r in results] == [100] * 6
+            assert gateway.peak <= 4
+            # 阻塞式读取会让循环停顿整段流（≥200ms）；100ms 留出调度抖动余量
+            assert lag < 0.1, f"事件循环最大停顿 {lag * 1000:.1f}ms"
+
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""ResultCache：同键合并、等待者取消与底层计算的生命周期"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from src.utils.result_cache import ResultCache
+
+
+class FakeCompute:
+    """可控的 LLM 调用：第 n 次调用耗时 delays[n-1]（不足时取最后一个）；被取消后模拟断开连接的收尾耗时"""
+
+    def __init__(self, *delays: float, teardown: float = 0.0) -> None:
+        self.delays = delays or (0.05,)
+        self.teardown = teardown
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self, emit):
+        self.calls += 1
+        n = self.calls
+        try:
+            emit(f"part{n};")
+            await asyncio.sleep(self.delays[min(n, len(self.delays)) - 1])
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            await asyncio.sleep(self.teardown)
+            raise
+        return {"analysis": f"result{n}", "raw_response": None}
+
+
+def run(cache: ResultCache, compute: FakeCompute, on_delta=None):
+    return cache.run("BTCUSDT", "1h", "default", "v1", "zh_CN", compute, on_delta)
+
+
+def test_concurrent_requests_share_one_compute(tmp_path):
+    async def main():
+        cache = ResultCache(db_path=tmp_path / "cache.db")
+        compute = FakeCompute()
+        late = []
+        first = asyncio.create_task(run(cache, compute))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(run(cache, compute, on_delta=late.append))
+        results = await asyncio.gather(first, second)
+
+        assert compute.calls == 1
+        assert [r["analysis"] for r in results] == ["result1", "result1"]
+        assert late == ["part1;"]  # 后加入的等待者补发已有文本
+        assert cache.stats["coalesced"] == 1
+
+        again = await run(cache, compute)
+        assert again["analysis"] == "result1" and again["cached"]
+        assert compute.calls == 1
+
+    asyncio.run(main())
+
+
+def test_cancelling_one_waiter_keeps_the_others(tmp_path):
+    async def main():
+        cache = ResultCache(db_path=tmp_path / "cache.db")
+        compute = FakeCompute(5)
+        first = asyncio.create_task(run(cache, compute))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(run(cache, compute))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await asyncio.sleep(0.01)
+        assert not second.done() and compute.cancelled == 0
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        await asyncio.sleep(0.01)
+        assert compute.cancelled == 1  # 最后一个等待者取消后才取消底层计算
+
+    asyncio.run(main())
+
+
+def test_new_request_after_last_waiter_cancels_starts_fresh(tmp_path):
+    async def main():
+        cache = ResultCache(db_path=tmp_path / "cache.db")
+        compute = FakeCompute(5, 0, teardown=0.05)
+        first = asyncio.create_task(run(cache, compute))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert cache.get_stats()["inflight"] == 0  # 底层仍在收尾，但已不接受新的等待者
+
+        result = await run(cache, compute)  # 不会加入正在取消的那次计算
+        assert result["analysis"] == "result2"
+        assert compute.calls == 2 and compute.cancelled == 1
+        await asyncio.sleep(0.1)
+        assert cache.get_stats()["inflight"] == 0
+
+    asyncio.run(main())
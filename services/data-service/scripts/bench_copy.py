@@ -0,0 +1,95 @@
+"""批量写入基准：文本 COPY (旧路径) vs 二进制 COPY + 复用暂存表
+
+用法:
+    python scripts/bench_copy.py [--rows 2000] [--repeat 20]
+
+在独立 schema (bench_copy) 中建立与 market_data 同结构的目标表，测完即删除，不触碰生产数据。
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from adapters.timescale import TimescaleAdapter
+from config import settings
+
+BENCH_SCHEMA = "bench_copy"
+
+
+def make_candle_rows(n: int, offset: int) -> list[dict]:
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=offset)
+    return [{
+        "exchange": settings.db_exchange, "symbol": f"SYM{i % 600}USDT",
+        "bucket_ts": base + timedelta(minutes=i // 600),
+        "open": 100.0 + i, "high": 101.5 + i, "low": 99.25 + i, "close": 100.75 + i, "volume": 1234.5678,
+        "quote_volume": 123456.789, "trade_count": i, "is_closed": True, "source": "bench",
+        "taker_buy_volume": 600.125, "taker_buy_quote_volume": 60000.5,
+    } for i in range(n)]
+
+
+def make_metric_rows(n: int, offset: int) -> list[dict]:
+    base = datetime(2024, 1, 1) + timedelta(minutes=5 * offset)
+    return [{
+        "create_time": base + timedelta(minutes=5 * (i // 600)), "symbol": f"SYM{i % 600}USDT",
+        "exchange": settings.db_exchange,
+        "sum_open_interest": Decimal("12345.678"), "sum_open_interest_value": Decimal("98765432.1"),
+        "count_toptrader_long_short_ratio": Decimal("1.2345"), "sum_toptrader_long_short_ratio": Decimal("0.9876"),
+        "count_long_short_ratio": Decimal("1.01"), "sum_taker_long_short_vol_ratio": Decimal("0.99"),
+        "source": "bench", "is_closed": True,
+    } for i in range(n)]
+
+
+def bench(label: str, fn, batches: list) -> None:
+    times = []
+    for batch in batches:
+        t0 = time.perf_counter()
+        fn(batch)
+        times.append(time.perf_counter() - t0)
+    rows = sum(len(b) for b in batches)
+    print(f"{label:<28} p50={statistics.median(times) * 1000:8.1f}ms  "
+          f"max={max(times) * 1000:8.1f}ms  {rows / sum(times):10.0f} rows/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="COPY 写入基准")
+    parser.add_argument("--rows", type=int, default=2000, help="每批行数")
+    parser.add_argument("--repeat", type=int, default=20, help="批次数")
+    args = parser.parse_args()
+
+    text = TimescaleAdapter(schema=BENCH_SCHEMA, binary_copy=False)
+    binary = TimescaleAdapter(schema=BENCH_SCHEMA, binary_copy=True)
+    with text.connection() as conn:
+        conn.execute(f"CREATE SCHEMA IF NOT EXISTS {BENCH_SCHEMA}")
+        for table in ("candles_1m", "binance_futures_metrics_5m"):
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {BENCH_SCHEMA}.{table} "
+                         f"(LIKE {settings.db_schema}.{table} INCLUDING ALL)")
+        conn.commit()
+
+    try:
+        # 每种路径各写一组不重叠的键 (纯插入)，再重写同一组键 (冲突更新)
+        for kind, make, upsert in (
+            ("candles", make_candle_rows, lambda ts, b: ts.upsert_candles("1m", b)),
+            ("metrics", make_metric_rows, lambda ts, b: ts.upsert_metrics(b)),
+        ):
+            per_batch = max(1, args.rows // 600)
+            for label, ts, start in (("text", text, 0), ("binary", binary, 10_000)):
+                batches = [make(args.rows, start + i * per_batch) for i in range(args.repeat)]
+                bench(f"{kind}/{label}/insert", lambda b: upsert(ts, b), batches)
+                bench(f"{kind}/{label}/update", lambda b: upsert(ts, b), batches)
+    finally:
+        with text.connection() as conn:
+            conn.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+            conn.commit()
+        text.close()
+        binary.close()
+
+
+if __name__ == "__main__":
+    main()
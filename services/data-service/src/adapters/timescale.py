@@ -2,9 +2,10 @@
 from __future__ import annotations
 
 import logging
+import weakref
 from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Iterator, List, Optional, Sequence
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
 
 from psycopg import sql
 from psycopg.rows import dict_row
@@ -14,18 +15,49 @@ from config import normalize_interval, settings
 
 logger = logging.getLogger(__name__)
 
+# 二进制 COPY 的列类型声明：暂存表按此建表，COPY 按此编码
+# K线数值列来源为 float/Decimal 混合，暂存为 float8，写入目标表时经 text 转 numeric 保留最短精确表示
+CANDLE_COPY_TYPES: Dict[str, str] = {
+    "exchange": "text", "symbol": "text", "bucket_ts": "timestamptz",
+    "open": "float8", "high": "float8", "low": "float8", "close": "float8", "volume": "float8",
+    "quote_volume": "float8", "trade_count": "int8",
+    "taker_buy_volume": "float8", "taker_buy_quote_volume": "float8",
+    "is_closed": "bool", "source": "text",
+}
+# 指标数值列来源为 Decimal，直接按 numeric 编码
+METRICS_COPY_TYPES: Dict[str, str] = {
+    "create_time": "timestamp", "symbol": "text", "exchange": "text",
+    "sum_open_interest": "numeric", "sum_open_interest_value": "numeric",
+    "count_toptrader_long_short_ratio": "numeric", "sum_toptrader_long_short_ratio": "numeric",
+    "count_long_short_ratio": "numeric", "sum_taker_long_short_vol_ratio": "numeric",
+    "source": "text", "is_closed": "bool",
+}
+
+CANDLE_CONFLICT_COLS = ("exchange", "symbol", "bucket_ts")
+METRICS_CONFLICT_COLS = ("symbol", "create_time")
+METRICS_TABLE = "binance_futures_metrics_5m"
+WATERMARK_TABLE = "ingest_watermarks"
+
+# 写入监听：(表名, 最小时间, 最大时间)，时间为本批写入行的桶时间范围（闭区间）
+WriteListener = Callable[[str, datetime, datetime], None]
+
 
 class TimescaleAdapter:
     """TimescaleDB 操作"""
 
     def __init__(self, db_url: Optional[str] = None, schema: Optional[str] = None,
-                 pool_min: int = 2, pool_max: int = 10, timeout: float = 30.0):
+                 pool_min: int = 2, pool_max: int = 10, timeout: float = 30.0,
+                 binary_copy: Optional[bool] = None):
         self.db_url = db_url or settings.database_url
         self.schema = schema or settings.db_schema
+        self.binary_copy = settings.copy_binary if binary_copy is None else binary_copy
         self._pool_min = pool_min
         self._pool_max = pool_max
         self._timeout = timeout
         self._pool: Optional[ConnectionPool] = None
+        # 每个连接已创建的暂存表（连接被回收后自动失效）
+        self._staged: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._listeners: List[WriteListener] = []
 
     @property
     def pool(self) -> ConnectionPool:
@@ -50,9 +82,181 @@ class TimescaleAdapter:
         with self.pool.connection() as conn:
             yield conn
 
+    # ==================== 写入监听 ====================
+    def add_write_listener(self, listener: WriteListener) -> None:
+        """注册写入监听，每次 upsert 提交后以本批桶时间范围回调（用于连续聚合刷新与水位推进）"""
+        self._listeners.append(listener)
+
+    def _notify_written(self, table_name: str, times: Iterable[datetime]) -> None:
+        if not self._listeners:
+            return
+        times = [t for t in times if t is not None]
+        if not times:
+            return
+        lo, hi = min(times), max(times)
+        for listener in self._listeners:
+            try:
+                listener(table_name, lo, hi)
+            except Exception as e:
+                logger.warning("写入监听异常 %s: %s", table_name, e)
+
     def upsert_candles(self, interval: str, rows: Sequence[dict], batch_size: int = 2000) -> int:
+        """批量 upsert K线 (行字典入口)，默认走二进制 COPY，binary_copy=False 时走文本 COPY"""
+        if not rows:
+            return 0
+        table_name = f"candles_{normalize_interval(interval)}"
+        if not self.binary_copy:
+            n = self._upsert_candles_text(interval, rows, batch_size)
+        else:
+            cols = list(rows[0].keys())
+            n = self._copy_upsert(
+                table_name, "candles", CANDLE_COPY_TYPES, CANDLE_CONFLICT_COLS,
+                cols, (tuple(row.get(col) for col in cols) for row in rows),
+            )
+        self._notify_written(table_name, (row.get("bucket_ts") for row in rows))
+        return n
+
+    def upsert_candle_columns(self, interval: str, columns: Mapping[str, Sequence]) -> int:
+        """批量 upsert K线 (列数组入口)
+
+        columns 为 {列名: 等长序列}，列名须属于 CANDLE_COPY_TYPES；
+        序列可以是 list/tuple/NumPy 数组，数值列接受 float/Decimal/None。
+        """
+        cols = list(columns.keys())
+        if not cols or not len(columns[cols[0]]):
+            return 0
+        table_name = f"candles_{normalize_interval(interval)}"
+        n = self._copy_upsert(
+            table_name, "candles", CANDLE_COPY_TYPES, CANDLE_CONFLICT_COLS,
+            cols, zip(*(columns[col] for col in cols)),
+        )
+        self._notify_written(table_name, columns["bucket_ts"])
+        return n
+
+    def upsert_candles_binary(self, interval: str, cols: Sequence[str], payload: bytes) -> int:
+        """批量 upsert K线 (预编码入口)
+
+        payload 为完整的二进制 COPY 流（含文件头与结束标记），各列按 CANDLE_COPY_TYPES 编码，
+        供冷启动流水线在解析进程中一次性向量化编码后直接写入。
+        """
+        if not payload:
+            return 0
+        return self._copy_upsert(
+            f"candles_{normalize_interval(interval)}", "candles", CANDLE_COPY_TYPES, CANDLE_CONFLICT_COLS,
+            cols, payload=payload,
+        )
+
+    def upsert_metrics(self, rows: Sequence[dict], batch_size: int = 2000) -> int:
+        """批量 upsert 指标数据 (行字典入口)，默认走二进制 COPY"""
+        if not rows:
+            return 0
+        if not self.binary_copy:
+            n = self._upsert_metrics_text(rows, batch_size)
+        else:
+            cols = list(rows[0].keys())
+            n = self._copy_upsert(
+                METRICS_TABLE, "metrics", METRICS_COPY_TYPES, METRICS_CONFLICT_COLS,
+                cols, (tuple(row.get(col) for col in cols) for row in rows),
+            )
+        self._notify_written(METRICS_TABLE, (row.get("create_time") for row in rows))
+        return n
+
+    def upsert_metric_columns(self, columns: Mapping[str, Sequence]) -> int:
+        """批量 upsert 指标数据 (列数组入口)，numeric 列须为 Decimal/int/None"""
+        cols = list(columns.keys())
+        if not cols or not len(columns[cols[0]]):
+            return 0
+        n = self._copy_upsert(
+            METRICS_TABLE, "metrics", METRICS_COPY_TYPES, METRICS_CONFLICT_COLS,
+            cols, zip(*(columns[col] for col in cols)),
+        )
+        self._notify_written(METRICS_TABLE, columns["create_time"])
+        return n
+
+    def _ensure_staging(self, conn, kind: str, types: Mapping[str, str]) -> str:
+        """确保当前连接上存在暂存表，返回表名
+
+        暂存表为会话级 TEMP 表（不写 WAL），ON COMMIT DELETE ROWS 使其在每次提交时被清空，
+        同一连接上重复使用，无需每批 CREATE/DROP。
         """
-        使用 COPY 命令批量 upsert K线，实现最高性能。
+        name = f"_stage_{kind}"
+        staged = self._staged.setdefault(conn, set())
+        if kind not in staged:
+            columns = sql.SQL(", ").join(
+                sql.SQL("{} {}").format(sql.Identifier(col), sql.SQL(typ)) for col, typ in types.items()
+            )
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL(
+                    "CREATE TEMP TABLE IF NOT EXISTS {} ({}) ON COMMIT DELETE ROWS"
+                ).format(sql.Identifier(name), columns))
+            staged.add(kind)
+        return name
+
+    def _copy_upsert(self, table_name: str, kind: str, types: Mapping[str, str], conflict_cols: Sequence[str],
+                     cols: Sequence[str], rows: Optional[Iterable[tuple]] = None, payload: Optional[bytes] = None) -> int:
+        """二进制 COPY 到暂存表，再一次性 INSERT ... ON CONFLICT 到目标表
+
+        rows 为逐行元组；payload 为已编码好的完整二进制 COPY 流，二者取其一。
+        """
+        unknown = [col for col in cols if col not in types]
+        if unknown:
+            raise ValueError(f"未声明 COPY 类型的列: {unknown}")
+        if not all(col in cols for col in conflict_cols):
+            raise ValueError(f"Rows must contain {', '.join(conflict_cols)}")
+
+        # float8 暂存列经 text 转 numeric，与文本 COPY 的精度保持一致
+        select_exprs = [
+            sql.SQL("{}::text::numeric").format(sql.Identifier(col)) if types[col] == "float8"
+            else sql.Identifier(col)
+            for col in cols
+        ]
+        update_cols = [col for col in cols if col not in conflict_cols]
+        col_list = sql.SQL(", ").join(map(sql.Identifier, cols))
+
+        with self.connection() as conn:
+            try:
+                staging = self._ensure_staging(conn, kind, types)
+                with conn.cursor() as cur:
+                    with cur.copy(sql.SQL("COPY {} ({}) FROM STDIN (FORMAT BINARY)").format(
+                        sql.Identifier(staging), col_list
+                    )) as copy:
+                        count = 0
+                        if payload is not None:
+                            copy.write(payload)
+                        else:
+                            copy.set_types([types[col] for col in cols])
+                            for row in rows:
+                                copy.write_row(row)
+                                count += 1
+
+                    cur.execute(sql.SQL("""
+                        INSERT INTO {target_table} ({cols})
+                        SELECT {exprs} FROM {staging}
+                        ON CONFLICT ({conflict}) DO UPDATE SET
+                            {update_assignments},
+                            updated_at = NOW();
+                    """).format(
+                        target_table=sql.Identifier(self.schema, table_name),
+                        cols=col_list,
+                        exprs=sql.SQL(", ").join(select_exprs),
+                        staging=sql.Identifier(staging),
+                        conflict=sql.SQL(", ").join(map(sql.Identifier, conflict_cols)),
+                        update_assignments=sql.SQL(", ").join(
+                            sql.SQL("{col} = EXCLUDED.{col}").format(col=sql.Identifier(col))
+                            for col in update_cols
+                        ),
+                    ))
+                    total = cur.rowcount if cur.rowcount > 0 else count
+                conn.commit()
+            except Exception:
+                # 建表可能随事务回滚，下次重新确认
+                self._staged.pop(conn, None)
+                raise
+        return total
+
+    def _upsert_candles_text(self, interval: str, rows: Sequence[dict], batch_size: int = 2000) -> int:
+        """
+        使用文本 COPY 批量 upsert K线（旧路径，保留用于回退与基准对比）。
 
         工作流程:
         1. 创建一个与目标表结构相同的临时表。
@@ -124,12 +328,12 @@ class TimescaleAdapter:
 
         return total_inserted
 
-    def upsert_metrics(self, rows: Sequence[dict], batch_size: int = 2000) -> int:
-        """使用 COPY 命令批量 upsert 指标数据，实现最高性能。"""
+    def _upsert_metrics_text(self, rows: Sequence[dict], batch_size: int = 2000) -> int:
+        """使用文本 COPY 批量 upsert 指标数据（旧路径，保留用于回退与基准对比）。"""
         if not rows:
             return 0
 
-        table_name = "binance_futures_metrics_5m"
+        table_name = METRICS_TABLE
         cols = list(rows[0].keys())
 
         if "create_time" not in cols or "symbol" not in cols:
@@ -183,6 +387,83 @@ class TimescaleAdapter:
 
         return total_inserted
 
+    # ==================== 后台作业 / 连续聚合 ====================
+    def pause_jobs(self, procs: Sequence[str] = ("policy_compression", "policy_refresh_continuous_aggregate")) -> List[int]:
+        """暂停指定类型的 Timescale 后台作业，返回被暂停的 job_id（仅包含原本处于调度中的作业）"""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT job_id FROM timescaledb_information.jobs WHERE proc_name = ANY(%s) AND scheduled",
+                            (list(procs),))
+                job_ids = [r[0] for r in cur.fetchall()]
+                for job_id in job_ids:
+                    cur.execute("SELECT alter_job(%s, scheduled => false)", (job_id,))
+            conn.commit()
+        return job_ids
+
+    def resume_jobs(self, job_ids: Sequence[int]) -> None:
+        """恢复 pause_jobs 暂停的作业"""
+        if not job_ids:
+            return
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                for job_id in job_ids:
+                    cur.execute("SELECT alter_job(%s, scheduled => true)", (job_id,))
+            conn.commit()
+
+    def continuous_aggregates(self, table_name: str) -> List[str]:
+        """返回以 schema.table_name 为源的连续聚合视图名"""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT view_name FROM timescaledb_information.continuous_aggregates "
+                    "WHERE hypertable_schema = %s AND hypertable_name = %s ORDER BY view_name",
+                    (self.schema, table_name),
+                )
+                return [r[0] for r in cur.fetchall()]
+
+    def refresh_continuous_aggregate(self, view_name: str, start: datetime, end: datetime) -> None:
+        """刷新连续聚合的指定窗口（CALL 不能在事务内执行，临时切换 autocommit）"""
+        with self.connection() as conn:
+            conn.autocommit = True
+            try:
+                conn.execute(
+                    "CALL refresh_continuous_aggregate(%s::regclass, %s, %s)",
+                    (sql.Identifier(self.schema, view_name).as_string(conn), start, end),
+                )
+            finally:
+                conn.autocommit = False
+
+    # ==================== 采集水位 ====================
+    def publish_watermarks(self, marks: Mapping[str, datetime]) -> None:
+        """推进水位（只增不减），有推进的表通过 NOTIFY ingest_watermark 广播"""
+        if not marks:
+            return
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                for table_name, closed_through in marks.items():
+                    cur.execute(sql.SQL("""
+                        INSERT INTO {wm} AS w (table_name, closed_through, updated_at)
+                        VALUES (%s, %s, NOW())
+                        ON CONFLICT (table_name) DO UPDATE SET
+                            closed_through = EXCLUDED.closed_through, updated_at = NOW()
+                        WHERE w.closed_through < EXCLUDED.closed_through
+                        RETURNING closed_through
+                    """).format(wm=sql.Identifier(self.schema, WATERMARK_TABLE)), (table_name, closed_through))
+                    row = cur.fetchone()
+                    if row:
+                        cur.execute("SELECT pg_notify('ingest_watermark', json_build_object("
+                                    "'table', %s::text, 'closed_through', %s::timestamptz)::text)",
+                                    (table_name, row[0]))
+            conn.commit()
+
+    def get_watermarks(self) -> Dict[str, datetime]:
+        """读取全部水位 {表名: closed_through}"""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("SELECT table_name, closed_through FROM {}").format(
+                    sql.Identifier(self.schema, WATERMARK_TABLE)))
+                return dict(cur.fetchall())
+
     def _quote_val(self, v) -> str:
         """SQL 值转义 (在此重构中已不再需要，保留以兼容旧代码)"""
         if v is None:
@@ -0,0 +1,160 @@
+"""Binance Vision ZIP 本地归档缓存 - 内容寻址 + SQLite 索引
+
+- 归档按 SHA256 存放在 objects/ 下，URL → 校验和 的映射记录在索引中
+- 下载前先取官方 .CHECKSUM，内容未变则不重新下载；下载完成后校验 SHA256
+- 断点续传：未完成的下载保存在 partial/ 下，下次从已有字节继续
+- 记录每个归档内每个日期的导入状态与行数，重复补齐同一区间时直接跳过（库中行数少于记录时重新导入）
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# (url, 目标路径, 是否断点续传) -> 是否成功
+DownloadFn = Callable[[str, Path, bool], bool]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archives (
+    url         TEXT PRIMARY KEY,
+    sha256      TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    verified_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS imports (
+    url         TEXT NOT NULL,
+    day         TEXT NOT NULL,
+    sha256      TEXT NOT NULL,
+    rows        INTEGER NOT NULL,
+    imported_at REAL NOT NULL,
+    PRIMARY KEY (url, day)
+);
+"""
+
+
+class ArchiveCache:
+    """内容寻址的 ZIP 归档缓存"""
+
+    CHECKSUM_TTL = 86400  # 校验和复核间隔（秒），期内完全不访问网络
+
+    def __init__(self, root: Path, download: DownloadFn):
+        self._root = root
+        self._objects = root / "objects"
+        self._partial = root / "partial"
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._partial.mkdir(parents=True, exist_ok=True)
+        self._db_path = root / "archive_index.db"
+        self._download = download
+        with self._db() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self._db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _object_path(self, sha256: str) -> Path:
+        return self._objects / sha256[:2] / f"{sha256}.zip"
+
+    def _remote_checksum(self, url: str) -> Optional[str]:
+        """读取官方 <url>.CHECKSUM（格式: "<sha256>  <文件名>"）"""
+        tmp = self._partial / f"{hashlib.sha1(url.encode()).hexdigest()}.CHECKSUM"
+        try:
+            if not self._download(f"{url}.CHECKSUM", tmp, False):
+                return None
+            parts = tmp.read_text().split()
+            return parts[0].lower() if parts else None
+        except OSError:
+            return None
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    @staticmethod
+    def _sha256(path: Path) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def fetch(self, url: str) -> Optional[Path]:
+        """返回归档本地路径，必要时下载并校验；归档不存在或校验失败返回 None"""
+        with self._db() as conn:
+            entry = conn.execute("SELECT sha256, verified_at FROM archives WHERE url = ?", (url,)).fetchone()
+
+        cached = self._object_path(entry[0]) if entry else None
+        if cached and cached.exists() and time.time() - entry[1] < self.CHECKSUM_TTL:
+            return cached
+
+        sha256 = self._remote_checksum(url)
+        if sha256 is None:
+            # 远端不可达时沿用本地已校验的副本
+            return cached if cached and cached.exists() else None
+
+        path = self._object_path(sha256)
+        if not path.exists():
+            part = self._partial / f"{sha256}.part"
+            if not self._download(url, part, True):
+                return None
+            actual = self._sha256(part)
+            if actual != sha256:
+                logger.warning("校验失败 %s: 期望 %s 实际 %s", url, sha256, actual)
+                part.unlink(missing_ok=True)
+                return None
+            path.parent.mkdir(parents=True, exist_ok=True)
+            part.replace(path)
+
+        with self._db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO archives (url, sha256, size, verified_at) VALUES (?, ?, ?, ?)",
+                (url, sha256, path.stat().st_size, time.time()),
+            )
+        return path
+
+    def imported_rows(self, url: str, day: date) -> Optional[int]:
+        """该归档当前内容中指定日期已导入的行数；未导入返回 None"""
+        with self._db() as conn:
+            row = conn.execute(
+                "SELECT i.rows FROM imports i JOIN archives a ON a.url = i.url AND a.sha256 = i.sha256 "
+                "WHERE i.url = ? AND i.day = ?",
+                (url, day.isoformat()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_imported(self, url: str, day: date) -> bool:
+        """该归档当前内容中的指定日期是否已导入"""
+        return self.imported_rows(url, day) is not None
+
+    def mark_imported(self, url: str, day: date, rows: int) -> None:
+        """记录指定日期已按归档当前内容导入；只应在实际写入了行时调用，否则该日不会再被重试"""
+        with self._db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO imports (url, day, sha256, rows, imported_at) "
+                "SELECT url, ?, sha256, ?, ? FROM archives WHERE url = ?",
+                (day.isoformat(), rows, time.time(), url),
+            )
+
+    def cleanup(self, max_age_days: int) -> int:
+        """按年龄删除本地归档文件；索引保留，已导入日期不会因文件清理而重新下载"""
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for f in list(self._objects.glob("*/*.zip")) + list(self._partial.glob("*.part")):
+            try:
+                if f.stat().st_mtime < cutoff:
+                    f.unlink()
+                    removed += 1
+            except OSError:
+                pass
+        return removed
@@ -30,7 +30,9 @@ from adapters.ccxt import fetch_ohlcv, load_symbols, to_rows
 from adapters.metrics import Timer, metrics
 from adapters.rate_limiter import acquire, parse_ban, release, set_ban
 from adapters.timescale import TimescaleAdapter
-from config import INTERVAL_TO_MS, settings
+from collectors.archive_cache import ArchiveCache
+from collectors.cagg_refresh import CaggRefresher
+from config import INTERVAL_TO_MS, GapTask, settings
 
 logger = logging.getLogger(__name__)
 
@@ -138,9 +140,13 @@ class RestBackfiller:
         self._workers = workers
 
     def fill_kline_gap(self, symbol: str, gap: GapInfo, interval: str = "1m") -> int:
-        """补齐单个 K 线缺口 - 收集后一次性写入"""
+        """补齐单个 K 线缺口 (整日) - 收集后一次性写入"""
         start_ts = datetime.combine(gap.date, datetime.min.time(), tzinfo=timezone.utc)
         end_ts = datetime.combine(gap.date + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+        return self.fill_kline_range(symbol, start_ts, end_ts, interval)
+
+    def fill_kline_range(self, symbol: str, start_ts: datetime, end_ts: datetime, interval: str = "1m") -> int:
+        """补齐 [start_ts, end_ts) 区间的 K 线 - 收集后一次性写入"""
         since_ms = int(start_ts.timestamp() * 1000)
         target_ms = int(end_ts.timestamp() * 1000)
 
@@ -186,6 +192,25 @@ class RestBackfiller:
                     logger.warning("[%s] %s REST失败: %s", sym, d, e)
         return total
 
+    def fill_gap_tasks(self, tasks: Sequence[GapTask], interval: str = "1m") -> int:
+        """并行补齐精确区间缺口 (WS 流内检测产出)"""
+        if not tasks:
+            return 0
+
+        total = 0
+        with ThreadPoolExecutor(max_workers=self._workers) as pool:
+            futures = {pool.submit(self.fill_kline_range, t.symbol, t.gap_start, t.gap_end, interval): t for t in tasks}
+            for future in as_completed(futures):
+                t = futures[future]
+                try:
+                    n = future.result()
+                    if n > 0:
+                        logger.info("[%s] %s ~ %s REST补齐 %d 条", t.symbol, t.gap_start, t.gap_end, n)
+                        total += n
+                except Exception as e:
+                    logger.warning("[%s] %s ~ %s REST失败: %s", t.symbol, t.gap_start, t.gap_end, e)
+        return total
+
 
 # ==================== Metrics REST 补齐 ====================
 class MetricsRestBackfiller:
@@ -302,9 +327,52 @@ class MetricsRestBackfiller:
         return total
 
 
+# ==================== ZIP 解析 ====================
+def read_metrics_zip(path: Path, symbol: str, filter_date: Optional[date] = None) -> List[dict]:
+    """解析 metrics ZIP 为行字典，可选按日期过滤"""
+    rows = []
+    with zipfile.ZipFile(path) as zf:
+        for name in zf.namelist():
+            if not name.endswith(".csv"):
+                continue
+            with zf.open(name) as f:
+                for row in csv.reader(line.decode() for line in f):
+                    if len(row) < 4:
+                        continue
+                    try:
+                        ts_val = row[0]
+                        if ts_val.isdigit():
+                            ts = int(ts_val)
+                        else:
+                            ts = int(datetime.fromisoformat(ts_val.replace("Z", "+00:00")).timestamp() * 1000)
+
+                        # 对齐到 5 分钟边界
+                        ts = (ts // 300000) * 300000
+                        dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+                        if filter_date and dt.date() != filter_date:
+                            continue
+
+                        rows.append({
+                            "create_time": dt.replace(tzinfo=None),
+                            "symbol": symbol.upper(),
+                            "exchange": settings.db_exchange,
+                            "sum_open_interest": Decimal(row[2]) if len(row) > 2 and row[2] else None,
+                            "sum_open_interest_value": Decimal(row[3]) if len(row) > 3 and row[3] else None,
+                            "count_toptrader_long_short_ratio": Decimal(row[5]) if len(row) > 5 and row[5] else None,
+                            "sum_toptrader_long_short_ratio": Decimal(row[4]) if len(row) > 4 and row[4] else None,
+                            "count_long_short_ratio": Decimal(row[6]) if len(row) > 6 and row[6] else None,
+                            "sum_taker_long_short_vol_ratio": Decimal(row[7]) if len(row) > 7 and row[7] else None,
+                            "source": "binance_zip",
+                            "is_closed": True,
+                        })
+                    except (ValueError, IndexError):
+                        pass
+    return rows
+
+
 # ==================== ZIP 历史补齐 ====================
 class ZipBackfiller:
-    """Binance Vision ZIP 补齐 - 智能颗粒度 + 代理重试"""
+    """Binance Vision ZIP 补齐 - 智能颗粒度 + 代理重试 + 内容寻址缓存"""
 
     MAX_CACHE_DAYS = 7  # ZIP 文件最大缓存天数
 
@@ -317,12 +385,19 @@ class ZipBackfiller:
         self._metrics_dir.mkdir(parents=True, exist_ok=True)
         self._proxies = {"http": settings.http_proxy, "https": settings.http_proxy} if settings.http_proxy else {}
         self._fallback_proxies = self._proxies  # 使用相同代理，不硬编码备用
+        self._cache = ArchiveCache(settings.data_dir / "downloads", self._download_with_retry)
+
+    @property
+    def cache(self) -> ArchiveCache:
+        """归档缓存（供冷启动流水线复用）"""
+        return self._cache
 
     def cleanup_old_files(self, max_age_days: int = None) -> int:
-        """清理过期的 ZIP 文件"""
+        """清理过期的 ZIP 文件（索引保留，已导入的日期不会重新下载）"""
         max_age = max_age_days or self.MAX_CACHE_DAYS
         cutoff = time.time() - max_age * 86400
-        removed = 0
+        removed = self._cache.cleanup(max_age)
+        # 旧版按文件名存放的 ZIP
         for d in [self._kline_dir, self._metrics_dir]:
             for f in d.glob("*.zip"):
                 try:
@@ -335,26 +410,33 @@ class ZipBackfiller:
             logger.info("清理 %d 个过期 ZIP 文件", removed)
         return removed
 
-    def _download_with_retry(self, url: str, path: Path) -> bool:
-        """下载文件，失败时自动走代理重试"""
+    def _download_with_retry(self, url: str, path: Path, resume: bool = False) -> bool:
+        """流式下载文件，失败时自动走代理重试；resume=True 时从已有字节断点续传"""
         acquire(1)
         try:
             for attempt, proxies in enumerate([self._proxies, self._fallback_proxies]):
                 try:
-                    r = requests.get(url, proxies=proxies, timeout=60)
-                    if r.status_code == 404:
-                        return False
-                    if r.status_code == 429:
-                        retry_after = int(r.headers.get("Retry-After", 60))
-                        set_ban(time.time() + retry_after)
-                        return False
-                    if r.status_code == 418:
-                        retry_after = int(r.headers.get("Retry-After", 0))
-                        ban_time = parse_ban(r.text) if not retry_after else time.time() + retry_after
-                        set_ban(ban_time if ban_time > time.time() else time.time() + 120)
-                        return False
-                    r.raise_for_status()
-                    path.write_bytes(r.content)
+                    offset = path.stat().st_size if resume and path.exists() else 0
+                    headers = {"Range": f"bytes={offset}-"} if offset else None
+                    with requests.get(url, proxies=proxies, headers=headers, timeout=60, stream=True) as r:
+                        if r.status_code == 404:
+                            return False
+                        if r.status_code == 416:
+                            return True  # 已完整下载
+                        if r.status_code == 429:
+                            retry_after = int(r.headers.get("Retry-After", 60))
+                            set_ban(time.time() + retry_after)
+                            return False
+                        if r.status_code == 418:
+                            retry_after = int(r.headers.get("Retry-After", 0))
+                            ban_time = parse_ban(r.text) if not retry_after else time.time() + retry_after
+                            set_ban(ban_time if ban_time > time.time() else time.time() + 120)
+                            return False
+                        r.raise_for_status()
+                        # 206 追加；200 表示服务端忽略了 Range，从头写
+                        with open(path, "ab" if r.status_code == 206 else "wb") as f:
+                            for chunk in r.iter_content(chunk_size=1 << 16):
+                                f.write(chunk)
                     metrics.inc("zip_downloads")
                     return True
                 except Exception as e:
@@ -366,17 +448,46 @@ class ZipBackfiller:
         finally:
             release()
 
+    def _import_cached(self, url: str, days: Dict[date, int], importer) -> Optional[int]:
+        """通过缓存导入归档中尚未导入的日期；归档不可用返回 None
+
+        days 为 {日期: 缺口扫描得到的库中行数}。索引记录已导入、且库中行数不少于当时写入行数的日期直接跳过
+        （剩余缺口归档本身补不了）；库中行数更少说明数据已丢失，以本次扫描为准重新导入。
+        importer(path, day) -> 导入行数；只有实际写入了行的日期才记入索引，解析失败的归档下次重试。
+        """
+        pending = []
+        for d, actual in days.items():
+            rows = self._cache.imported_rows(url, d)
+            if rows is not None and actual >= rows:
+                continue
+            if rows is not None:
+                logger.debug("索引记录 %s %s 已导入 %d 条，库中仅 %d 条，重新导入", url, d, rows, actual)
+            pending.append(d)
+        if not pending:
+            metrics.inc("zip_cache_hits")
+            return 0
+        path = self._cache.fetch(url)
+        if path is None:
+            return None
+        total = 0
+        for d in pending:
+            n = importer(path, d)
+            if n > 0:
+                self._cache.mark_imported(url, d, n)
+            total += n
+        return total
+
     def fill_kline_gaps(self, gaps: Dict[str, List[GapInfo]], interval: str = "1m") -> int:
         """批量补齐 K 线缺口 - 按月分组避免重复下载"""
         if not gaps:
             return 0
 
         # 按 (symbol, month) 分组，避免重复下载月度 ZIP
-        month_groups: Dict[tuple, List[date]] = {}
+        month_groups: Dict[tuple, Dict[date, int]] = {}
         for sym, sym_gaps in gaps.items():
             for gap in sym_gaps:
                 key = (sym, gap.date.strftime("%Y-%m"))
-                month_groups.setdefault(key, []).append(gap.date)
+                month_groups.setdefault(key, {})[gap.date] = gap.actual
 
         # 任务：每个 (symbol, month) 只下载一次，但导入多个日期
         tasks = [(sym, month, dates, interval) for (sym, month), dates in month_groups.items()]
@@ -397,50 +508,26 @@ class ZipBackfiller:
 
         return total
 
-    def _download_kline_month(self, symbol: str, month: str, dates: List[date], interval: str) -> int:
+    def _download_kline_month(self, symbol: str, month: str, dates: Dict[date, int], interval: str) -> int:
         """下载并导入一个月的 K 线数据"""
         sym = symbol.upper()
-        total = 0
         current_month = date.today().strftime("%Y-%m")
 
-        # 当月数据直接用日度ZIP（月度ZIP还没生成）
-        if month == current_month:
-            for d in dates:
-                day_str = d.strftime("%Y-%m-%d")
-                day_fname = f"{sym}-{interval}-{day_str}.zip"
-                day_path = self._kline_dir / day_fname
-                if not day_path.exists():
-                    day_url = f"{BINANCE_DATA_URL}/data/futures/um/daily/klines/{sym}/{interval}/{day_fname}"
-                    if not self._download_with_retry(day_url, day_path):
-                        continue
-                total += self._import_kline_zip(day_path, symbol, interval)
-            return total
+        def importer(path: Path, d: date) -> int:
+            return self._import_kline_zip(path, symbol, interval, d)
 
-        # 1. 历史月份尝试月度 ZIP
-        month_fname = f"{sym}-{interval}-{month}.zip"
-        month_path = self._kline_dir / month_fname
-        if not month_path.exists():
-            month_url = f"{BINANCE_DATA_URL}/data/futures/um/monthly/klines/{sym}/{interval}/{month_fname}"
-            self._download_with_retry(month_url, month_path)
-
-        if month_path.exists():
-            # 月度 ZIP 存在，导入所有需要的日期
-            for d in dates:
-                n = self._import_kline_zip(month_path, symbol, interval, d)
-                total += n
-            return total
-
-        # 2. 月度不存在，降级到日度
-        for d in dates:
-            day_str = d.strftime("%Y-%m-%d")
-            day_fname = f"{sym}-{interval}-{day_str}.zip"
-            day_path = self._kline_dir / day_fname
-            if not day_path.exists():
-                day_url = f"{BINANCE_DATA_URL}/data/futures/um/daily/klines/{sym}/{interval}/{day_fname}"
-                if not self._download_with_retry(day_url, day_path):
-                    continue
-            total += self._import_kline_zip(day_path, symbol, interval)
+        # 1. 历史月份尝试月度 ZIP（当月的月度 ZIP 还没生成）
+        if month != current_month:
+            month_url = f"{BINANCE_DATA_URL}/data/futures/um/monthly/klines/{sym}/{interval}/{sym}-{interval}-{month}.zip"
+            n = self._import_cached(month_url, dates, importer)
+            if n is not None:
+                return n
 
+        # 2. 当月或月度不存在，降级到日度
+        total = 0
+        for d, actual in dates.items():
+            day_url = f"{BINANCE_DATA_URL}/data/futures/um/daily/klines/{sym}/{interval}/{sym}-{interval}-{d:%Y-%m-%d}.zip"
+            total += self._import_cached(day_url, {d: actual}, importer) or 0
         return total
 
     def fill_metrics_gaps(self, gaps: Dict[str, List[GapInfo]]) -> int:
@@ -449,11 +536,11 @@ class ZipBackfiller:
             return 0
 
         # 按 (symbol, month) 分组
-        month_groups: Dict[tuple, List[date]] = {}
+        month_groups: Dict[tuple, Dict[date, int]] = {}
         for sym, sym_gaps in gaps.items():
             for gap in sym_gaps:
                 key = (sym, gap.date.strftime("%Y-%m"))
-                month_groups.setdefault(key, []).append(gap.date)
+                month_groups.setdefault(key, {})[gap.date] = gap.actual
 
         tasks = [(sym, month, dates) for (sym, month), dates in month_groups.items()]
         logger.info("Metrics ZIP 补齐: %d 个月度任务 (原 %d 个日任务)", len(tasks), sum(len(g) for g in gaps.values()))
@@ -473,49 +560,26 @@ class ZipBackfiller:
 
         return total
 
-    def _download_metrics_month(self, symbol: str, month: str, dates: List[date]) -> int:
+    def _download_metrics_month(self, symbol: str, month: str, dates: Dict[date, int]) -> int:
         """下载并导入一个月的 Metrics 数据"""
         sym = symbol.upper()
-        total = 0
         current_month = date.today().strftime("%Y-%m")
 
-        # 当月数据直接用日度ZIP
-        if month == current_month:
-            for d in dates:
-                day_str = d.strftime("%Y-%m-%d")
-                day_fname = f"{sym}-metrics-{day_str}.zip"
-                day_path = self._metrics_dir / day_fname
-                if not day_path.exists():
-                    day_url = f"{BINANCE_DATA_URL}/data/futures/um/daily/metrics/{sym}/{day_fname}"
-                    if not self._download_with_retry(day_url, day_path):
-                        continue
-                total += self._import_metrics_zip(day_path, symbol)
-            return total
+        def importer(path: Path, d: date) -> int:
+            return self._import_metrics_zip(path, symbol, d)
 
         # 1. 历史月份尝试月度 ZIP
-        month_fname = f"{sym}-metrics-{month}.zip"
-        month_path = self._metrics_dir / month_fname
-        if not month_path.exists():
-            month_url = f"{BINANCE_DATA_URL}/data/futures/um/monthly/metrics/{sym}/{month_fname}"
-            self._download_with_retry(month_url, month_path)
-
-        if month_path.exists():
-            for d in dates:
-                n = self._import_metrics_zip(month_path, symbol, d)
-                total += n
-            return total
-
-        # 2. 降级到日度
-        for d in dates:
-            day_str = d.strftime("%Y-%m-%d")
-            day_fname = f"{sym}-metrics-{day_str}.zip"
-            day_path = self._metrics_dir / day_fname
-            if not day_path.exists():
-                day_url = f"{BINANCE_DATA_URL}/data/futures/um/daily/metrics/{sym}/{day_fname}"
-                if not self._download_with_retry(day_url, day_path):
-                    continue
-            total += self._import_metrics_zip(day_path, symbol)
+        if month != current_month:
+            month_url = f"{BINANCE_DATA_URL}/data/futures/um/monthly/metrics/{sym}/{sym}-metrics-{month}.zip"
+            n = self._import_cached(month_url, dates, importer)
+            if n is not None:
+                return n
 
+        # 2. 当月或月度不存在，降级到日度
+        total = 0
+        for d, actual in dates.items():
+            day_url = f"{BINANCE_DATA_URL}/data/futures/um/daily/metrics/{sym}/{sym}-metrics-{d:%Y-%m-%d}.zip"
+            total += self._import_cached(day_url, {d: actual}, importer) or 0
         return total
 
     def _import_kline_zip(self, path: Path, symbol: str, interval: str, filter_date: date = None) -> int:
@@ -561,44 +625,8 @@ class ZipBackfiller:
 
     def _import_metrics_zip(self, path: Path, symbol: str, filter_date: date = None) -> int:
         """导入 metrics ZIP，可选按日期过滤"""
-        rows = []
         try:
-            with zipfile.ZipFile(path) as zf:
-                for name in zf.namelist():
-                    if not name.endswith(".csv"):
-                        continue
-                    with zf.open(name) as f:
-                        for row in csv.reader(line.decode() for line in f):
-                            if len(row) < 4:
-                                continue
-                            try:
-                                ts_val = row[0]
-                                if ts_val.isdigit():
-                                    ts = int(ts_val)
-                                else:
-                                    ts = int(datetime.fromisoformat(ts_val.replace("Z", "+00:00")).timestamp() * 1000)
-
-                                # 对齐到 5 分钟边界
-                                ts = (ts // 300000) * 300000
-                                dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
-                                if filter_date and dt.date() != filter_date:
-                                    continue
-
-                                rows.append({
-                                    "create_time": dt.replace(tzinfo=None),
-                                    "symbol": symbol.upper(),
-                                    "exchange": settings.db_exchange,
-                                    "sum_open_interest": Decimal(row[2]) if len(row) > 2 and row[2] else None,
-                                    "sum_open_interest_value": Decimal(row[3]) if len(row) > 3 and row[3] else None,
-                                    "count_toptrader_long_short_ratio": Decimal(row[5]) if len(row) > 5 and row[5] else None,
-                                    "sum_toptrader_long_short_ratio": Decimal(row[4]) if len(row) > 4 and row[4] else None,
-                                    "count_long_short_ratio": Decimal(row[6]) if len(row) > 6 and row[6] else None,
-                                    "sum_taker_long_short_vol_ratio": Decimal(row[7]) if len(row) > 7 and row[7] else None,
-                                    "source": "binance_zip",
-                                    "is_closed": True,
-                                })
-                            except (ValueError, IndexError):
-                                pass
+            rows = read_metrics_zip(path, symbol, filter_date)
         except Exception as e:
             logger.error("解析失败 %s: %s", path, e)
             return 0
@@ -625,6 +653,7 @@ class DataBackfiller:
         self.workers = workers
         self.threshold = threshold
         self._ts = TimescaleAdapter()
+        self._refresher = CaggRefresher(self._ts)
         self._scanner = GapScanner(self._ts)
         self._rest = RestBackfiller(self._ts)
         self._zip = ZipBackfiller(self._ts, workers)
@@ -711,6 +740,8 @@ class DataBackfiller:
             }
 
     def close(self) -> None:
+        # 补齐写入的历史窗口统一刷新一次
+        self._refresher.flush()
         self._ts.close()
 
 
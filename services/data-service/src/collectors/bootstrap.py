@@ -0,0 +1,392 @@
+"""历史数据冷启动 - 下载 / 解析 / 入库 三段流水线
+
+新节点首次部署时一次性导入大量历史（如 600 币种 × 12 个月 1m K线）：
+1. 下载：线程池，经 ArchiveCache 校验、断点续传、跳过已导入的归档
+2. 解析：进程池，K线 CSV 用 NumPy 解析并直接向量化编码为二进制 COPY 流
+3. 入库：少量 COPY 连接并行写入
+各阶段之间为有界队列，慢阶段自然反压上游；每个阶段单独统计吞吐。
+导入期间暂停压缩与连续聚合刷新作业，结束后恢复，并对导入窗口刷新一次连续聚合。
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from adapters.ccxt import load_symbols
+from adapters.metrics import metrics
+from adapters.timescale import CANDLE_COPY_TYPES, METRICS_TABLE, TimescaleAdapter
+from collectors.backfill import BINANCE_DATA_URL, ZipBackfiller, read_metrics_zip
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # 队列结束标记
+
+# ==================== 解析（子进程） ====================
+KLINE_COPY_COLS = [
+    "exchange", "symbol", "bucket_ts", "open", "high", "low", "close", "volume",
+    "quote_volume", "trade_count", "taker_buy_volume", "taker_buy_quote_volume", "is_closed", "source",
+]
+_PG_EPOCH_US = 946_684_800 * 1_000_000  # 2000-01-01 (PostgreSQL 二进制时间零点)
+_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00" + b"\x00" * 8
+_COPY_TRAILER = b"\xff\xff"
+_EPOCH_DATE = date(1970, 1, 1)
+_FIXED_FORMATS = {"float8": ">f8", "int8": ">i8", "timestamptz": ">i8", "bool": "u1"}
+
+
+def encode_copy_binary(columns: Dict[str, object], types: Dict[str, str], n: int) -> bytes:
+    """把定长列向量化编码为完整的二进制 COPY 流
+
+    columns 中数值列为长度 n 的数组，text 列为对整批相同的 bytes 常量。
+    每行布局固定：int16 列数 + 每列 (int32 长度 + 值)，因此可用一个结构化数组一次写完。
+    """
+    dtype: List[Tuple[str, str]] = [("_n", ">i2")]
+    for col, value in columns.items():
+        fmt = f"S{len(value)}" if types[col] == "text" else _FIXED_FORMATS[types[col]]
+        dtype += [(f"{col}__len", ">i4"), (col, fmt)]
+
+    arr = np.empty(n, dtype=dtype)
+    arr["_n"] = len(columns)
+    for col, value in columns.items():
+        arr[f"{col}__len"] = arr.dtype[col].itemsize
+        arr[col] = value
+    return _COPY_SIGNATURE + arr.tobytes() + _COPY_TRAILER
+
+
+def _read_csv_members(path: str) -> bytes:
+    """拼接 ZIP 内所有 CSV：逐个去掉表头（新版归档带表头），并保证每段以换行结尾"""
+    chunks = []
+    with zipfile.ZipFile(path) as zf:
+        for name in zf.namelist():
+            if not name.endswith(".csv"):
+                continue
+            chunk = zf.read(name)
+            if chunk[:1] and not chunk[:1].isdigit():
+                chunk = chunk.partition(b"\n")[2]
+            if chunk and not chunk.endswith(b"\n"):
+                chunk += b"\n"  # 否则末行会与下一个文件的首行粘连
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _parse_kline_archive(path: str, symbol: str, exchange: str,
+                         first: date, last: date) -> Tuple[bytes, int, Dict[str, int]]:
+    """解析 K 线 ZIP → (二进制 COPY 流, 行数, {日期: 行数})；只保留 [first, last] 内的日期"""
+    raw = _read_csv_members(path)
+    if not raw.strip():
+        return b"", 0, {}
+    data = np.loadtxt(io.BytesIO(raw), delimiter=",", usecols=range(11), dtype=np.float64, ndmin=2)
+    if not len(data):
+        return b"", 0, {}
+
+    open_ms = data[:, 0].astype(np.int64)
+    if open_ms.max() > 10**14:  # 微秒时间戳
+        open_ms //= 1000
+    day = open_ms // 86_400_000
+    # 起始日期在月中时，月度归档里更早的日期不重复导入
+    keep = (day >= (first - _EPOCH_DATE).days) & (day <= (last - _EPOCH_DATE).days)
+    if not keep.all():
+        data, open_ms, day = data[keep], open_ms[keep], day[keep]
+    if not len(data):
+        return b"", 0, {}
+    days, counts = np.unique(day, return_counts=True)
+    rows_by_day = {(_EPOCH_DATE + timedelta(days=int(d))).isoformat(): int(c) for d, c in zip(days, counts)}
+
+    payload = encode_copy_binary({
+        "exchange": exchange.encode(), "symbol": symbol.upper().encode(),
+        "bucket_ts": open_ms * 1000 - _PG_EPOCH_US,
+        "open": data[:, 1], "high": data[:, 2], "low": data[:, 3], "close": data[:, 4], "volume": data[:, 5],
+        "quote_volume": data[:, 7], "trade_count": data[:, 8].astype(np.int64),
+        "taker_buy_volume": data[:, 9], "taker_buy_quote_volume": data[:, 10],
+        "is_closed": 1, "source": b"binance_zip",
+    }, CANDLE_COPY_TYPES, len(data))
+    return payload, len(data), rows_by_day
+
+
+def _parse_metrics_archive(path: str, symbol: str, first: date, last: date) -> Tuple[List[dict], int, Dict[str, int]]:
+    """解析 metrics ZIP → (行字典, 行数, {日期: 行数})；只保留 [first, last] 内的日期。5m 指标体量小，沿用行字典"""
+    rows = [r for r in read_metrics_zip(Path(path), symbol) if first <= r["create_time"].date() <= last]
+    rows_by_day: Dict[str, int] = {}
+    for r in rows:
+        d = r["create_time"].date().isoformat()
+        rows_by_day[d] = rows_by_day.get(d, 0) + 1
+    return rows, len(rows), rows_by_day
+
+
+# ==================== 流水线 ====================
+@dataclass
+class StageStats:
+    """单个阶段的吞吐统计"""
+    name: str
+    items: int = 0
+    rows: int = 0
+    bytes: int = 0
+    errors: int = 0
+    busy: float = 0.0  # 各工作线程累计工作耗时
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, busy: float, rows: int = 0, nbytes: int = 0, error: bool = False) -> None:
+        with self._lock:
+            self.items += 1
+            self.rows += rows
+            self.bytes += nbytes
+            self.busy += busy
+            self.errors += int(error)
+
+    def summary(self, elapsed: float) -> str:
+        elapsed = max(elapsed, 1e-9)
+        return (f"{self.name}: {self.items} 件 ({self.items / elapsed:.1f}/s) | {self.rows} 行 ({self.rows / elapsed:.0f}/s) | "
+                f"{self.bytes / 1e6:.1f}MB ({self.bytes / 1e6 / elapsed:.1f}MB/s) | 忙碌 {self.busy:.0f}s | 失败 {self.errors}")
+
+
+@dataclass
+class _Unit:
+    """一个待导入归档"""
+    kind: str          # klines | metrics
+    symbol: str
+    url: str
+    dates: List[date]  # 该归档覆盖且需要导入的日期
+    daily_fallback: List[Tuple[str, List[date]]] = field(default_factory=list)  # 月度缺失时降级的日度归档
+
+
+class BootstrapPipeline:
+    """冷启动流水线：下载 (I/O 线程池) → 解析 (进程池) → 入库 (COPY 连接)"""
+
+    def __init__(self, symbols: Sequence[str], start: date, end: date, kinds: Sequence[str] = ("klines", "metrics"),
+                 download_workers: int = 8, parse_workers: Optional[int] = None, load_workers: int = 3,
+                 queue_size: int = 16):
+        self._symbols = [s.upper() for s in symbols]
+        self._start = start
+        self._end = end
+        self._kinds = list(kinds)
+        self._download_workers = download_workers
+        self._parse_workers = parse_workers or max(1, (os.cpu_count() or 2) - 1)
+        self._load_workers = load_workers
+        self._ts = TimescaleAdapter(pool_min=1, pool_max=load_workers + 2)
+        self._zip = ZipBackfiller(self._ts, workers=download_workers)
+        self._cache = self._zip.cache
+
+        self._todo: queue.Queue = queue.Queue()
+        self._downloaded: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._parsed: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.stats = {name: StageStats(name) for name in ("download", "parse", "load")}
+        self.skipped = 0
+        self._skip_lock = threading.Lock()
+
+    # ---------- 任务规划 ----------
+    def _units(self) -> List[_Unit]:
+        """按 (kind, symbol, 月) 规划归档：历史月用月度 ZIP，当月或月度缺失用日度 ZIP"""
+        units = []
+        current_month = date.today().strftime("%Y-%m")
+        months: Dict[str, List[date]] = {}
+        d = self._start
+        while d <= self._end:
+            months.setdefault(d.strftime("%Y-%m"), []).append(d)
+            d += timedelta(days=1)
+
+        for kind in self._kinds:
+            for sym in self._symbols:
+                base = (f"{BINANCE_DATA_URL}/data/futures/um/{{freq}}/klines/{sym}/1m/{sym}-1m-{{label}}.zip"
+                        if kind == "klines" else
+                        f"{BINANCE_DATA_URL}/data/futures/um/{{freq}}/metrics/{sym}/{sym}-metrics-{{label}}.zip")
+                for month, dates in months.items():
+                    daily = [(base.format(freq="daily", label=f"{x:%Y-%m-%d}"), [x]) for x in dates]
+                    if month == current_month:
+                        units += [_Unit(kind, sym, url, ds) for url, ds in daily]
+                    else:
+                        units.append(_Unit(kind, sym, base.format(freq="monthly", label=month), dates, daily))
+        return units
+
+    # ---------- 阶段 ----------
+    def _download_loop(self) -> None:
+        while True:
+            unit = self._todo.get()
+            if unit is _STOP:
+                return
+            try:
+                self._download_one(unit)
+            except Exception as e:
+                logger.warning("[%s] 下载失败 %s: %s", unit.symbol, unit.url, e)
+                self.stats["download"].add(0.0, error=True)
+            finally:
+                self._todo.task_done()
+
+    def _download_one(self, unit: _Unit) -> None:
+        pending = [d for d in unit.dates if not self._cache.is_imported(unit.url, d)]
+        if not pending:
+            with self._skip_lock:
+                self.skipped += 1
+            return
+        t0 = time.perf_counter()
+        path = self._cache.fetch(unit.url)
+        if path is None and unit.daily_fallback:
+            # 月度缺失（如月中上市），拆成日度归档重新排队
+            for url, ds in unit.daily_fallback:
+                self._todo.put(_Unit(unit.kind, unit.symbol, url, ds))
+            self.stats["download"].add(time.perf_counter() - t0)
+            return
+        self.stats["download"].add(time.perf_counter() - t0, nbytes=path.stat().st_size if path else 0,
+                                   error=path is None)
+        if path is not None:
+            self._downloaded.put((unit, path))
+
+    def _parse_loop(self, pool: ProcessPoolExecutor) -> None:
+        while True:
+            item = self._downloaded.get()
+            if item is _STOP:
+                return
+            unit, path = item
+            t0 = time.perf_counter()
+            try:
+                if unit.kind == "klines":
+                    fut = pool.submit(_parse_kline_archive, str(path), unit.symbol, settings.db_exchange,
+                                      min(unit.dates), max(unit.dates))
+                else:
+                    fut = pool.submit(_parse_metrics_archive, str(path), unit.symbol, min(unit.dates), max(unit.dates))
+                data, n, rows_by_day = fut.result()
+            except Exception as e:
+                logger.warning("[%s] 解析失败 %s: %s", unit.symbol, unit.url, e)
+                self.stats["parse"].add(time.perf_counter() - t0, error=True)
+                continue
+            self.stats["parse"].add(time.perf_counter() - t0, rows=n)
+            self._parsed.put((unit, data, n, rows_by_day))
+
+    def _load_loop(self) -> None:
+        while True:
+            item = self._parsed.get()
+            if item is _STOP:
+                return
+            unit, data, n, rows_by_day = item
+            t0 = time.perf_counter()
+            try:
+                if n:
+                    if unit.kind == "klines":
+                        self._ts.upsert_candles_binary("1m", KLINE_COPY_COLS, data)
+                    else:
+                        self._ts.upsert_metrics(data)
+                    metrics.inc("rows_written", n)
+                for d in unit.dates:
+                    if rows_by_day.get(d.isoformat()):  # 未写入行的日期不记索引，下次重试
+                        self._cache.mark_imported(unit.url, d, rows_by_day[d.isoformat()])
+            except Exception as e:
+                logger.warning("[%s] 入库失败 %s: %s", unit.symbol, unit.url, e)
+                self.stats["load"].add(time.perf_counter() - t0, error=True)
+                continue
+            self.stats["load"].add(time.perf_counter() - t0, rows=n, nbytes=len(data) if unit.kind == "klines" else 0)
+
+    def _report(self, t0: float, stop: threading.Event, every: float = 30.0) -> None:
+        while not stop.wait(every):
+            elapsed = time.perf_counter() - t0
+            logger.info("进度 %.0fs | 跳过 %d | 队列 下载=%d 解析=%d 入库=%d", elapsed, self.skipped,
+                        self._todo.qsize(), self._downloaded.qsize(), self._parsed.qsize())
+            for s in self.stats.values():
+                logger.info("  %s", s.summary(elapsed))
+
+    # ---------- 主流程 ----------
+    def _run_stages(self) -> None:
+        for unit in self._units():
+            self._todo.put(unit)
+        logger.info("冷启动: %d 个归档任务, 下载=%d 解析=%d 入库=%d",
+                    self._todo.qsize(), self._download_workers, self._parse_workers, self._load_workers)
+
+        def start(target, n, *args) -> List[threading.Thread]:
+            threads = [threading.Thread(target=target, args=args, daemon=True) for _ in range(n)]
+            for t in threads:
+                t.start()
+            return threads
+
+        # spawn 避免在多线程进程中 fork
+        with ProcessPoolExecutor(self._parse_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            loaders = start(self._load_loop, self._load_workers)
+            parsers = start(self._parse_loop, self._parse_workers, pool)
+            downloaders = start(self._download_loop, self._download_workers)
+
+            # 日度降级任务会在下载阶段回填 _todo，全部处理完后再逐级发结束标记
+            self._todo.join()
+            for stage_threads, q in ((downloaders, self._todo), (parsers, self._downloaded), (loaders, self._parsed)):
+                for _ in stage_threads:
+                    q.put(_STOP)
+                for t in stage_threads:
+                    t.join()
+
+    def run(self) -> Dict[str, object]:
+        t0 = time.perf_counter()
+        paused = self._ts.pause_jobs()
+        logger.info("已暂停 %d 个压缩/连续聚合作业", len(paused))
+        stop = threading.Event()
+        threading.Thread(target=self._report, args=(t0, stop), daemon=True).start()
+        try:
+            self._run_stages()
+        finally:
+            stop.set()
+            self._ts.resume_jobs(paused)
+
+        # 导入窗口的连续聚合一次性刷新（策略只覆盖近期窗口，历史部分需显式物化）
+        window = (datetime.combine(self._start, datetime.min.time(), tzinfo=timezone.utc),
+                  datetime.combine(self._end + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc))
+        tables = (["candles_1m"] if "klines" in self._kinds else []) + ([METRICS_TABLE] if "metrics" in self._kinds else [])
+        for table in tables:
+            for view in self._ts.continuous_aggregates(table):
+                t1 = time.perf_counter()
+                try:
+                    self._ts.refresh_continuous_aggregate(view, *window)
+                    logger.info("刷新连续聚合 %s 耗时 %.1fs", view, time.perf_counter() - t1)
+                except Exception as e:
+                    logger.warning("刷新连续聚合 %s 失败: %s", view, e)
+
+        elapsed = time.perf_counter() - t0
+        for s in self.stats.values():
+            logger.info("完成 %s", s.summary(elapsed))
+        return {"elapsed": elapsed, "skipped": self.skipped,
+                **{name: {"items": s.items, "rows": s.rows, "bytes": s.bytes, "errors": s.errors, "busy": s.busy}
+                   for name, s in self.stats.items()}}
+
+    def close(self) -> None:
+        self._ts.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="历史数据冷启动")
+    parser.add_argument("--symbols", type=str, help="交易对列表(逗号分隔)，默认全部")
+    parser.add_argument("--months", type=int, default=12, help="回溯月数")
+    parser.add_argument("--start", type=str, help="起始日期 YYYY-MM-DD（覆盖 --months）")
+    parser.add_argument("--klines", action="store_true", help="仅 K 线")
+    parser.add_argument("--metrics", action="store_true", help="仅期货指标")
+    parser.add_argument("--download-workers", type=int, default=8)
+    parser.add_argument("--parse-workers", type=int, default=None)
+    parser.add_argument("--load-workers", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    end = date.today() - timedelta(days=1)
+    start = date.fromisoformat(args.start) if args.start else end - timedelta(days=30 * args.months)
+    kinds = [k for k, on in (("klines", args.klines), ("metrics", args.metrics)) if on] or ["klines", "metrics"]
+    symbols = args.symbols.split(",") if args.symbols else load_symbols(settings.ccxt_exchange)
+
+    pipeline = BootstrapPipeline(symbols, start, end, kinds, args.download_workers, args.parse_workers, args.load_workers)
+    try:
+        print(f"\n结果: {pipeline.run()}")
+    finally:
+        pipeline.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""连续聚合按写入窗口刷新 + 采集水位发布
+
+- 监听 TimescaleAdapter 的写入，记录源表每批实际写入的桶时间范围
+- 范围按各连续聚合的桶宽外扩对齐后合并，限频调用 refresh_continuous_aggregate，只刷新写过的窗口
+- 只物化已闭合的桶（未闭合桶由实时聚合提供），未闭合部分保留到闭合后再刷
+- 源表闭合时间推进后，发布 "表 X 已闭合并物化至 T" 水位 (market_data.ingest_watermarks)
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from adapters.timescale import METRICS_TABLE, TimescaleAdapter
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 源表 → (基础周期, 时间列是否为 timestamptz)
+SOURCES: Dict[str, Tuple[timedelta, bool]] = {
+    "candles_1m": (timedelta(minutes=1), True),
+    METRICS_TABLE: (timedelta(minutes=5), False),
+}
+
+# 视图名中的桶宽：candles_5m / candles_meta_1h / metrics_1d / binance_futures_metrics_4h_last / candles_1M
+_WIDTH_RE = re.compile(r"_(\d+)([mhdwM])(?:_last)?$")
+_UNIT = {"m": timedelta(minutes=1), "h": timedelta(hours=1), "d": timedelta(days=1), "w": timedelta(days=7)}
+# time_bucket 默认对齐原点（周一），按月分桶从 2000-01 起算
+_ORIGIN = datetime(2000, 1, 3, tzinfo=timezone.utc)
+
+Width = Tuple[int, str]
+Range = Tuple[datetime, datetime]
+
+
+def view_width(view_name: str) -> Optional[Width]:
+    m = _WIDTH_RE.search(view_name)
+    return (int(m.group(1)), m.group(2)) if m else None
+
+
+def floor_bucket(ts: datetime, width: Width) -> datetime:
+    n, unit = width
+    if unit == "M":
+        months = (ts.year - 2000) * 12 + ts.month - 1
+        months -= months % n
+        return datetime(2000 + months // 12, months % 12 + 1, 1, tzinfo=timezone.utc)
+    step = _UNIT[unit] * n
+    return _ORIGIN + ((ts - _ORIGIN) // step) * step
+
+
+def ceil_bucket(ts: datetime, width: Width) -> datetime:
+    start = floor_bucket(ts, width)
+    if start == ts:
+        return ts
+    n, unit = width
+    if unit == "M":
+        months = start.year * 12 + start.month - 1 + n
+        return datetime(months // 12, months % 12 + 1, 1, tzinfo=timezone.utc)
+    return start + _UNIT[unit] * n
+
+
+def _utc(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+
+def _merge(ranges: List[Range], new: Range) -> List[Range]:
+    """合并重叠/相邻区间，保持有序"""
+    out: List[Range] = []
+    start, end = new
+    for s, e in sorted(ranges):
+        if e < start or s > end:
+            out.append((s, e))
+        else:
+            start, end = min(s, start), max(e, end)
+    out.append((start, end))
+    return sorted(out)
+
+
+class CaggRefresher:
+    """按写入窗口刷新连续聚合并发布水位
+
+    note() 由写入监听调用，advance() 由实时采集在源表某时间点之前全部写完时调用；
+    flush() 执行实际刷新，后台线程模式下最短间隔 min_interval 秒，期间的写入合并为一次刷新。
+    """
+
+    def __init__(self, ts: TimescaleAdapter, min_interval: Optional[float] = None):
+        self._ts = ts
+        self._min_interval = settings.cagg_refresh_interval if min_interval is None else min_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._dirty: Dict[str, List[Range]] = {}     # 源表 → 新写入范围（尚未分发到视图）
+        self._closed: Dict[str, datetime] = {}       # 源表 → 已闭合至
+        self._views: Dict[str, List[Tuple[str, Width]]] = {}
+        self._pending: Dict[str, List[Range]] = {}   # 视图 → 已对齐、待刷新范围
+        self._published: Dict[str, datetime] = {}
+        self._last_flush = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if self.enabled:
+            ts.add_write_listener(self.note)
+
+    @property
+    def enabled(self) -> bool:
+        """min_interval <= 0 时关闭，连续聚合仅依赖 Timescale 自身的刷新策略"""
+        return self._min_interval > 0
+
+    # ==================== 记录 ====================
+    def note(self, table_name: str, lo: datetime, hi: datetime) -> None:
+        """记录源表写入的桶范围 [lo, hi]"""
+        if table_name not in SOURCES:
+            return
+        step = SOURCES[table_name][0]
+        with self._lock:
+            self._dirty[table_name] = _merge(self._dirty.get(table_name, []), (_utc(lo), _utc(hi) + step))
+        self._wake.set()
+
+    def advance(self, table_name: str, closed_through: datetime) -> None:
+        """源表早于 closed_through 的桶均已写入"""
+        if not self.enabled:
+            return
+        closed_through = _utc(closed_through)
+        with self._lock:
+            if table_name not in self._closed or closed_through > self._closed[table_name]:
+                self._closed[table_name] = closed_through
+        self._wake.set()
+
+    # ==================== 刷新 ====================
+    def _views_of(self, table_name: str) -> List[Tuple[str, Width]]:
+        if table_name not in self._views:
+            views = []
+            for view in self._ts.continuous_aggregates(table_name):
+                width = view_width(view)
+                if width:
+                    views.append((view, width))
+                else:
+                    logger.debug("无法识别桶宽，跳过连续聚合 %s", view)
+            self._views[table_name] = views
+        return self._views[table_name]
+
+    def flush(self) -> int:
+        """刷新已闭合的待刷新窗口并发布水位，返回 refresh 调用次数"""
+        if not self.enabled:
+            return 0
+        with self._flush_lock:
+            self._last_flush = time.monotonic()
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+                closed = dict(self._closed)
+
+            calls = 0
+            now = datetime.now(timezone.utc)
+            marks: Dict[str, datetime] = {}
+            backlog = {t for t, views in self._views.items() if any(self._pending.get(v) for v, _ in views)}
+            for table_name in set(dirty) | set(closed) | backlog:
+                try:
+                    views = self._views_of(table_name)
+                except Exception as e:
+                    logger.warning("查询连续聚合失败 %s: %s", table_name, e)
+                    with self._lock:
+                        for r in dirty.get(table_name, []):
+                            self._dirty[table_name] = _merge(self._dirty.get(table_name, []), r)
+                    continue
+
+                aware = SOURCES[table_name][1]
+                limit = closed.get(table_name, now)
+                for view, width in views:
+                    pending = self._pending.get(view, [])
+                    for s, e in dirty.get(table_name, []):
+                        pending = _merge(pending, (floor_bucket(s, width), ceil_bucket(e, width)))
+
+                    # 只物化已闭合的桶，跨越未闭合桶的部分留待下次
+                    closed_end = floor_bucket(limit, width)
+                    remaining: List[Range] = []
+                    for s, e in pending:
+                        end = min(e, closed_end)
+                        if s >= end:
+                            remaining.append((s, e))
+                            continue
+                        try:
+                            args = (s, end) if aware else (s.replace(tzinfo=None), end.replace(tzinfo=None))
+                            self._ts.refresh_continuous_aggregate(view, *args)
+                            calls += 1
+                            if e > end:
+                                remaining.append((end, e))
+                        except Exception as ex:
+                            logger.warning("刷新连续聚合 %s [%s, %s) 失败: %s", view, s, end, ex)
+                            remaining.append((s, e))
+                    self._pending[view] = remaining
+
+                    if table_name in closed and not any(s < closed_end for s, _ in remaining):
+                        marks[view] = closed_end
+                if table_name in closed:
+                    marks[table_name] = closed[table_name]
+
+            marks = {k: v for k, v in marks.items() if self._published.get(k) != v}
+            if marks:
+                try:
+                    self._ts.publish_watermarks(marks)
+                    self._published.update(marks)
+                except Exception as e:
+                    logger.warning("发布水位失败: %s", e)
+            if calls:
+                logger.debug("刷新连续聚合 %d 次，发布水位 %d 个", calls, len(marks))
+            return calls
+
+    # ==================== 后台线程 ====================
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(max(self._min_interval, 1.0))
+            self._wake.clear()
+            # 限频：距上次刷新不足 min_interval 时等待，期间的写入并入同一次刷新
+            delay = self._last_flush + self._min_interval - time.monotonic()
+            if delay > 0 and self._stop.wait(delay):
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("连续聚合刷新异常: %s", e)
+
+    def start(self) -> None:
+        if self._thread is None and self.enabled:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程并执行最后一次刷新"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+            self._thread = None
+        self.flush()
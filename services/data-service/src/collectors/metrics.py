@@ -5,7 +5,7 @@ import logging
 import sys
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from pathlib import Path
 from typing import List, Optional, Sequence
@@ -17,7 +17,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from adapters.ccxt import load_symbols
 from adapters.metrics import Timer, metrics
 from adapters.rate_limiter import acquire, parse_ban, release, set_ban
-from adapters.timescale import TimescaleAdapter
+from adapters.timescale import METRICS_TABLE, TimescaleAdapter
+from collectors.cagg_refresh import CaggRefresher
 from config import settings
 
 logger = logging.getLogger(__name__)
@@ -46,6 +47,7 @@ class MetricsCollector:
 
     def __init__(self, workers: int = 8):
         self._ts = TimescaleAdapter()
+        self._refresher = CaggRefresher(self._ts)
         self._workers = workers
         self._proxies = {"http": settings.http_proxy, "https": settings.http_proxy} if settings.http_proxy else {}
 
@@ -137,6 +139,9 @@ class MetricsCollector:
             return 0
         n = self._ts.upsert_metrics(rows)
         metrics.inc("rows_written", n)
+        # 统计接口只返回已结束的 5m 周期，写入即闭合
+        self._refresher.advance(METRICS_TABLE, max(r["create_time"] for r in rows) + timedelta(minutes=5))
+        self._refresher.flush()
         return n
 
     def run_once(self, symbols: Optional[Sequence[str]] = None) -> int:
@@ -4,11 +4,15 @@
 - cryptofeed 每分钟闭合时，~300 个币种在 1-2 秒内推送
 - 使用时间窗口批量写入：收集 3 秒内的数据后一次性写入
 - 避免 300 次单独 DB 操作 → 1 次批量操作
+- 流内缺口检测：跟踪每个符号最后的 bucket，跳分钟/静默超时即产出精确区间，直接进入补齐队列
+- 全表缺口扫描降级为低频兜底
+- 每批写入后按写入窗口刷新高周期连续聚合，并推进采集水位
 """
 from __future__ import annotations
 
 import asyncio
 import logging
+import queue
 import sys
 import threading
 import time
@@ -22,11 +26,60 @@ from adapters.ccxt import load_symbols, normalize_symbol
 from adapters.cryptofeed import BinanceWSAdapter, CandleEvent, preload_symbols
 from adapters.metrics import metrics
 from adapters.timescale import TimescaleAdapter
-from config import settings
+from collectors.cagg_refresh import CaggRefresher
+from config import INTERVAL_TO_MS, GapTask, settings
 
 logger = logging.getLogger("ws.collector")
 
 
+class StreamGapTracker:
+    """流内缺口检测 - 跟踪每个符号最后一根闭合 K 线的 bucket
+
+    - observe: 新 bucket 与上一个之间跳过了分钟 → 返回缺口区间
+    - check_silent: 符号超过 silence 秒未推送 → 返回静默区间（每段静默只报告一次，恢复推送后由 observe 接续）
+    """
+
+    def __init__(self, interval: str = "1m", silence: float = 180):
+        self._step = INTERVAL_TO_MS[interval] // 1000
+        self._silence = silence
+        self._last: Dict[str, int] = {}   # symbol -> 最后 bucket (秒)
+        self._silent: Set[str] = set()    # 已报告静默、尚未恢复的符号
+        self._lock = threading.Lock()
+
+    def _task(self, symbol: str, start: int, end: int) -> GapTask:
+        return GapTask(symbol,
+                       datetime.fromtimestamp(start, tz=timezone.utc),
+                       datetime.fromtimestamp(end, tz=timezone.utc))
+
+    def observe(self, symbol: str, bucket: float) -> Optional[GapTask]:
+        """记录闭合 K 线，返回与上一根之间的缺口 [上一根+1, 本根)"""
+        bucket = int(bucket)
+        with self._lock:
+            last = self._last.get(symbol)
+            if last is not None and bucket <= last:
+                return None  # 重复或乱序
+            self._last[symbol] = bucket
+            self._silent.discard(symbol)
+            if last is None or bucket - last <= self._step:
+                return None
+            return self._task(symbol, last + self._step, bucket)
+
+    def check_silent(self, now: Optional[float] = None) -> List[GapTask]:
+        """返回静默超时符号的缺口 [上一根+1, 最近已闭合 bucket+1)"""
+        now = time.time() if now is None else now
+        closed_end = int(now) // self._step * self._step  # 最近已闭合 bucket 的结束时刻
+        tasks = []
+        with self._lock:
+            for symbol, last in self._last.items():
+                if symbol in self._silent or now - (last + self._step) < self._silence:
+                    continue
+                if closed_end > last + self._step:
+                    tasks.append(self._task(symbol, last + self._step, closed_end))
+                    self._last[symbol] = closed_end - self._step
+                self._silent.add(symbol)
+        return tasks
+
+
 class WSCollector:
     """WebSocket 1m K线采集器 - 时间窗口批量写入
 
@@ -43,6 +96,13 @@ class WSCollector:
         self._gap_stop = threading.Event()
         self._gap_thread: Optional[threading.Thread] = None
 
+        # 流内缺口检测 → 补齐队列
+        self._tracker = StreamGapTracker("1m", settings.ws_gap_silence)
+        self._gap_queue: "queue.Queue[GapTask]" = queue.Queue()
+
+        # 写入窗口 → 连续聚合刷新 + 水位
+        self._refresher = CaggRefresher(self._ts)
+
         # 批量写入缓冲
         self._buffer: List[dict] = []
         self._buffer_lock = asyncio.Lock()
@@ -78,6 +138,12 @@ class WSCollector:
             "taker_buy_quote_volume": float(e.taker_buy_quote_volume) if e.taker_buy_quote_volume else None,
         }
 
+        gap = self._tracker.observe(sym, e.timestamp)
+        if gap:
+            metrics.inc("gaps_found")
+            logger.info("[%s] 流内缺口 %s ~ %s", sym, gap.gap_start, gap.gap_end)
+            self._gap_queue.put_nowait(gap)
+
         async with self._buffer_lock:
             self._buffer.append(row)
             self._last_candle_time = time.monotonic()
@@ -110,6 +176,8 @@ class WSCollector:
             n = await asyncio.to_thread(self._ts.upsert_candles, "1m", rows)
             metrics.inc("rows_written", n)
             logger.debug("批量写入 %d 条 K 线", n)
+            # 推送的均为闭合 K 线，最新一批写完即视为该分钟已闭合
+            self._refresher.advance("candles_1m", max(r["bucket_ts"] for r in rows) + timedelta(minutes=1))
         except Exception as e:
             logger.error("批量写入失败: %s", e)
 
@@ -119,7 +187,11 @@ class WSCollector:
         if self._symbols:
             threading.Thread(target=self._run_backfill, args=(1,), daemon=True).start()
 
-        # 启动周期巡检线程
+        # 流内缺口补齐线程
+        threading.Thread(target=self._gap_worker, daemon=True).start()
+        self._refresher.start()
+
+        # 启动低频全表巡检线程 (兜底)
         if settings.ws_gap_interval > 0:
             self._gap_stop.clear()
             self._gap_thread = threading.Thread(target=self._gap_loop, daemon=True)
@@ -135,6 +207,7 @@ class WSCollector:
             # 退出前刷新
             asyncio.run(self._final_flush())
             self._gap_stop.set()
+            self._refresher.stop()
             self._ts.close()
 
     def _on_candle_sync(self, e: CandleEvent) -> None:
@@ -154,8 +227,41 @@ class WSCollector:
         async with self._buffer_lock:
             await self._flush()
 
+    def _gap_worker(self) -> None:
+        """消费流内缺口队列 - 用 REST 按精确区间补齐，同时定期检查静默符号"""
+        from collectors.backfill import RestBackfiller
+
+        rest = RestBackfiller(self._ts, workers=2)
+        check_every = max(10.0, settings.ws_gap_silence / 3)
+        next_check = time.monotonic() + check_every
+
+        while not self._gap_stop.is_set():
+            if time.monotonic() >= next_check:
+                next_check = time.monotonic() + check_every
+                for gap in self._tracker.check_silent():
+                    metrics.inc("gaps_found")
+                    logger.info("[%s] 静默缺口 %s ~ %s", gap.symbol, gap.gap_start, gap.gap_end)
+                    self._gap_queue.put_nowait(gap)
+
+            try:
+                tasks = [self._gap_queue.get(timeout=1.0)]
+            except queue.Empty:
+                continue
+            # 合并同一时刻积压的任务，一次并行补齐
+            while True:
+                try:
+                    tasks.append(self._gap_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                filled = rest.fill_gap_tasks(tasks, "1m")
+                metrics.inc("gaps_filled", filled)
+            except Exception as e:
+                logger.error("流内缺口补齐失败: %s", e)
+
     def _gap_loop(self) -> None:
-        """智能缺口巡检 - 增量检查 + 自适应回溯"""
+        """智能缺口巡检 (低频兜底) - 增量检查 + 自适应回溯"""
         lookback_days = 2  # 固定回溯 2 天 (今天+昨天+前天)
         unfillable: Set[tuple] = set()  # 缓存无法补齐的缺口 (symbol, date)
 
@@ -44,7 +44,10 @@ class Settings:
         "DATA_SERVICE_DATA_DIR", str(PROJECT_ROOT / "libs" / "database" / "csv")
     )))
 
-    ws_gap_interval: int = field(default_factory=lambda: _int_env("BINANCE_WS_GAP_INTERVAL", 600))
+    # 全表缺口巡检间隔（秒）：流内检测为主，全表扫描仅作兜底
+    ws_gap_interval: int = field(default_factory=lambda: _int_env("BINANCE_WS_GAP_INTERVAL", 21600))
+    # 单个符号超过该秒数未推送闭合 K 线即视为静默缺口
+    ws_gap_silence: int = field(default_factory=lambda: _int_env("BINANCE_WS_GAP_SILENCE", 180))
     ws_gap_lookback: int = field(default_factory=lambda: _int_env("BINANCE_WS_GAP_LOOKBACK", 10080))
     ws_source: str = field(default_factory=lambda: os.getenv("BINANCE_WS_SOURCE", "binance_ws"))
 
@@ -52,6 +55,11 @@ class Settings:
     db_exchange: str = field(default_factory=lambda: os.getenv("BINANCE_WS_DB_EXCHANGE", "binance_futures_um"))
     ccxt_exchange: str = field(default_factory=lambda: os.getenv("BINANCE_WS_CCXT_EXCHANGE", "binance"))
 
+    # 批量写入使用二进制 COPY + 复用暂存表（设为 0 回退到文本 COPY）
+    copy_binary: bool = field(default_factory=lambda: os.getenv("DATA_SERVICE_COPY_BINARY", "1").lower() not in ("0", "false", "no"))
+    # 按写入窗口刷新连续聚合的最短间隔（秒），期间的写入合并刷新；设为 0 仅依赖 Timescale 刷新策略
+    cagg_refresh_interval: int = field(default_factory=lambda: _int_env("DATA_SERVICE_CAGG_REFRESH_INTERVAL", 10))
+
     def __post_init__(self):
         self.log_dir.mkdir(parents=True, exist_ok=True)
         self.data_dir.mkdir(parents=True, exist_ok=True)
@@ -69,7 +77,7 @@ INTERVAL_TO_MS = {
 
 @dataclass(slots=True)
 class GapTask:
-    """缺口任务"""
+    """缺口任务，区间为 [gap_start, gap_end)"""
     symbol: str
     gap_start: datetime
     gap_end: datetime
@@ -24,6 +24,7 @@ try:
         register_ai_handlers,
         run_analysis,
         PromptRegistry,
+        StreamingReply,
     )
     from src.bot.handler import match_ai_trigger
     AI_SERVICE_AVAILABLE = True
@@ -34,6 +35,7 @@ except ImportError:
     register_ai_handlers = None
     run_analysis = None
     PromptRegistry = None
+    StreamingReply = None
     match_ai_trigger = None
 
 __all__ = [
@@ -42,6 +44,7 @@ __all__ = [
     "register_ai_handlers",
     "run_analysis",
     "PromptRegistry",
+    "StreamingReply",
     "SELECTING_COIN",
     "SELECTING_INTERVAL",
     "AI_SERVICE_AVAILABLE",
@@ -8,7 +8,6 @@ import os
 import sys
 import asyncio
 import logging
-import requests
 import time
 import json
 import threading
@@ -72,7 +71,10 @@ from libs.common.i18n import build_i18n_from_env
 if __name__ == "__main__":
     sys.modules.setdefault("main", sys.modules[__name__])
 
+from bot.binance_async import AsyncBinanceClient
+from bot.cache_store import CacheStore, PersistentCache
 from cards import RankingRegistry
+from cards.render_cache import freeze, get_render_cache
 
 # ==== 数据库指标服务（可选） ==============================================
 # 前端仅消费本地 CSV/SQLite 时不需要连接 Postgres/Timescale。
@@ -398,8 +400,9 @@ def format_beijing_time(dt_str, format_str="%Y-%m-%d %H:%M:%S"):
 
 # 配置（全部改由环境变量管理）
 BOT_TOKEN = _require_env('BOT_TOKEN', required=True)
-BINANCE_FUTURES_URL = 'https://fapi.binance.com'
-BINANCE_SPOT_URL = 'https://api.binance.com'
+# 可指向本地桩服务做测试
+BINANCE_FUTURES_URL = os.getenv('BINANCE_FUTURES_URL') or 'https://fapi.binance.com'
+BINANCE_SPOT_URL = os.getenv('BINANCE_SPOT_URL') or 'https://api.binance.com'
 BINANCE_API_DISABLED = _require_env('BINANCE_API_DISABLED', default='1') == '1'
 
 # 屏蔽币种（动态获取，支持热更新）
@@ -421,9 +424,11 @@ CACHE_DIR = os.path.join(DATA_DIR, "cache")  # 缓存目录
 # 确保数据目录存在
 os.makedirs(DATA_DIR, exist_ok=True)
 
-# 全局缓存
-cache = {}
+# 全局缓存（按键持久化到 SQLite，访问时懒加载）
+cache = PersistentCache(max_age=600)
 CACHE_DURATION = 60
+CACHE_DB_FILE = os.path.join(CACHE_DIR, 'cache_data.db')
+# 旧版整文件 JSON 缓存，仅用于首次启动迁移
 CACHE_FILE_PRIMARY = os.path.join(CACHE_DIR, 'cache_data_primary.json')
 CACHE_FILE_SECONDARY = os.path.join(CACHE_DIR, 'cache_data_secondary.json')
 
@@ -661,18 +666,32 @@ def build_pattern_keyboard_with_periods(enabled_periods: dict, update=None) -> I
 
 
 def render_single_snapshot(symbol: str, panel: str, enabled_periods: dict, enabled_cards: dict, page: int = 0, lang: str | None = None) -> tuple[str, object, int, int]:
-    """封装渲染 + 键盘构建，便于重用。返回(text, keyboard, pages, page_used)。"""
+    """封装渲染 + 键盘构建，便于重用。返回(text, keyboard, pages, page_used)。
+
+    同一数据版本内相同 (币种, 面板, 周期/卡片开关, 页码, 语言) 直接复用渲染结果。
+    """
     from bot.single_token_snapshot import SingleTokenSnapshot
-    snap = SingleTokenSnapshot()
-    text, pages = snap.render_table(
-        symbol,
-        panel=panel,
-        enabled_periods=enabled_periods,
-        enabled_cards=enabled_cards,
-        page=page,
-        lang=lang,
+    from cards.data_provider import get_ranking_provider
+
+    def render():
+        snap = SingleTokenSnapshot()
+        text, pages = snap.render_table(
+            symbol,
+            panel=panel,
+            enabled_periods=enabled_periods,
+            enabled_cards=enabled_cards,
+            page=page,
+            lang=lang,
+        )
+        keyboard = build_single_snapshot_keyboard(enabled_periods, panel, enabled_cards, page=page, pages=pages)
+        return text, keyboard, pages
+
+    key = (
+        "single_snapshot", (symbol or "").strip().upper(), panel,
+        freeze(enabled_periods), freeze(enabled_cards), page, lang,
+        get_ranking_provider().data_version(),
     )
-    keyboard = build_single_snapshot_keyboard(enabled_periods, panel, enabled_cards, page=page, pages=pages)
+    text, keyboard, pages = get_render_cache().get_or_render(key, render)
     return text, keyboard, pages, page
 
 # 🤖 AI分析模块已下线（历史依赖 pandas/numpy/pandas-ta）。
@@ -841,44 +860,23 @@ class DataManager:
         return {"issues_found": [], "fixes_applied": [], "success": True}
 
 class BinanceFuturesClient:
-    """币安合约API客户端 - 基于官方API文档v1.0"""
+    """币安合约API客户端 - 基于官方API文档v1.0
+
+    请求统一走 AsyncBinanceClient：共享 keep-alive 连接池，相同请求合并、短时缓存，退避不阻塞线程。
+    同步方法保留给线程池中的旧调用方，异步调用方直接使用 self.aio。
+    """
 
     def __init__(self):
         self.base_url = BINANCE_FUTURES_URL
         self.spot_url = BINANCE_SPOT_URL
-
-        # 优化连接池配置
-        adapter = requests.adapters.HTTPAdapter(
-            pool_connections=10,  # 连接池数量
-            pool_maxsize=20,      # 最大连接数
-            max_retries=0,        # 禁用自动重试，我们自己控制
-            pool_block=False      # 非阻塞连接池
-        )
-
-        self.session = requests.Session()
-        self.session.mount('https://', adapter)
-        self.session.mount('http://', adapter)
-
-        # 配置SSL验证
-        if CERTIFI_AVAILABLE:
-            self.session.verify = certifi.where()
-        else:
-            self.session.verify = True  # 使用系统默认证书
-
-        # 优化请求头
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'application/json',
-            'Content-Type': 'application/json',
-            'Connection': 'keep-alive'  # 保持连接活跃
-        })
+        self.aio = AsyncBinanceClient(self.base_url, self.spot_url)
 
         # 缓存交易规则信息
         self._exchange_info = None
         self._exchange_info_timestamp = 0
 
     def make_request_with_retry(self, endpoint, params=None, max_retries=2, timeout=8, fast_mode=False):
-        """带重试机制的请求方法 - 优化版本"""
+        """带重试机制的请求方法（同步接口，实际请求在共享的异步客户端上执行）"""
         # 如果禁用了 Binance API，直接返回 None
         if BINANCE_API_DISABLED:
             logger.debug(f"Binance API 已禁用，跳过请求: {endpoint}")
@@ -889,54 +887,28 @@ class BinanceFuturesClient:
             timeout = min(timeout, 5)
             max_retries = 1
 
-        for attempt in range(max_retries):
-            try:
-                # 根据endpoint选择正确的base URL
-                if endpoint.startswith('/fapi/'):
-                    url = f"{self.base_url}{endpoint}"
-                elif endpoint.startswith('/futures/'):
-                    url = f"{self.base_url}{endpoint}"
-                else:
-                    url = f"{self.spot_url}{endpoint}"
-
-                logger.info(f"请求 {url} (第{attempt+1}次) - 参数: {params} - 超时: {timeout}s")
-                response = self.session.get(url, params=params, timeout=timeout)
-
-                # 检查响应状态
-                if response.status_code == 429:
-                    # 请求频率限制 - 优化等待时间
-                    retry_after = min(int(response.headers.get('Retry-After', 30)), 30)  # 最大等待30秒
-                    if fast_mode:
-                        retry_after = min(retry_after, 5)  # 快速模式最大等待5秒
-                    logger.warning(f"请求频率限制，等待 {retry_after} 秒")
-                    time.sleep(retry_after)
-                    continue
-
-                response.raise_for_status()
-                data = response.json()
+        try:
+            return self.aio.request_sync(endpoint, params, max_retries=max_retries, timeout=timeout)
+        except Exception as e:
+            logger.error(f"请求 {endpoint} 失败: {e}")
+            return []
 
-                # 验证返回数据
-                if isinstance(data, dict) and 'code' in data and data['code'] != 200:
-                    logger.warning(f"API返回错误: {data}")
-                    if attempt < max_retries - 1:
-                        time.sleep((attempt + 1) * 2)
-                        continue
+    async def request(self, endpoint, params=None, max_retries=2, timeout=8):
+        """异步请求，语义同 make_request_with_retry"""
+        if BINANCE_API_DISABLED:
+            logger.debug(f"Binance API 已禁用，跳过请求: {endpoint}")
+            return None
+        try:
+            return await self.aio.request(endpoint, params, max_retries=max_retries, timeout=timeout)
+        except Exception as e:
+            logger.error(f"请求 {endpoint} 失败: {e}")
+            return []
 
-                logger.info(f"请求成功，返回 {len(data) if isinstance(data, list) else 1} 条数据")
-                return data
-
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"第{attempt+1}次请求失败: {e}")
-                if attempt < max_retries - 1:
-                    wait_time = min((attempt + 1) * 1, 5)  # 减少等待时间，最大5秒
-                    if fast_mode:
-                        wait_time = min(wait_time, 2)  # 快速模式最大等待2秒
-                    logger.info(f"等待 {wait_time} 秒后重试...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"所有重试失败，最终错误: {e}")
+    async def get_24hr_ticker_async(self):
+        return await self.request('/fapi/v1/ticker/24hr')
 
-        return []
+    async def get_premium_index_async(self):
+        return await self.request('/fapi/v1/premiumIndex')
 
     def ping(self):
         """测试服务器连通性"""
@@ -2292,10 +2264,17 @@ class TradeCatBot:
         self._active_symbols_timestamp = 0
         self._is_initialized = False
         self._initialization_lock = asyncio.Lock() if 'asyncio' in globals() else None
-        # 双缓存文件机制
+        # 按键持久化缓存：启动时只读键索引，缓存项首次访问时才解码，可立即对外服务
         self.cache_file_primary = CACHE_FILE_PRIMARY
         self.cache_file_secondary = CACHE_FILE_SECONDARY
-        self._current_cache_file = self.cache_file_primary  # 当前使用的缓存文件
+        self._current_cache_file = CACHE_DB_FILE
+        self.cache_store = None
+        try:
+            self.cache_store = CacheStore(CACHE_DB_FILE)
+            fresh = cache.attach(self.cache_store)
+            logger.info(f"📄 缓存库 {CACHE_DB_FILE} 就绪，{fresh} 个有效缓存项待按需加载")
+        except Exception as e:
+            logger.error(f"❌ 打开缓存库失败，仅使用内存缓存: {e}")
         self._is_updating = False  # 是否正在更新缓存
         self.metric_service = BINANCE_DB_METRIC_SERVICE
         if self.metric_service is None:
@@ -2334,135 +2313,47 @@ class TradeCatBot:
         return [file_path for file_path, _ in cache_files]
 
     def load_cache_from_file(self):
-        """从文件加载缓存数据 - 支持双缓存文件机制"""
-        global cache
-
-        available_files = self.get_available_cache_files()
-        if not available_files:
-            logger.info("📄 没有找到缓存文件，将创建新的缓存")
+        """确认持久化缓存可用；缓存库为空时从旧版 JSON 缓存文件迁移一次"""
+        if self.cache_store is None:
             return False
 
-        # 尝试从最新的缓存文件加载
-        for cache_file in available_files:
+        now = time.time()
+        index = self.cache_store.index()
+        if index:
+            fresh = sum(1 for ts in index.values() if now - ts < cache.max_age)
+            logger.info(f"📄 缓存库共 {len(index)} 项，其中 {fresh} 项在有效期内")
+            return fresh > 0
+
+        for cache_file in self.get_available_cache_files():
             try:
-                logger.info(f"📄 尝试从缓存文件加载: {cache_file}")
+                logger.info(f"📄 从旧版缓存文件迁移: {cache_file}")
                 with open(cache_file, 'r', encoding='utf-8') as f:
                     file_cache = json.load(f)
-
-                # 检查缓存是否过期
-                now = time.time()
-                valid_cache = {}
-                total_items = len(file_cache)
-
-                for key, cache_item in file_cache.items():
-                    if isinstance(cache_item, dict) and 'timestamp' in cache_item:
-                        # 检查缓存是否在有效期内（扩展到10分钟，允许更长的使用时间）
-                        cache_age = now - cache_item['timestamp']
-                        if cache_age < 600:  # 10分钟有效期
-                            valid_cache[key] = cache_item
-                            logger.debug(f"从文件加载有效缓存: {key} (年龄: {cache_age:.1f}秒)")
-                        else:
-                            logger.debug(f"文件缓存已过期: {key} (年龄: {cache_age:.1f}秒)")
-                    else:
-                        logger.warning(f"无效的缓存格式: {key}")
-
-                if valid_cache:
-                    cache.update(valid_cache)
-                    logger.info(f"✅ 从文件 {cache_file} 加载了 {len(valid_cache)}/{total_items} 个有效缓存项")
-                    self._current_cache_file = cache_file
-                    return True
-                else:
-                    logger.info(f"📄 缓存文件 {cache_file} 中没有有效数据")
-
+                items = [
+                    (key, item) for key, item in file_cache.items()
+                    if isinstance(item, dict) and 'data' in item and 'timestamp' in item
+                ]
+                written = self.cache_store.save(items)
+                fresh = cache.attach(self.cache_store)
+                logger.info(f"✅ 已迁移 {written} 个缓存项，其中 {fresh} 项在有效期内")
+                return fresh > 0
             except Exception as e:
-                logger.error(f"❌ 加载缓存文件失败 {cache_file}: {e}")
+                logger.error(f"❌ 迁移缓存文件失败 {cache_file}: {e}")
                 continue
 
-        logger.warning("❌ 所有缓存文件都无法加载或已过期")
+        logger.info("📄 没有找到缓存数据，将创建新的缓存")
         return False
 
     def save_cache_to_file(self, force_new_file=False):
-        """保存缓存数据到文件 - 双缓存文件机制"""
-        global cache
+        """持久化缓存 - 只写入时间戳变化过的键（force_new_file 保留兼容，已无双文件轮替）"""
         try:
-            # 创建一个可序列化的缓存副本
-            serializable_cache = {}
-            for key, cache_item in cache.items():
-                if isinstance(cache_item, dict) and 'data' in cache_item and 'timestamp' in cache_item:
-                    # 确保数据可以序列化
-                    try:
-                        json.dumps(cache_item['data'])  # 测试序列化
-                        serializable_cache[key] = cache_item
-                    except (TypeError, ValueError) as e:
-                        logger.warning(f"缓存项 {key} 无法序列化，跳过: {e}")
-                        continue
-
-            if not serializable_cache:
-                logger.warning("⚠️ 没有可序列化的缓存数据")
-                return False
-
-            # 选择要写入的缓存文件
-            if force_new_file or self._is_updating:
-                # 如果正在更新或强制使用新文件，则使用备用文件
-                if self._current_cache_file == self.cache_file_primary:
-                    target_file = self.cache_file_secondary
-                else:
-                    target_file = self.cache_file_primary
-            else:
-                # 否则使用当前文件
-                target_file = self._current_cache_file
-
-            # 写入临时文件，然后重命名，确保原子性操作
-            temp_file = target_file + '.tmp'
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(serializable_cache, f, ensure_ascii=False, indent=2)
-
-            # 原子性重命名
-            if os.path.exists(target_file):
-                os.remove(target_file)
-            os.rename(temp_file, target_file)
-
-            # 更新当前使用的缓存文件
-            if force_new_file or self._is_updating:
-                self._current_cache_file = target_file
-                logger.info(f"✅ 缓存已保存到新文件: {target_file} ({len(serializable_cache)} 个项目)")
-
-                # 清理旧的缓存文件（保留最新的两个文件）
-                self.cleanup_old_cache_files()
-            else:
-                logger.info(f"✅ 缓存已更新到文件: {target_file} ({len(serializable_cache)} 个项目)")
-
+            written = cache.flush()
+            if written:
+                logger.info(f"✅ 缓存已写入 {CACHE_DB_FILE} ({written} 个变化项)")
             return True
-
-        except Exception as e:
-            logger.error(f"❌ 保存缓存文件失败: {e}")
-            # 清理临时文件
-            temp_file = target_file + '.tmp' if 'target_file' in locals() else None
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except Exception:
-                    pass
-
-        return False
-
-    def cleanup_old_cache_files(self):
-        """清理旧的缓存文件，只保留最新的两个"""
-        try:
-            available_files = self.get_available_cache_files()
-
-            # 如果超过2个文件，删除最旧的
-            if len(available_files) > 2:
-                files_to_delete = available_files[2:]  # 保留前两个（最新的）
-                for file_path in files_to_delete:
-                    try:
-                        os.remove(file_path)
-                        logger.info(f"🗑️ 已删除旧缓存文件: {file_path}")
-                    except Exception as e:
-                        logger.warning(f"⚠️ 删除旧缓存文件失败 {file_path}: {e}")
-
         except Exception as e:
-            logger.error(f"❌ 清理缓存文件失败: {e}")
+            logger.error(f"❌ 保存缓存失败: {e}")
+            return False
 
     def get_cached_data(self, key, fetch_func, *args, **kwargs):
         """获取缓存数据或重新获取"""
@@ -2598,8 +2489,8 @@ class TradeCatBot:
             logger.info("⏸️ BINANCE_API_DISABLED=1，跳过关键数据预热")
             return
         critical_tasks = [
-            ('ticker_24hr_data', self.fetch_24hr_ticker_data),
-            ('funding_rate_data', self.fetch_funding_rate_data),
+            ('ticker_24hr_data', self.futures_client.get_24hr_ticker_async),
+            ('funding_rate_data', self.futures_client.get_premium_index_async),
         ]
 
         # 如果这些关键数据不在缓存中，立即获取
@@ -2607,8 +2498,7 @@ class TradeCatBot:
             if key not in cache or not cache[key].get('data'):
                 logger.info(f"🚨 关键数据缺失，立即获取: {key}")
                 try:
-                    loop = asyncio.get_event_loop()
-                    data = await loop.run_in_executor(None, fetch_func)
+                    data = await fetch_func()
                     if data:
                         cache[key] = {'data': data, 'timestamp': time.time()}
                         logger.info(f"✅ 关键数据预热完成: {key}")
@@ -2716,15 +2606,16 @@ class TradeCatBot:
             """轻量级异步包装器，优先保证用户体验"""
             try:
                 logger.info(f"🔄 轻量级更新 {key}...")
-                # 在线程池中执行，设置较短超时
+                # 异步接口直接 await，同步函数放到线程池，均设置较短超时
                 loop = asyncio.get_event_loop()
+                if asyncio.iscoroutinefunction(fetch_func):
+                    pending = fetch_func()
+                else:
+                    pending = loop.run_in_executor(None, fetch_func)
 
                 # 设置30秒超时，避免长时间阻塞
                 try:
-                    data = await asyncio.wait_for(
-                        loop.run_in_executor(None, fetch_func),
-                        timeout=30.0
-                    )
+                    data = await asyncio.wait_for(pending, timeout=30.0)
                 except asyncio.TimeoutError:
                     logger.warning(f"⏰ {key} 更新超时，保留旧缓存")
                     # 保留旧缓存
@@ -2751,8 +2642,8 @@ class TradeCatBot:
 
         # 只更新最关键的数据，减少更新时间
         critical_tasks = [
-            ('ticker_24hr_data', self.fetch_24hr_ticker_data),
-            ('funding_rate_data', self.fetch_funding_rate_data),
+            ('ticker_24hr_data', self.futures_client.get_24hr_ticker_async),
+            ('funding_rate_data', self.futures_client.get_premium_index_async),
         ]
 
         # 分批执行，每批之间有延迟，确保用户请求有机会处理
@@ -2930,24 +2821,18 @@ class TradeCatBot:
             logger.warning("⚠️ 没有数据更新成功，保持现有缓存")
 
     def get_cache_file_info(self):
-        """获取缓存文件信息"""
-        info = []
-        available_files = self.get_available_cache_files()
-
-        for i, file_path in enumerate(available_files):
-            try:
-                mtime = os.path.getmtime(file_path)
-                size = os.path.getsize(file_path)
-                # 转换为北京时间 UTC+8
-                mtime_str = datetime.fromtimestamp(mtime, timezone(timedelta(hours=8))).strftime('%Y-%m-%d %H:%M:%S')
-                size_str = f"{size/1024:.1f}KB" if size < 1024*1024 else f"{size/(1024*1024):.1f}MB"
-
-                status = _t("cache.current_use", None) if file_path == self._current_cache_file else _t("cache.backup_file", None)
-                info.append(f"- {file_path}: {status}, {mtime_str}, {size_str}")
-            except Exception as e:
-                info.append(f"- {file_path}: 读取失败 - {e}")
-
-        return "\n".join(info) if info else _t("cache.no_files", None)
+        """获取缓存库信息"""
+        if self.cache_store is None or not os.path.exists(CACHE_DB_FILE):
+            return _t("cache.no_files", None)
+        try:
+            mtime = os.path.getmtime(CACHE_DB_FILE)
+            size = self.cache_store.size_bytes()
+            # 转换为北京时间 UTC+8
+            mtime_str = datetime.fromtimestamp(mtime, timezone(timedelta(hours=8))).strftime('%Y-%m-%d %H:%M:%S')
+            size_str = f"{size/1024:.1f}KB" if size < 1024*1024 else f"{size/(1024*1024):.1f}MB"
+            return f"- {CACHE_DB_FILE}: {_t('cache.current_use', None)}, {mtime_str}, {size_str}"
+        except Exception as e:
+            return f"- {CACHE_DB_FILE}: 读取失败 - {e}"
 
     def get_active_symbols(self, force_refresh=False):
         """获取活跃的USDT合约交易对 - 支持更多币种"""
@@ -3966,9 +3851,27 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             # 记录用户语言偏好，贯通到 AI 服务
             context.user_data["lang_preference"] = _resolve_lang(update)
             ai_handler = get_ai_handler(symbols_provider=lambda: user_handler.get_active_symbols() if user_handler else None)
+            from bot.non_blocking_ai_handler import non_blocking_ai_handler
 
             # 根据按钮类型和当前状态分发
-            if button_data.startswith("ai_interval_"):
+            if button_data.startswith("ai_stop_"):
+                # 流式分析的停止按钮：只有发起人可以取消
+                await query.answer()
+                if await non_blocking_ai_handler.cancel_analysis(button_data[len("ai_stop_"):], user_id=query.from_user.id):
+                    await query.edit_message_text(_t(update, "ai.cancelled"))
+            elif button_data.startswith("ai_interval_") and context.user_data.get("ai_selected_symbol"):
+                # 选定周期后在后台流式分析，逐步编辑按钮所在消息
+                context.user_data["ai_state"] = SELECTING_INTERVAL
+                await query.answer()
+                await non_blocking_ai_handler.start_stream_analysis(
+                    query.from_user.id,
+                    context.user_data["ai_selected_symbol"],
+                    button_data[len("ai_interval_"):],
+                    context.user_data.get("ai_prompt_name", ai_handler.default_prompt),
+                    query,
+                    lang=context.user_data["lang_preference"],
+                )
+            elif button_data.startswith("ai_interval_"):
                 context.user_data["ai_state"] = SELECTING_INTERVAL
                 await ai_handler.handle_interval_selection(update, context)
             elif button_data == "ai_back_to_coin":
@@ -4422,6 +4325,10 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         elif query.data == "cancel_analysis":
             # 处理AI点位分析中的"返回主菜单"按钮
+            # 该消息若仍在流式输出分析，先取消，避免后续编辑覆盖主菜单
+            from bot.non_blocking_ai_handler import non_blocking_ai_handler
+            if query.message:
+                await non_blocking_ai_handler.cancel_message_analyses(query.message.chat_id, query.message.message_id)
             # 清理AI对话状态
             if 'selected_symbol' in context.user_data:
                 del context.user_data['selected_symbol']
@@ -5869,8 +5776,9 @@ def _build_admin_menu_keyboard(update) -> InlineKeyboardMarkup:
 async def health_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """健康检查 /ping"""
     try:
-        cache_keys = list(cache.keys())
-        latest_cache_ts = max((cache[k]['timestamp'] for k in cache_keys), default=0)
+        cache_ts = cache.timestamps()
+        cache_keys = list(cache_ts)
+        latest_cache_ts = max(cache_ts.values(), default=0)
         age_seconds = int(time.time() - latest_cache_ts) if latest_cache_ts else None
         await update.message.reply_text('\n'.join([
             '✅ pong',
@@ -5878,6 +5786,7 @@ async def health_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f'WEBSOCKET_MONITOR={os.getenv("ENABLE_WEBSOCKET_MONITOR", "0")}',
             f'cache_keys={len(cache_keys)}',
             f'cache_age_sec={age_seconds if age_seconds is not None else "n/a"}',
+            'render_cache={hits}/{misses} hit_rate={hit_rate} size={size}/{max_items}'.format(**get_render_cache().stats()),
         ]))
     except Exception as e:
         await update.message.reply_text(f'❌ ping failed: {e}')
@@ -5919,14 +5828,14 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 {safe_cache_status}
 
-- 系统使用两个缓存文件轮替更新
+- 缓存按键持久化，只写入变化项
 - 更新时用户请求不受影响
-- 自动清理过期的缓存文件
+- 启动后按需加载缓存项
 - 缓存有效期: 10分钟（宽松模式）
 
 - 非阻塞后台更新
 - 智能缓存降级
-- 原子性文件操作
+- 事务性写入
 - 请求频率控制"""
 
         await update.message.reply_text(
@@ -6505,6 +6414,15 @@ async def post_init(application):
 
     asyncio.create_task(delayed_init())
 
+    # 信号投递队列运行在主事件循环（与 application.bot 同一循环）
+    try:
+        from signals.pusher_v2 import get_pusher
+        for pusher in (get_pusher(), application.bot_data.get("pg_signal_pusher")):
+            if pusher is not None:
+                pusher.bind_loop(asyncio.get_running_loop())
+    except Exception as e:
+        logger.warning(f"⚠️ 信号推送队列绑定失败: {e}")
+
     # 设置Telegram命令菜单
     from telegram import BotCommand
     commands = [
@@ -6762,15 +6680,12 @@ def main():
             from signals import init_pusher, start_signal_loop
 
             async def send_signal(user_id: int, text: str, reply_markup):
-                """发送信号消息"""
-                try:
-                    await application.bot.send_message(
-                        chat_id=user_id,
-                        text=text,
-                        reply_markup=reply_markup
-                    )
-                except Exception as e:
-                    logger.warning(f"发送信号给 {user_id} 失败: {e}")
+                """发送信号消息（失败与 429 重试由推送器处理）"""
+                await application.bot.send_message(
+                    chat_id=user_id,
+                    text=text,
+                    reply_markup=reply_markup
+                )
 
             init_pusher(send_signal)
             start_signal_loop(interval=60)
@@ -6782,21 +6697,26 @@ def main():
         # 启动 PG 实时信号检测服务
         try:
             from signals.pg_engine import start_pg_signal_loop, get_pg_engine
-            from signals.pg_formatter import get_pg_formatter
-            from signals.ui import get_signal_push_kb, _get_subscribers
-            import asyncio
+            from signals.pusher_v2 import SignalPusher, get_pusher
             import time
             from collections import deque
 
-            pg_formatter = get_pg_formatter()
-            
+            # 与 SQLite 信号共用投递队列（按用户合并、全局/单聊天限速）
+            pg_pusher = get_pusher()
+            if pg_pusher is None:
+                async def send_pg_signal(user_id: int, text: str, reply_markup):
+                    await application.bot.send_message(chat_id=user_id, text=text, reply_markup=reply_markup)
+
+                pg_pusher = SignalPusher(send_pg_signal)
+                application.bot_data["pg_signal_pusher"] = pg_pusher
+
             # 速率限制：最大30条/分钟
             _pg_push_times = deque(maxlen=30)
             _PG_RATE_LIMIT = 30
             _PG_RATE_WINDOW = 60
 
             def on_pg_signal(signal, formatted_msg):
-                """PG信号回调 - 推送给订阅用户（复用主事件循环+速率限制）"""
+                """PG信号回调 - 入队推送给订阅用户（速率限制）"""
                 # 速率限制检查
                 now = time.time()
                 while _pg_push_times and _pg_push_times[0] < now - _PG_RATE_WINDOW:
@@ -6805,31 +6725,7 @@ def main():
                     logger.warning(f"PG信号推送速率限制，跳过: {signal.symbol} - {signal.signal_type}")
                     return
                 _pg_push_times.append(now)
-
-                async def push():
-                    subscribers = _get_subscribers()
-                    kb = get_signal_push_kb(signal.symbol)
-                    for uid in subscribers:
-                        try:
-                            await application.bot.send_message(
-                                chat_id=uid,
-                                text=formatted_msg,
-                                reply_markup=kb
-                            )
-                        except Exception as e:
-                            logger.warning(f"PG信号推送给 {uid} 失败: {e}")
-
-                # 使用 run_coroutine_threadsafe 投递到主事件循环
-                try:
-                    main_loop = asyncio.get_event_loop()
-                    if main_loop.is_running():
-                        asyncio.run_coroutine_threadsafe(push(), main_loop)
-                    else:
-                        # 回退：创建新循环（不推荐，仅兜底）
-                        asyncio.run(push())
-                except RuntimeError:
-                    # 无法获取事件循环时，使用 asyncio.run
-                    asyncio.run(push())
+                pg_pusher.submit(signal, text=formatted_msg)
 
             # 注册回调并启动（币种从 SYMBOLS_GROUPS 配置继承）
             engine = get_pg_engine()  # 自动从 libs/common/symbols 获取配置
@@ -0,0 +1,254 @@
+"""币安 REST 异步客户端 - 共享连接池 + 请求合并 + 短 TTL 缓存 + 非阻塞退避
+
+- 所有请求在独立的 IO 事件循环线程上执行，共用一个 keep-alive 的 aiohttp 会话
+- 相同 (URL, 参数) 的并发请求共享同一个进行中的请求（single-flight）；
+  单个调用方取消不影响其他人，全部等待者都取消时才取消底层请求
+- 成功响应按端点缓存若干秒，窗口内的重复请求不再访问网络；
+  每个调用方拿到的是外层容器及其 dict/list 行的副本，更深层仍与缓存共享，应视为只读
+- 429/错误重试用 asyncio.sleep 退避，不占用调用方线程或事件循环
+- 异步调用方 await，同步调用方（线程池中的旧代码）阻塞等待同一个结果
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import ssl
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Dict, Optional, Tuple
+
+import aiohttp
+
+try:
+    import certifi
+except ImportError:  # pragma: no cover - 无 certifi 时使用系统证书
+    certifi = None
+
+logger = logging.getLogger(__name__)
+
+# 端点 → 响应缓存秒数（未列出的端点使用 default_ttl）
+ENDPOINT_TTL: Dict[str, float] = {
+    "/fapi/v1/exchangeInfo": 300.0,
+    "/fapi/v1/ticker/24hr": 5.0,
+    "/fapi/v1/premiumIndex": 5.0,
+    "/fapi/v1/depth": 2.0,
+    "/fapi/v1/ping": 0.0,
+}
+
+RequestKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _detach(data: Any) -> Any:
+    """复制响应的外层容器及其 dict/list 行，调用方排序、追加、补字段不会改动共享缓存"""
+    if isinstance(data, list):
+        return [copy.copy(item) if isinstance(item, (dict, list)) else item for item in data]
+    if isinstance(data, dict):
+        return dict(data)
+    return data
+
+
+class _Flight:
+    """一次进行中的请求及其等待者数"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncBinanceClient:
+    """币安合约/现货 REST 客户端（线程安全，可在任意线程或事件循环中调用）"""
+
+    MAX_CACHE_ITEMS = 2048
+
+    def __init__(
+        self,
+        base_url: str,
+        spot_url: str,
+        *,
+        default_ttl: float = 2.0,
+        max_connections: int = 20,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.spot_url = spot_url.rstrip("/")
+        self.default_ttl = default_ttl
+        self.max_ttl = max([default_ttl, *ENDPOINT_TTL.values()])
+        self.max_connections = max_connections
+        self.max_backoff = max_backoff
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._inflight: Dict[RequestKey, _Flight] = {}
+        self._cache: Dict[RequestKey, Tuple[float, Any]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.stats = {"requests": 0, "coalesced": 0, "cache_hits": 0, "retries": 0}
+
+    # ==================== IO 线程 ====================
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="binance-io", daemon=True)
+                self._thread.start()
+                self._loop = loop
+        return self._loop
+
+    def _submit(self, coro: Awaitable[Any]) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            ctx = ssl.create_default_context(cafile=certifi.where() if certifi else None)
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ssl=ctx, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                trust_env=True,  # 读取 HTTP(S)_PROXY
+                headers={"Accept": "application/json", "User-Agent": "tradecat-bot"},
+            )
+        return self._session
+
+    # ==================== 请求 ====================
+    def _url(self, endpoint: str) -> str:
+        if endpoint.startswith(("/fapi/", "/futures/")):
+            return f"{self.base_url}{endpoint}"
+        return f"{self.spot_url}{endpoint}"
+
+    @staticmethod
+    def _key(url: str, params: Optional[Dict[str, Any]]) -> RequestKey:
+        return url, tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+
+    async def _request(self, endpoint: str, params: Optional[Dict[str, Any]],
+                       max_retries: int, timeout: float) -> Any:
+        """在 IO 循环上执行：缓存 → 合并 → 实际请求"""
+        url = self._url(endpoint)
+        key = self._key(url, params)
+        ttl = ENDPOINT_TTL.get(endpoint, self.default_ttl)
+
+        cached = self._cache.get(key)
+        if cached and time.monotonic() - cached[0] < ttl:
+            self.stats["cache_hits"] += 1
+            return _detach(cached[1])
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(self._fetch_and_cache(key, url, params, ttl, max_retries, timeout)))
+            self._inflight[key] = flight
+        else:
+            self.stats["coalesced"] += 1
+        flight.waiters += 1
+        try:
+            return _detach(await asyncio.shield(flight.task))
+        except asyncio.CancelledError:
+            if not flight.task.done():
+                flight.waiters -= 1
+                if flight.waiters <= 0:
+                    flight.task.cancel()
+                    if self._inflight.get(key) is flight:
+                        self._inflight.pop(key)
+            raise
+
+    async def _fetch_and_cache(self, key: RequestKey, url: str, params: Optional[Dict[str, Any]],
+                               ttl: float, max_retries: int, timeout: float) -> Any:
+        """实际请求（独立任务，不随单个调用方取消）；成功结果写入缓存"""
+        try:
+            data = await self._fetch(url, params, max_retries, timeout)
+        finally:
+            flight = self._inflight.get(key)
+            if flight is not None and flight.task is asyncio.current_task():
+                self._inflight.pop(key)
+        if data and ttl > 0:
+            now = time.monotonic()
+            self._cache[key] = (now, data)
+            if len(self._cache) > self.MAX_CACHE_ITEMS:
+                self._cache = {k: v for k, v in self._cache.items() if now - v[0] < self.max_ttl}
+        return data
+
+    async def _fetch(self, url: str, params: Optional[Dict[str, Any]], max_retries: int, timeout: float) -> Any:
+        session = self._get_session()
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        for attempt in range(max_retries):
+            self.stats["requests"] += 1
+            try:
+                logger.info("请求 %s (第%d次) - 参数: %s - 超时: %ss", url, attempt + 1, params, timeout)
+                async with session.get(url, params=params, timeout=client_timeout) as resp:
+                    if resp.status == 429:
+                        if attempt >= max_retries - 1:
+                            logger.warning("请求频率限制，放弃请求 %s", url)
+                            break
+                        retry_after = min(float(resp.headers.get("Retry-After", 30)), self.max_backoff)
+                        logger.warning("请求频率限制，%s 秒后重试", retry_after)
+                        self.stats["retries"] += 1
+                        await asyncio.sleep(retry_after)
+                        continue
+                    resp.raise_for_status()
+                    data = await resp.json(content_type=None)
+
+                if isinstance(data, dict) and "code" in data and data["code"] != 200:
+                    logger.warning("API返回错误: %s", data)
+                    if attempt < max_retries - 1:
+                        self.stats["retries"] += 1
+                        await asyncio.sleep((attempt + 1) * 2)
+                        continue
+                return data
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning("第%d次请求失败: %s", attempt + 1, e)
+                if attempt < max_retries - 1:
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(min(attempt + 1, 5))
+                else:
+                    logger.error("所有重试失败，最终错误: %s", e)
+        return []
+
+    # ==================== 对外接口 ====================
+    async def request(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                      max_retries: int = 2, timeout: float = 8) -> Any:
+        """异步请求（任意事件循环中 await，不阻塞调用方循环）"""
+        return await asyncio.wrap_future(self._submit(self._request(endpoint, params, max_retries, timeout)))
+
+    def request_sync(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                     max_retries: int = 2, timeout: float = 8) -> Any:
+        """同步请求（供线程池中的旧代码使用，与异步调用共享缓存和进行中的请求）"""
+        return self._submit(self._request(endpoint, params, max_retries, timeout)).result()
+
+    async def get_24hr_ticker(self, symbol: Optional[str] = None) -> Any:
+        return await self.request("/fapi/v1/ticker/24hr", {"symbol": symbol} if symbol else None)
+
+    async def get_premium_index(self, symbol: Optional[str] = None) -> Any:
+        return await self.request("/fapi/v1/premiumIndex", {"symbol": symbol} if symbol else None)
+
+    async def get_exchange_info(self) -> Any:
+        return await self.request("/fapi/v1/exchangeInfo")
+
+    def invalidate(self) -> None:
+        """清空响应缓存"""
+        self._cache.clear()
+
+    def close(self) -> None:
+        """关闭会话并停止 IO 线程"""
+        loop = self._loop
+        if loop is None:
+            return
+
+        async def _close() -> None:
+            if self._session is not None and not self._session.closed:
+                await self._session.close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_close(), loop).result(timeout=5)
+        except Exception as e:  # pragma: no cover - 关闭阶段仅记录
+            logger.debug("关闭 Binance 会话失败: %s", e)
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+
+
+__all__ = ["AsyncBinanceClient", "ENDPOINT_TTL"]
@@ -0,0 +1,228 @@
+"""全局数据缓存的按键持久化 - SQLite 单表，一键一行
+
+- 每个缓存键单独存储 (key, timestamp, codec, value)，保存时只写时间戳变化的键
+- 启动时只读取键索引，缓存项在第一次访问时才从磁盘解码（懒加载）
+- 值优先用 msgpack 编码（已安装时），否则用紧凑 JSON；读取按行内 codec 解码，两种格式可混存
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - 未安装时退回 JSON
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_items (
+    key       TEXT PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    codec     TEXT NOT NULL,
+    value     BLOB NOT NULL
+)
+"""
+
+
+def _encode(data: Any) -> tuple[str, bytes]:
+    if msgpack is not None:
+        try:
+            return "msgpack", msgpack.packb(data, use_bin_type=True)
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return "json", json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decode(codec: str, value: bytes) -> Any:
+    if codec == "msgpack":
+        if msgpack is None:
+            raise ValueError("缓存项使用 msgpack 编码，但未安装 msgpack")
+        return msgpack.unpackb(value, raw=False, strict_map_key=False)
+    return json.loads(value)
+
+
+class CacheStore:
+    """SQLite 按键存储（线程安全）"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def index(self) -> Dict[str, float]:
+        """全部键及其时间戳（不读取值）"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT key, timestamp FROM cache_items").fetchall())
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT timestamp, codec, value FROM cache_items WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return {"data": _decode(row[1], row[2]), "timestamp": row[0]}
+        except Exception as e:
+            logger.warning("缓存项 %s 解码失败: %s", key, e)
+            return None
+
+    def save(self, items: Iterable[tuple[str, Dict[str, Any]]]) -> int:
+        """写入若干 (key, {'data', 'timestamp'})，返回写入条数"""
+        rows = []
+        for key, item in items:
+            try:
+                codec, value = _encode(item["data"])
+            except (TypeError, ValueError) as e:
+                logger.warning("缓存项 %s 无法序列化，跳过: %s", key, e)
+                continue
+            rows.append((key, float(item["timestamp"]), codec, value))
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO cache_items (key, timestamp, codec, value) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET timestamp = excluded.timestamp, "
+                "codec = excluded.codec, value = excluded.value",
+                rows,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def size_bytes(self) -> int:
+        total = 0
+        for suffix in ("", "-wal"):
+            try:
+                total += os.path.getsize(self.path + suffix)
+            except OSError:
+                pass
+        return total
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class PersistentCache(dict):
+    """按需从 CacheStore 加载的缓存字典
+
+    行为与普通 dict 一致；`key in cache` / `cache[key]` / `cache.get(key)` 访问尚未加载的键时，
+    若磁盘上存在且未超过 max_age 秒，则先解码装入内存。flush() 只写时间戳变化过的键。
+    keys() / len() / bool() 同时计入磁盘上未过期、尚未加载的键（不解码）；items() / values() 会先全部加载。
+    """
+
+    def __init__(self, store: Optional[CacheStore] = None, max_age: float = 600) -> None:
+        super().__init__()
+        self.store = store
+        self.max_age = max_age
+        self._index: Optional[Dict[str, float]] = None
+        self._persisted: Dict[str, float] = {}
+        self._load_lock = threading.Lock()
+
+    def attach(self, store: CacheStore) -> int:
+        """绑定存储并读取键索引，返回其中未过期的键数"""
+        self.store = store
+        self._index = store.index()
+        self._persisted.update(self._index)
+        now = time.time()
+        return sum(1 for ts in self._index.values() if now - ts < self.max_age)
+
+    def _load(self, key: Any) -> bool:
+        index = self._index
+        if index is None or key not in index or time.time() - index[key] >= self.max_age:
+            return False
+        with self._load_lock:
+            if dict.__contains__(self, key):
+                return True
+            item = self.store.load(key) if self.store else None
+            index.pop(key, None)
+            if item is None:
+                return False
+            dict.__setitem__(self, key, item)
+            return True
+
+    def _pending_keys(self) -> list:
+        """磁盘上未过期、尚未加载的键"""
+        index = self._index
+        if not index:
+            return []
+        now = time.time()
+        return [k for k, ts in list(index.items()) if now - ts < self.max_age and not dict.__contains__(self, k)]
+
+    def __contains__(self, key: object) -> bool:
+        return dict.__contains__(self, key) or self._load(key)
+
+    def __missing__(self, key: Any) -> Any:
+        if self._load(key):
+            return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def keys(self) -> list:
+        return list(dict.keys(self)) + self._pending_keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return dict.__len__(self) + len(self._pending_keys())
+
+    def __bool__(self) -> bool:
+        return dict.__len__(self) > 0 or bool(self._pending_keys())
+
+    def _load_all(self) -> None:
+        for key in self._pending_keys():
+            self._load(key)
+
+    def items(self):
+        self._load_all()
+        return dict.items(self)
+
+    def values(self):
+        self._load_all()
+        return dict.values(self)
+
+    def timestamps(self) -> Dict[str, float]:
+        """全部键的时间戳（未加载的键取索引中的值，不解码）"""
+        out = {k: v["timestamp"] for k, v in dict.items(self) if isinstance(v, dict) and "timestamp" in v}
+        index = self._index or {}
+        for key in self._pending_keys():
+            out[key] = index.get(key, 0)
+        return out
+
+    def dirty_items(self) -> list[tuple[str, Dict[str, Any]]]:
+        """时间戳与已持久化版本不同的缓存项（只看已加载的键）"""
+        out = []
+        for key, item in list(dict.items(self)):
+            if isinstance(item, dict) and "data" in item and "timestamp" in item:
+                if self._persisted.get(key) != item["timestamp"]:
+                    out.append((key, item))
+        return out
+
+    def flush(self) -> int:
+        """把变化的键写入存储，返回写入条数"""
+        if self.store is None:
+            return 0
+        dirty = self.dirty_items()
+        written = self.store.save(dirty)
+        for key, item in dirty:
+            self._persisted[key] = item["timestamp"]
+        return written
+
+
+__all__ = ["CacheStore", "PersistentCache"]
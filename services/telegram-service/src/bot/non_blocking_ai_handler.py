@@ -5,6 +5,7 @@
 """
 
 import asyncio
+import functools
 import uuid
 from datetime import datetime
 from typing import Dict, Optional
@@ -12,6 +13,8 @@ import logging
 from pathlib import Path
 import sys
 
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
 当前目录 = Path(__file__).resolve().parent
 根目录 = 当前目录.parent
 if str(根目录) not in sys.path:
@@ -45,6 +48,7 @@ class NonBlockingAIHandler:
         self.active_analyses = {}  # 存储正在进行的分析
         self.completed_analyses = {}  # 存储已完成的分析结果
         self.max_concurrent_analyses = 5  # 最大并发分析数
+        self._tasks: Dict[str, asyncio.Task] = {}  # 分析ID → 后台任务（用于取消）
 
     async def start_ai_analysis(self, user_id: int, symbol: str, market_type: str,
                                interval: str, ai_telegram_handler, callback_query) -> str:
@@ -90,6 +94,102 @@ class NonBlockingAIHandler:
 
         return analysis_id
 
+    async def start_stream_analysis(self, user_id: int, symbol: str, interval: str, prompt_name: str,
+                                    callback_query, lang: Optional[str] = None) -> Optional[str]:
+        """
+        启动流式AI分析（ai-service 管道）
+        LLM 输出逐步编辑到按钮所在消息（附带停止按钮 ai_stop_<分析ID>），完成后写入最终结果；返回分析ID
+        """
+        from bot.ai_integration import AI_SERVICE_AVAILABLE, StreamingReply, run_analysis
+
+        if not AI_SERVICE_AVAILABLE:
+            await callback_query.edit_message_text(_t("ai.unavailable"))
+            return None
+        if len(self.active_analyses) >= self.max_concurrent_analyses:
+            await callback_query.edit_message_text(_t("ai.busy"), parse_mode='Markdown')
+            return None
+
+        analysis_id = f"ai_{user_id}_{int(datetime.now().timestamp())}_{uuid.uuid4().hex[:8]}"
+        coin_name = symbol.replace('USDT', '')
+        stop_keyboard = InlineKeyboardMarkup([[
+            InlineKeyboardButton(_t("btn.stop_analysis", lang=lang), callback_data=f"ai_stop_{analysis_id}")
+        ]])
+        await callback_query.edit_message_text(
+            _t("ai.started", lang=lang, symbol=coin_name, id=analysis_id[-8:]),
+            parse_mode='Markdown',
+            reply_markup=stop_keyboard
+        )
+        self.active_analyses[analysis_id] = {
+            'user_id': user_id,
+            'symbol': symbol,
+            'market_type': 'futures',
+            'interval': interval,
+            'start_time': datetime.now(),
+            'status': 'running',
+            'chat_id': callback_query.message.chat_id,
+            'message_id': callback_query.message.message_id
+        }
+
+        async def _run():
+            reply = StreamingReply(
+                functools.partial(callback_query.edit_message_text, reply_markup=stop_keyboard),
+                header=f"🤖 {coin_name} {interval}\n\n",
+            )
+            try:
+                result = await run_analysis(symbol, interval, prompt_name, lang=lang, on_delta=reply.feed)
+                await reply.close()
+                text = result.get("analysis") or _t("ai.unavailable")
+                self.completed_analyses[analysis_id] = {
+                    'result': result,
+                    'completion_time': datetime.now(),
+                    'user_id': user_id
+                }
+                chunks = [text[i:i + 4000] for i in range(0, len(text), 4000)]
+                await callback_query.edit_message_text(chunks[0])
+                for chunk in chunks[1:]:
+                    await callback_query.message.reply_text(chunk)
+            except asyncio.CancelledError:
+                # 消息由发起取消的一方改写（停止按钮 / 返回主菜单）
+                await reply.close()
+                logger.info(f"AI分析已取消: {analysis_id}")
+                raise
+            except Exception as e:
+                await reply.close()
+                logger.error(f"AI分析失败: {analysis_id} - {str(e)}")
+                await self._handle_analysis_error(analysis_id, str(e), callback_query)
+            finally:
+                self.active_analyses.pop(analysis_id, None)
+                self._tasks.pop(analysis_id, None)
+
+        self._tasks[analysis_id] = asyncio.create_task(_run())
+        return analysis_id
+
+    async def cancel_analysis(self, analysis_id: str, user_id: Optional[int] = None) -> bool:
+        """
+        取消进行中的分析（取消会传递到 LLM 请求并关闭连接）；传入 user_id 时只允许发起人取消
+        等到任务收尾（含进行中的流式编辑）才返回，调用方随后改写消息不会被覆盖
+        """
+        task = self._tasks.get(analysis_id)
+        if task is None or task.done():
+            return False
+        info = self.active_analyses.get(analysis_id, {})
+        if user_id is not None and info.get('user_id') != user_id:
+            return False
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return True
+
+    async def cancel_message_analyses(self, chat_id: int, message_id: int) -> int:
+        """取消正在向指定消息流式输出的分析（该消息即将被改写为其他内容），返回取消数量"""
+        targets = [
+            analysis_id for analysis_id, info in self.active_analyses.items()
+            if info.get('chat_id') == chat_id and info.get('message_id') == message_id
+        ]
+        cancelled = 0
+        for analysis_id in targets:
+            cancelled += await self.cancel_analysis(analysis_id)
+        return cancelled
+
     async def _run_background_analysis(self, analysis_id: str, ai_telegram_handler, callback_query):
         """在后台运行AI分析"""
         try:
@@ -289,9 +289,8 @@ class SingleTokenSnapshot:
 
     def __init__(self) -> None:
         self.provider = get_ranking_provider()
-        # 渲染级缓存：表/周期 → 全表 + 索引
-        self._data_cache: dict[tuple[str, str], list[dict]] = {}
-        self._index_cache: dict[tuple[str, str], dict[str, dict]] = {}
+        # 渲染级缓存：表/周期 → 目标币种合并行（整表快照由 provider 进程级共享）
+        self._row_cache: dict[tuple[str, str], dict] = {}
         self._target_sym: str = ""
 
     def render_table(
@@ -309,8 +308,7 @@ class SingleTokenSnapshot:
 
         返回 (text, total_pages)，用于外层按钮分页。
         """
-        self._data_cache.clear()
-        self._index_cache.clear()
+        self._row_cache.clear()
         self._target_sym = format_symbol(symbol)
         lang = resolve_lang(lang=lang)
         self._lang = lang  # 保存语言设置供 _fetch_table_value 使用
@@ -411,12 +409,7 @@ class SingleTokenSnapshot:
     ) -> str:
         """从 provider 中取一个字段值并格式化."""
         base_table = TABLE_ALIAS.get(panel, {}).get(table, table)
-        idx = self._index_cache.get((base_table, period))
-        if idx is None:
-            self._get_table_data(base_table, period)
-            idx = self._index_cache.get((base_table, period), {})
-
-        item = idx.get(self._target_sym)
+        item = self._get_symbol_row(base_table, period)
         if not item:
             return ""
 
@@ -450,25 +443,18 @@ class SingleTokenSnapshot:
     def _get_row(self, table: str, period: str, panel: PanelType) -> Dict:
         """获取指定表/周期/币种的首行，用于字段探测。"""
         base_table = TABLE_ALIAS.get(panel, {}).get(table, table)
-        self._get_table_data(base_table, period)
-        return self._index_cache.get((base_table, period), {}).get(self._target_sym, {})
+        return self._get_symbol_row(base_table, period)
 
-    def _get_table_data(self, base_table: str, period: str) -> list[dict]:
-        """获取 (表, 周期) 数据并缓存结果+索引。"""
+    def _get_symbol_row(self, base_table: str, period: str) -> Dict:
+        """获取 (表, 周期) 中目标币种的合并行并缓存。"""
         key = (base_table, period)
-        if key not in self._data_cache:
+        if key not in self._row_cache:
             try:
-                data = self.provider.merge_with_base(base_table, period)
+                row = self.provider.merged_row(base_table, period, self._target_sym)
             except Exception:
-                data = []
-            self._data_cache[key] = data or []
-            idx = {}
-            for item in self._data_cache[key]:
-                sym = format_symbol(item.get("symbol") or item.get("交易对") or "")
-                if sym:
-                    idx[sym] = item
-            self._index_cache[key] = idx
-        return self._data_cache[key]
+                row = {}
+            self._row_cache[key] = row
+        return self._row_cache[key]
 
     def _auto_fields(self, row: Dict) -> List[str]:
         """自动探测行中的数值字段，过滤公共字段，保持原顺序。"""
@@ -524,7 +510,7 @@ def render_pattern_panel(symbol: str, enabled_periods: Dict[str, bool] | None =
     for p in periods:
         if not enabled_periods.get(p, False):
             continue
-        row = provider._fetch_single_row("K线形态扫描器", p, sym_full)
+        row = provider.snapshot("K线形态扫描器", p).get(sym_full) or provider._fetch_single_row("K线形态扫描器", p, sym_full)
         if not row:
             continue
         patterns = row.get("形态类型", "")
@@ -7,6 +7,7 @@ UI 流程：
 3. 全市场图表：选择图表类型 → 选择周期 → 渲染
 """
 
+import asyncio
 import io
 import logging
 import sys
@@ -293,15 +294,11 @@ class VisHandler:
     async def render_chart(self, template_id: str, symbol: str, interval: str, update=None) -> Tuple[Optional[bytes], str]:
         """渲染图表"""
         try:
-            from templates.registry import register_defaults
+            from templates.render_pool import RenderQueueFull, get_render_pool
 
-            registry = register_defaults()
-            result = registry.get(template_id)
-            if not result:
+            if template_id not in VIS_TEMPLATES:
                 return None, _t(update, "error.unknown_template", f"未知模板: {template_id}")
-
-            meta, render_fn = result
-            tpl = VIS_TEMPLATES.get(template_id, {})
+            tpl = VIS_TEMPLATES[template_id]
 
             # 构建参数
             params = {
@@ -328,8 +325,12 @@ class VisHandler:
             else:
                 params["title"] = f"{name} - {interval}"
 
-            # 渲染
-            data, content_type = render_fn(params, "png")
+            # 渲染（常驻进程池执行，不阻塞事件循环）
+            try:
+                data, content_type = await get_render_pool().submit(template_id, params, "png")
+            except (RenderQueueFull, TimeoutError) as e:
+                logger.warning("渲染图表繁忙或超时: %s", e)
+                return None, _t(update, "vis.error.render_failed", "渲染失败")
             if content_type == "image/png":
                 return data, ""
             else:
@@ -347,25 +348,25 @@ class VisHandler:
             if str(trading_service_path) not in sys.path:
                 sys.path.insert(0, str(trading_service_path))
 
-            from indicators.batch.vpvr import compute_vpvr_zone
+            from indicators.batch.vpvr import compute_vpvr_zones
+
+            # 全部币种一次查询、一次批量计算（最多 6 个）
+            symbols = DEFAULT_SYMBOLS[:6]
+            zones = await asyncio.to_thread(compute_vpvr_zones, symbols, interval, lookback=200)
 
             market_data = []
-            for symbol in DEFAULT_SYMBOLS[:6]:  # 最多 6 个
-                try:
-                    result = compute_vpvr_zone(symbol, interval, lookback=200)
-                    if result:
-                        market_data.append({
-                            "symbol": symbol,
-                            "price": result.get("close", 0),
-                            "value_area_low": result.get("value_area_low", 0),
-                            "value_area_high": result.get("value_area_high", 0),
-                            "poc": result.get("poc", 0),
-                            "coverage": result.get("coverage", 0.7),
-                            "price_change": result.get("price_change", 0),
-                        })
-                except Exception as e:
-                    logger.warning(f"获取 {symbol} VPVR 数据失败: {e}")
-                    continue
+            for symbol in symbols:
+                result = zones.get(symbol)
+                if result:
+                    market_data.append({
+                        "symbol": symbol,
+                        "price": result.get("close", 0),
+                        "value_area_low": result.get("value_area_low", 0),
+                        "value_area_high": result.get("value_area_high", 0),
+                        "poc": result.get("poc", 0),
+                        "coverage": result.get("coverage", 0.7),
+                        "price_change": result.get("price_change", 0),
+                    })
 
             return market_data
         except ImportError:
@@ -228,8 +228,8 @@ class ATR排行卡片(RankingCard):
         return InlineKeyboardMarkup(kb)
 
     def _load_rows(self, period: str, sort_order: str, limit: int, sort_field: str, field_state: Dict[str, bool]) -> Tuple[List[List[str]], str]:
-        items: List[Dict] = []
-        try:
+        def build() -> List[Dict]:
+            items: List[Dict] = []
             metrics = self.provider.merge_with_base("ATR波幅榜单", period, base_fields=["成交额", "当前价格"])
             for row in metrics:
                 sym = format_symbol(row.get("symbol") or row.get("交易对") or row.get("币种") or "")
@@ -250,12 +250,15 @@ class ATR排行卡片(RankingCard):
                     "成交笔数": float(row.get("成交笔数") or 0),
                     "主动买卖比": float(row.get("主动买卖比") or 0),
                 })
+            return items
+
+        reverse = sort_order != "asc"
+        try:
+            items = self.provider.ranked("ATR波幅榜单", period, self.card_id, build, sort_field, reverse)
         except Exception as exc:  # pragma: no cover
             self._logger.warning("读取 ATR 榜单失败: %s", exc)
             return [], _t("card.header.rank_symbol", lang=lang)
 
-        reverse = sort_order != "asc"
-        items.sort(key=lambda x: x.get(sort_field, 0), reverse=reverse)
         active_special = [f for f in self.special_display_fields if field_state.get(f[0], f[2] or True)]
         active_general = [f for f in self.general_display_fields if field_state.get(f[0], f[2] or True)]
 
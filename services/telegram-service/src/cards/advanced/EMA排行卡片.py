@@ -235,8 +235,8 @@ class EMA排行卡片(RankingCard):
         return InlineKeyboardMarkup(kb)
 
     def _load_rows(self, period: str, sort_order: str, limit: int, sort_field: str, field_state: Dict[str, bool]) -> Tuple[List[List[str]], str]:
-        items: List[Dict] = []
-        try:
+        def build() -> List[Dict]:
+            items: List[Dict] = []
             metrics = self.provider.merge_with_base("G，C点扫描器.py", period, base_fields=["价格", "成交额"])
             for row in metrics:
                 row_period = (row.get("周期") or row.get("period") or "").strip()
@@ -258,12 +258,15 @@ class EMA排行卡片(RankingCard):
                     "成交笔数": self._to_float(row, ["成交笔数", "交易次数"]),
                     "主动买卖比": self._to_float(row, ["主动买卖比"]),
                 })
+            return items
+
+        reverse = sort_order != "asc"
+        try:
+            items = self.provider.ranked("G，C点扫描器.py", period, self.card_id, build, sort_field, reverse)
         except Exception as exc:  # pragma: no cover
             self._logger.warning("读取收敛发散榜单失败: %s", exc)
             return [], _t("card.header.rank_symbol", lang=lang)
 
-        reverse = sort_order != "asc"
-        items.sort(key=lambda x: x.get(sort_field, 0), reverse=reverse)
         active_special = [f for f in self.special_display_fields if field_state.get(f[0], f[2] or False)]
         active_general = [f for f in self.general_display_fields if field_state.get(f[0], f[2] or False)]
 
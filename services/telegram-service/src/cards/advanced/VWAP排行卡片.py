@@ -225,8 +225,8 @@ class VWAP排行卡片(RankingCard):
 
     # 数据读取
     def _load_rows(self, period: str, sort_order: str, limit: int, sort_field: str, field_state: Dict[str, bool]) -> Tuple[List[List[str]], str]:
-        items: List[Dict] = []
-        try:
+        def build() -> List[Dict]:
+            items: List[Dict] = []
             metrics = self.provider.merge_with_base("VWAP榜单", period, base_fields=["当前价格", "成交额"])
             for row in metrics:
                 sym = format_symbol(row.get("symbol") or row.get("交易对") or row.get("币种") or "")
@@ -243,12 +243,15 @@ class VWAP排行卡片(RankingCard):
                     "振幅": float(row.get("振幅") or 0),
                     "主动买卖比": float(row.get("主动买卖比") or 0),
                 })
+            return items
+
+        reverse = sort_order != "asc"
+        try:
+            items = self.provider.ranked("VWAP榜单", period, self.card_id, build, sort_field, reverse)
         except Exception as exc:  # pragma: no cover
             self._logger.warning("读取VWAP榜单失败: %s", exc)
             return [], _t("card.header.rank_symbol", lang=lang)
 
-        reverse = sort_order != "asc"
-        items.sort(key=lambda x: x.get(sort_field, 0), reverse=reverse)
         active_special = [f for f in self.special_display_fields if field_state.get(f[0], True)]
         active_general = [f for f in self.general_display_fields if field_state.get(f[0], True)]
 
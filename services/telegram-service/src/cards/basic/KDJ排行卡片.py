@@ -295,8 +295,8 @@ class KDJ排行卡片(RankingCard):
         return InlineKeyboardMarkup(kb)
 
     def _load_rows(self, period: str, sort_order: str, limit: int, sort_field: str, field_state: Dict[str, bool]) -> Tuple[List[List[str]], str]:
-        items: List[Dict] = []
-        try:
+        def build() -> List[Dict]:
+            items: List[Dict] = []
             metrics = self.provider.merge_with_base("KDJ随机指标榜单", period, base_fields=["当前价格", "成交额"])
             for row in metrics:
                 sym = format_symbol(row.get("symbol") or row.get("交易对") or row.get("币种") or "")
@@ -314,12 +314,15 @@ class KDJ排行卡片(RankingCard):
                     "主动买卖比": float(row.get("主动买卖比") or 0),
                     "price": float(row.get("price") or row.get("当前价格") or 0),
                 })
+            return items
+
+        reverse = sort_order != "asc"
+        try:
+            items = self.provider.ranked("KDJ随机指标榜单", period, self.card_id, build, sort_field, reverse)
         except Exception as exc:  # pragma: no cover
             self._logger.warning("读取 KDJ 榜单失败: %s", exc)
             return [], _t("card.header.rank_symbol", lang=lang)
 
-        reverse = sort_order != "asc"
-        items.sort(key=lambda x: x.get(sort_field, 0), reverse=reverse)
         # 决定展示列
         active_special = [f for f in self.special_display_fields if field_state.get(f[0], f[2] or True)]
         active_general = [f for f in self.general_display_fields if field_state.get(f[0], f[2] or True)]
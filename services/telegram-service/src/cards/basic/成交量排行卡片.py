@@ -137,9 +137,8 @@ class VolumeRankingCard(RankingCard):
         period = normalize_period(period, DEFAULT_PERIODS, default="15m")
         h.user_states["volume_period"] = period
 
-        items = self._load_rows(period)
         reverse = sort_order != "asc"
-        items.sort(key=lambda x: x.get(sort_field, 0), reverse=reverse)
+        items = self.provider.ranked("基础数据", period, self.card_id, lambda: self._load_rows(period), sort_field, reverse)
 
         # 修复：使用与 _build_keyboard 相同的默认值计算方式
         active_general = [f for f in self.general_display_fields if fields_state.get(f[0], f[2] or False)]
@@ -9,9 +9,11 @@ from __future__ import annotations
 
 import logging
 import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Callable, Dict, List, Optional, Set
 
 
 LOGGER = logging.getLogger(__name__)
@@ -49,6 +51,9 @@ def reset_symbols_cache():
     global _ALLOWED_SYMBOLS, _SYMBOLS_LOADED
     _ALLOWED_SYMBOLS = None
     _SYMBOLS_LOADED = False
+    # 快照上按币种过滤的派生结果随之失效
+    for cache in list(_SNAPSHOT_CACHES.values()):
+        cache.invalidate()
     LOGGER.info("币种缓存已重置，下次请求将重新加载")
 
 
@@ -125,6 +130,19 @@ def _period_to_db(period: str) -> str:
     return {"24h": "1d", "1day": "1d"}.get(p, p)
 
 
+def _resolve_table_name(name: str) -> str:
+    """解析表名，支持简称和自动补 .py 后缀"""
+    if name in TABLE_NAME_MAP:
+        return TABLE_NAME_MAP[name]
+    # 自动补 .py 后缀
+    if not name.endswith('.py'):
+        with_py = name + '.py'
+        if with_py in TABLE_NAME_MAP:
+            return TABLE_NAME_MAP[with_py]
+        return with_py
+    return name
+
+
 # ============================================================
 # SQLite 连接池（只读，线程安全）
 # ============================================================
@@ -239,6 +257,257 @@ import atexit
 atexit.register(_cleanup_pool)
 
 
+# ============================================================
+# 最新批次快照缓存（进程级共享）
+# ============================================================
+_SYMBOL_KEYS = ("交易对", "币种", "symbol")
+
+
+@dataclass
+class TableSnapshot:
+    """(表, 周期) 的最新批次快照
+
+    rows 为最新数据时间的行（每个交易对一行，保持表内顺序），index 按交易对索引，
+    同时登记去 USDT 后的基础币种。行对象在所有读者间共享，只读使用。
+    """
+    table: str
+    period: str
+    version: tuple
+    data_time: datetime
+    rows: List[Dict]
+    index: Dict[str, Dict]
+    _memo: Dict[object, object] = field(default_factory=dict, repr=False)
+    _memo_lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+
+    def get(self, symbol: str) -> Dict:
+        """按交易对或基础币种取行，不存在返回空字典"""
+        return self.index.get((symbol or "").strip().upper(), {})
+
+    def memo(self, key: object, build: Callable[[], object]) -> object:
+        """快照级派生数据缓存（随快照版本一起失效，build 内可嵌套 memo）"""
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        with self._memo_lock:
+            if key not in self._memo:
+                self._memo[key] = build()
+            return self._memo[key]
+
+
+def _row_symbol(row: Dict, keys: tuple = _SYMBOL_KEYS) -> str:
+    for key in keys:
+        val = row.get(key)
+        if val:
+            return str(val).upper()
+    return ""
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info('{table}')").fetchall()]
+
+
+def _load_period_rows(conn: sqlite3.Connection, table: str, period: str,
+                      cols: Optional[List[str]] = None) -> List[sqlite3.Row]:
+    """按周期读取表（无周期列时读取全表）"""
+    cur = conn.cursor()
+    cols = cols if cols is not None else _table_columns(conn, table)
+    period_cols = [c for c in cols if c in ("周期", "period", "PERIOD")]
+    if not period_cols:
+        cur.execute(f"SELECT * FROM '{table}'")
+        return cur.fetchall()
+
+    target = _normalize_period_value(period)
+    cand = list({target, target.upper(), period, period.lower(), period.upper()})
+    placeholders = ",".join("?" for _ in cand)
+    where = " OR ".join([f"{col} IN ({placeholders})" for col in period_cols])
+    cur.execute(f"SELECT * FROM '{table}' WHERE {where}", cand * len(period_cols))
+    return cur.fetchall()
+
+
+def _load_latest_batch(conn: sqlite3.Connection, table: str, period: str,
+                       cols: Optional[List[str]] = None) -> List[sqlite3.Row]:
+    """只读取最新数据时间的一批
+
+    写入端统一了 周期/交易对 的写法并建有 (周期, 数据时间, 交易对) 索引，
+    MAX 子查询与外层过滤都是索引查找；缺少相应列的表回退到按周期全量读取。
+    """
+    cols = cols if cols is not None else _table_columns(conn, table)
+    if "周期" not in cols or "数据时间" not in cols:
+        return _load_period_rows(conn, table, period, cols)
+    target = _normalize_period_value(period)
+    cur = conn.execute(
+        f"SELECT * FROM '{table}' WHERE 周期 = ? AND 数据时间 = "
+        f"(SELECT MAX(数据时间) FROM '{table}' WHERE 周期 = ?)",
+        (target, target),
+    )
+    return cur.fetchall()
+
+
+def _build_snapshot(table: str, period: str, version: tuple, rows: List[sqlite3.Row]) -> TableSnapshot:
+    """从全部行中选出最新数据时间的一批，每个交易对保留首条"""
+    target_period = _normalize_period_value(period)
+    parsed = []
+    max_ts = datetime.min
+    for row in rows:
+        r = dict(row)
+        if _normalize_period_value(str(r.get("周期", ""))) != target_period:
+            continue
+        ts = _parse_timestamp(str(r.get("数据时间", "")))
+        if ts > max_ts:
+            max_ts = ts
+        parsed.append((ts, r))
+
+    latest: List[Dict] = []
+    index: Dict[str, Dict] = {}
+    seen = set()
+    if max_ts != datetime.min:
+        for ts, r in parsed:
+            pair = str(r.get("交易对", "")).upper()
+            if ts != max_ts or pair in seen:
+                continue
+            seen.add(pair)
+            latest.append(r)
+            sym = _row_symbol(r)
+            if sym:
+                index.setdefault(sym, r)
+                index.setdefault(format_symbol(sym), r)
+    return TableSnapshot(table, period, version, max_ts, latest, index)
+
+
+class SnapshotCache:
+    """按 (表, 周期) 缓存解析后的最新批次
+
+    失效条件只有数据变化：同一只读连接上的 PRAGMA data_version（其他连接提交即变化）
+    与数据库文件 inode（整库替换）。同一 key 的并发构建只执行一次。
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._pool = _SQLitePool(db_path, pool_size=2)
+        self._probe: Optional[sqlite3.Connection] = None
+        self._probe_ino: Optional[int] = None
+        self._probe_lock = threading.Lock()
+        self._entries: Dict[tuple, TableSnapshot] = {}
+        self._build_locks: Dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._epoch = 0  # invalidate() 计数，纳入版本号
+        self._columns: Dict[str, tuple] = {}  # 表 → (版本, 列名)
+        self.hits = 0
+        self.misses = 0
+
+    def version(self) -> tuple:
+        """当前数据版本 (epoch, inode, data_version)，数据库不可用时 inode 为 None"""
+        with self._probe_lock:
+            try:
+                ino = self.db_path.stat().st_ino
+            except OSError:
+                return (self._epoch, None, 0)
+            try:
+                if self._probe is None or ino != self._probe_ino:
+                    if self._probe is not None:
+                        self._probe.close()
+                    self._probe = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True,
+                                                  check_same_thread=False, timeout=10.0)
+                    self._probe_ino = ino
+                data_version = self._probe.execute("PRAGMA data_version").fetchone()[0]
+            except sqlite3.Error as exc:
+                LOGGER.warning("读取 data_version 失败: %s", exc)
+                self._probe = None
+                return (self._epoch, None, 0)
+            return (self._epoch, ino, data_version)
+
+    def invalidate(self) -> None:
+        """强制全部快照失效（配置热更新等外部变化）"""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def get(self, table: str, period: str) -> TableSnapshot:
+        table = _resolve_table_name(table)
+        key = (table, _normalize_period_value(period))
+        version = self.version()
+        snap = self._entries.get(key)
+        if snap is not None and snap.version == version:
+            self.hits += 1
+            return snap
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            snap = self._entries.get(key)
+            if snap is not None and snap.version == version:
+                self.hits += 1
+                return snap
+            self.misses += 1
+            snap = _build_snapshot(table, period, version, self._load(table, period))
+            if version[1] is not None:
+                self._entries[key] = snap
+            return snap
+
+    def columns(self, conn: sqlite3.Connection, table: str) -> List[str]:
+        """表结构缓存：写入端重建表会改变数据版本，版本不变时不再执行 PRAGMA table_info"""
+        version = self.version()
+        cached = self._columns.get(table)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        cols = _table_columns(conn, table)
+        self._columns[table] = (version, cols)
+        return cols
+
+    def _load(self, table: str, period: str) -> List[sqlite3.Row]:
+        conn = self._pool.get()
+        if conn is None:
+            return []
+        try:
+            return _load_latest_batch(conn, table, period, self.columns(conn, table))
+        except Exception as exc:
+            LOGGER.warning("读取表 %s 失败: %s", table, exc)
+            return []
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """借用只读连接（与快照共用连接池），数据库不存在时为 None"""
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self) -> None:
+        self._pool.close_all()
+        with self._probe_lock:
+            if self._probe is not None:
+                self._probe.close()
+                self._probe = None
+
+
+_SNAPSHOT_CACHES: Dict[Path, SnapshotCache] = {}
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot_cache(db_path: Path) -> SnapshotCache:
+    """按数据库路径获取进程级共享的快照缓存"""
+    db_path = Path(db_path).resolve()
+    with _snapshot_lock:
+        cache = _SNAPSHOT_CACHES.get(db_path)
+        if cache is None:
+            cache = _SNAPSHOT_CACHES[db_path] = SnapshotCache(db_path)
+        return cache
+
+
+def _close_snapshot_caches():
+    with _snapshot_lock:
+        for cache in _SNAPSHOT_CACHES.values():
+            cache.close()
+        _SNAPSHOT_CACHES.clear()
+
+
+atexit.register(_close_snapshot_caches)
+
+
 # ============================================================
 # RankingDataProvider（market_data.db）
 # ============================================================
@@ -257,6 +526,7 @@ class RankingDataProvider:
 
         self.db_path = _resolve_path(db_path)
         self._pool = _get_pool(self.db_path)
+        self._snapshots = get_snapshot_cache(self.db_path)
 
     def _get_conn(self) -> Optional[sqlite3.Connection]:
         """从连接池获取连接"""
@@ -268,15 +538,7 @@ class RankingDataProvider:
 
     def _resolve_table(self, name: str) -> str:
         """解析表名，支持简称和自动补 .py 后缀"""
-        if name in TABLE_NAME_MAP:
-            return TABLE_NAME_MAP[name]
-        # 自动补 .py 后缀
-        if not name.endswith('.py'):
-            with_py = name + '.py'
-            if with_py in TABLE_NAME_MAP:
-                return TABLE_NAME_MAP[with_py]
-            return with_py
-        return name
+        return _resolve_table_name(name)
 
     def _load_table(self, table: str) -> List[sqlite3.Row]:
         table = self._resolve_table(table)
@@ -300,20 +562,7 @@ class RankingDataProvider:
         if conn is None:
             return []
         try:
-            cur = conn.cursor()
-            cur.execute(f"PRAGMA table_info('{table}')")
-            cols = [row[1] for row in cur.fetchall()]
-            period_cols = [c for c in cols if c in ("周期", "period", "PERIOD")]
-            if not period_cols:
-                cur.execute(f"SELECT * FROM '{table}'")
-                return cur.fetchall()
-
-            target = _normalize_period_value(period)
-            cand = list({target, target.upper(), period, period.lower(), period.upper()})
-            placeholders = ",".join("?" for _ in cand)
-            where = " OR ".join([f"{col} IN ({placeholders})" for col in period_cols])
-            cur.execute(f"SELECT * FROM '{table}' WHERE {where}", cand * len(period_cols))
-            return cur.fetchall()
+            return _load_period_rows(conn, table, period, self._snapshots.columns(conn, table))
         except Exception as exc:
             LOGGER.warning("读取表 %s 失败: %s", table, exc)
             return []
@@ -321,7 +570,11 @@ class RankingDataProvider:
             self._return_conn(conn)
 
     def _fetch_single_row(self, table: str, period: str, symbol: str) -> Dict:
-        """按周期+交易对取一行"""
+        """按周期+交易对取该币种最近一行
+
+        写入端已将交易对统一为大写，交易对/周期为等值条件，
+        走 (交易对, 周期, 数据时间) 索引倒序取一条。
+        """
         table = self._resolve_table(table)
         conn = self._get_conn()
         if conn is None:
@@ -329,31 +582,31 @@ class RankingDataProvider:
         try:
             cur = conn.cursor()
             norm_p = _normalize_period_value(period)
-            sym_full = symbol.upper()
+            sym_full = symbol.strip().upper()
             sym_with_usdt = sym_full if sym_full.endswith("USDT") else sym_full + "USDT"
-            sym_base = sym_full.replace("USDT", "")
-            
-            cur.execute(f"PRAGMA table_info('{table}')")
-            cols = [row[1] for row in cur.fetchall()]
+            sym_base = format_symbol(sym_full)
+
+            cols = self._snapshots.columns(conn, table)
             period_cols = [c for c in cols if c.lower() in ("周期", "period", "interval")]
-            
-            # 动态构建 symbol 查询条件（只用存在的列）
+
+            # 动态构建 symbol 查询条件：有交易对列时只用交易对（OR 其他列会退化为全表扫描）
             sym_conds = []
             sym_params = []
             if "交易对" in cols:
-                sym_conds.append("(upper(交易对)=? OR replace(upper(交易对),'USDT','')=?)")
+                sym_conds.append("交易对 IN (?, ?)")
                 sym_params.extend([sym_with_usdt, sym_base])
-            if "币种" in cols:
-                sym_conds.append("upper(币种)=?")
-                sym_params.append(sym_base)
-            if "symbol" in cols:
-                sym_conds.append("upper(symbol)=?")
-                sym_params.append(sym_base)
-            
+            else:
+                if "币种" in cols:
+                    sym_conds.append("upper(币种)=?")
+                    sym_params.append(sym_base)
+                if "symbol" in cols:
+                    sym_conds.append("upper(symbol)=?")
+                    sym_params.append(sym_base)
+
             if not sym_conds:
                 return {}
             sym_where = "(" + " OR ".join(sym_conds) + ")"
-            
+
             # 动态构建 ORDER BY（只用存在的列）
             order_cols = []
             for oc in ["数据时间", "时间", "timestamp"]:
@@ -363,10 +616,8 @@ class RankingDataProvider:
             order_by = ", ".join(order_cols)
 
             if period_cols:
-                period_vals = (norm_p, period.lower(), period.upper(), period)
-                placeholders = ",".join("?" for _ in period_vals)
-                period_cond = " OR ".join([f"{col} IN ({placeholders})" for col in period_cols])
-                params = list(period_vals) * len(period_cols) + sym_params
+                period_cond = " OR ".join([f"{col} = ?" for col in period_cols])
+                params = [norm_p] * len(period_cols) + sym_params
                 cur.execute(f"""
                     SELECT * FROM '{table}'
                     WHERE ({period_cond}) AND {sym_where}
@@ -388,152 +639,131 @@ class RankingDataProvider:
         finally:
             self._return_conn(conn)
 
+    # ---------------- 快照 ----------------
+    def snapshot(self, table: str, period: str) -> TableSnapshot:
+        """(表, 周期) 最新批次快照（进程级共享，数据版本变化前不重复读取）"""
+        return self._snapshots.get(table, period)
+
+    def data_version(self) -> tuple:
+        """数据库当前数据版本（任意表写入后变化），用作渲染缓存键"""
+        return self._snapshots.version()
+
+    def _latest_rows(self, table: str, period: str) -> List[Dict]:
+        """最新批次中按配置过滤后的行（共享对象，只读）"""
+        snap = self.snapshot(table, period)
+        allowed = _get_allowed_symbols()
+        if not allowed:
+            return snap.rows
+        return snap.memo("allowed_rows", lambda: [
+            r for r in snap.rows if str(r.get("交易对", "")).upper() in allowed
+        ])
+
+    def _base_map(self, period: str) -> Dict[str, Dict]:
+        """最新批次基础数据 {交易对: 行}（共享对象，只读）"""
+        snap = self.snapshot("基础数据", period)
+        rows = self._latest_rows("基础数据", period)
+        return snap.memo("base_map", lambda: {
+            str(r.get("交易对", "")).upper(): r for r in rows if r.get("交易对")
+        })
+
+    @staticmethod
+    def _merge_row(r: Dict, sym: str, base: Dict, base_fields: Optional[List[str]] = None) -> Dict:
+        row = dict(r)
+        row["symbol"] = sym
+        row["price"] = float(base.get("当前价格", r.get("当前价格", 0)) or 0)
+        row["quote_volume"] = float(base.get("成交额", r.get("成交额", 0)) or 0)
+        row["change_percent"] = float(base.get("变化率", 0) or 0)
+        row["updated_at"] = base.get("数据时间") or r.get("数据时间")
+        for k in ["振幅", "交易次数", "成交笔数", "主动买入量", "主动卖出量", "主动买额", "主动卖额", "主动买卖比"]:
+            if k in base:
+                row[k] = base.get(k)
+        if base_fields:
+            for bf in base_fields:
+                if bf in base:
+                    row[bf] = base.get(bf)
+        return row
+
     # ---------------- 公共读取 ----------------
     def fetch_base(self, period: str) -> Dict[str, Dict]:
         """按周期取基础数据 - 只取最新批次（同一时间戳），按配置过滤币种"""
-        rows = self._load_table_period("基础数据", period)
-        target_period = _normalize_period_value(period)
-        allowed = _get_allowed_symbols()
-        
-        # 第一遍：找出最新时间戳
-        max_ts = datetime.min
-        for row in rows:
-            r = dict(row)
-            r_period = _normalize_period_value(str(r.get("周期", "")))
-            if r_period != target_period:
-                continue
-            sym = str(r.get("交易对", "")).upper()
-            if allowed and sym not in allowed:
-                continue
-            ts = _parse_timestamp(str(r.get("数据时间", "")))
-            if ts > max_ts:
-                max_ts = ts
-        
-        if max_ts == datetime.min:
-            return {}
-        
-        # 第二遍：只取最新时间戳的数据
-        latest: Dict[str, Dict] = {}
-        for row in rows:
-            r = dict(row)
-            r_period = _normalize_period_value(str(r.get("周期", "")))
-            if r_period != target_period:
-                continue
-            ts = _parse_timestamp(str(r.get("数据时间", "")))
-            sym = str(r.get("交易对", "")).upper()
-            if allowed and sym not in allowed:
-                continue
-            if ts == max_ts and sym and sym not in latest:
-                latest[sym] = r
-        return latest
+        return {sym: dict(r) for sym, r in self._base_map(period).items()}
 
     def fetch_metric(self, table: str, period: str) -> List[Dict]:
         """通用指标表读取 - 只取最新一批数据（同一时间戳），每个币种只保留一条，按配置过滤币种"""
-        rows = self._load_table_period(table, period)
-        target_period = _normalize_period_value(period)
-        allowed = _get_allowed_symbols()
-        
-        # 第一遍：找出最新时间戳（用 datetime 比较）
-        max_ts = datetime.min
-        for row in rows:
-            r = dict(row)
-            r_period = _normalize_period_value(str(r.get("周期", "")))
-            if r_period != target_period:
-                continue
-            sym = str(r.get("交易对", "")).upper()
-            if allowed and sym not in allowed:
-                continue
-            ts = _parse_timestamp(str(r.get("数据时间", "")))
-            if ts > max_ts:
-                max_ts = ts
-        
-        if max_ts == datetime.min:
-            return []
-        
-        # 第二遍：只取最新时间戳的数据，每个币种只保留一条
-        seen = set()
-        result = []
-        for row in rows:
-            r = dict(row)
-            r_period = _normalize_period_value(str(r.get("周期", "")))
-            if r_period != target_period:
-                continue
-            ts = _parse_timestamp(str(r.get("数据时间", "")))
-            sym = str(r.get("交易对", "")).upper()
-            if allowed and sym not in allowed:
-                continue
-            if ts == max_ts and sym not in seen:
-                seen.add(sym)
-                result.append(r)
-        
-        return result
+        return [dict(r) for r in self._latest_rows(table, period)]
 
     def fetch_base_row(self, period: str, symbol: str) -> Dict:
-        return self._fetch_single_row("基础数据", period, symbol)
+        row = self.snapshot("基础数据", period).get(symbol)
+        return dict(row) if row else self._fetch_single_row("基础数据", period, symbol)
 
     def fetch_row(self, table: str, period: str, symbol: str, *,
                   symbol_keys: tuple = ("交易对", "币种", "symbol"),
                   base_fields: Optional[List[str]] = None) -> Dict:
-        row = self._fetch_single_row(table, period, symbol)
+        """单币种行：优先取最新批次快照，不在最新批次时回退到该币种最近一行"""
+        row = self.snapshot(table, period).get(symbol) or self._fetch_single_row(table, period, symbol)
         if not row:
             return {}
         base = self.fetch_base_row(period, symbol) or {}
-        sym = symbol.upper()
-        merged = dict(row)
-        merged["symbol"] = sym
-        merged["price"] = float(base.get("当前价格", row.get("当前价格", 0)) or 0)
-        merged["quote_volume"] = float(base.get("成交额", row.get("成交额", 0)) or 0)
-        merged["change_percent"] = float(base.get("变化率", 0) or 0)
-        merged["updated_at"] = base.get("数据时间") or row.get("数据时间")
-        for k in ["振幅", "交易次数", "成交笔数", "主动买入量", "主动卖出量", "主动买额", "主动卖额", "主动买卖比"]:
-            if k in base:
-                merged[k] = base.get(k)
-        if base_fields:
-            for bf in base_fields:
-                if bf in base:
-                    merged[bf] = base.get(bf)
-        return merged
+        return self._merge_row(row, symbol.upper(), base, base_fields)
+
+    def merged_row(self, table: str, period: str, symbol: str,
+                   symbol_keys: tuple = ("交易对", "币种", "symbol"),
+                   base_fields: Optional[List[str]] = None) -> Dict:
+        """merge_with_base 结果中指定币种的一行（按交易对或基础币种查找），不存在返回空字典"""
+        snap = self.snapshot(table, period)
+        rows = self._latest_rows(table, period)
+
+        def build() -> Dict[str, Dict]:
+            index: Dict[str, Dict] = {}
+            for r in rows:
+                sym = _row_symbol(r, symbol_keys)
+                if sym:
+                    index[sym] = r
+                    index[format_symbol(sym)] = r
+            return index
+
+        key = (symbol or "").strip().upper()
+        r = snap.memo(("merge_index", symbol_keys), build).get(key)
+        if r is None:
+            return {}
+        sym = _row_symbol(r, symbol_keys)
+        return self._merge_row(r, sym, self._base_map(period).get(sym, {}), base_fields)
 
     def merge_with_base(self, table: str, period: str,
                         symbol_keys: tuple = ("交易对", "币种", "symbol"),
                         base_fields: Optional[List[str]] = None) -> List[Dict]:
         """合并指标表与基础数据"""
-        metrics = self.fetch_metric(table, period)
+        metrics = self._latest_rows(table, period)
         if not metrics:
             return []
-        base_map = self.fetch_base(period)
+        base_map = self._base_map(period)
         merged: List[Dict] = []
         for r in metrics:
-            sym = ""
-            for key in symbol_keys:
-                val = r.get(key)
-                if val:
-                    sym = str(val).upper()
-                    break
+            sym = _row_symbol(r, symbol_keys)
             if not sym:
                 continue
-            base = base_map.get(sym, {})
-            row = dict(r)
-            row["symbol"] = sym
-            row["price"] = float(base.get("当前价格", r.get("当前价格", 0)) or 0)
-            row["quote_volume"] = float(base.get("成交额", r.get("成交额", 0)) or 0)
-            row["change_percent"] = float(base.get("变化率", 0) or 0)
-            row["updated_at"] = base.get("数据时间") or r.get("数据时间")
-            for k in ["振幅", "交易次数", "成交笔数", "主动买入量", "主动卖出量", "主动买额", "主动卖额", "主动买卖比"]:
-                if k in base:
-                    row[k] = base.get(k)
-            if base_fields:
-                for bf in base_fields:
-                    if bf in base:
-                        row[bf] = base.get(bf)
-            merged.append(row)
+            merged.append(self._merge_row(r, sym, base_map.get(sym, {}), base_fields))
         return merged
 
+    def ranked(self, table: str, period: str, name: str, build: Callable[[], List[Dict]],
+               sort_field: str, reverse: bool = True) -> List[Dict]:
+        """卡片条目按字段排序后的列表
+
+        build() 生成的条目与每个 (字段, 方向) 的排序结果都挂在 (表, 周期) 快照上，
+        数据版本不变时翻页/切换排序直接复用；返回的列表与条目在用户间共享，只读使用。
+        """
+        snap = self.snapshot(table, period)
+        items = snap.memo(("items", name), build)
+        return snap.memo(
+            ("order", name, sort_field, reverse),
+            lambda: sorted(items, key=lambda x: x.get(sort_field, 0), reverse=reverse),
+        )
+
     def get_volume_rows(self, period: str) -> List[Dict]:
-        metric_rows = self.fetch_metric("Volume", period)
+        metric_rows = self._latest_rows("Volume", period)
         if not metric_rows:
             return []
-        base_map = self.fetch_base(period)
+        base_map = self._base_map(period)
         merged: List[Dict] = []
         for r in metric_rows:
             sym = str(r.get("交易对", "")).upper()
@@ -554,10 +784,10 @@ class RankingDataProvider:
         return merged
 
     def get_atr_rows(self, period: str) -> List[Dict]:
-        metrics = self.fetch_metric("ATR波幅榜单", period)
+        metrics = self._latest_rows("ATR波幅榜单", period)
         if not metrics:
             return []
-        base_map = self.fetch_base(period)
+        base_map = self._base_map(period)
         out: List[Dict] = []
         for r in metrics:
             sym = str(r.get("交易对", r.get("币种", ""))).upper()
@@ -586,4 +816,5 @@ def get_ranking_provider() -> RankingDataProvider:
     return _PROVIDER
 
 
-__all__ = ["RankingDataProvider", "get_ranking_provider", "format_symbol"]
+__all__ = ["RankingDataProvider", "get_ranking_provider", "format_symbol",
+           "SnapshotCache", "TableSnapshot", "get_snapshot_cache"]
@@ -228,8 +228,8 @@ class FuturesOITrendCard(RankingCard):
         sort_field: str,
         field_state: Dict[str, bool],
     ):
-        items: List[Dict] = []
-        try:
+        def build() -> List[Dict]:
+            items: List[Dict] = []
             metrics = self.provider.merge_with_base("期货情绪聚合表.py", period, base_fields=["数据时间"])
             for row in metrics:
                 sym = format_symbol(row.get("symbol") or row.get("交易对") or "")
@@ -246,12 +246,15 @@ class FuturesOITrendCard(RankingCard):
                     "主动买卖比": float(row.get("主动买卖比") or 0),
                     "price": float(row.get("price") or 0),
                 })
+            return items
+
+        reverse = sort_order != "asc"
+        try:
+            items = self.provider.ranked("期货情绪聚合表.py", period, self.card_id, build, sort_field, reverse)
         except Exception as exc:  # pragma: no cover
             self._logger.warning("读取期货情绪聚合表失败: %s", exc)
             return [], _t("card.header.rank_symbol", lang=lang)
 
-        reverse = sort_order != "asc"
-        items.sort(key=lambda x: x.get(sort_field, 0), reverse=reverse)
 
         active_special = [f for f in self.special_display_fields if field_state.get(f[0], True)]
         active_general = [f for f in self.general_display_fields if field_state.get(f[0], True)]
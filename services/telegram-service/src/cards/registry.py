@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import copy
 import importlib
 import logging
 import os
@@ -11,15 +12,58 @@ from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 
 from cards.base import RankingCard
+from cards.data_provider import RankingDataProvider
 from cards.i18n import btn as _btn
+from cards.render_cache import freeze, get_render_cache
 
 
 # 从环境变量读取卡片配置
 CARDS_ENABLED = [c.strip().lower() for c in os.environ.get("CARDS_ENABLED", "").split(",") if c.strip()]
 CARDS_DISABLED = [c.strip().lower() for c in os.environ.get("CARDS_DISABLED", "").split(",") if c.strip()]
 
+# 渲染缓存中的时间占位符（get_current_time_display 的各字段）
+_TIME_PLACEHOLDERS = {k: f"\x00time:{k}\x00" for k in ("full", "time_only", "hour_min")}
+
+
+class _TemplateHandler:
+    """渲染缓存用的处理器代理：时间返回占位符，其余属性读写透传给原处理器"""
+
+    def __init__(self, handler) -> None:
+        object.__setattr__(self, "_handler", handler)
+
+    def __getattr__(self, name: str):
+        return getattr(self._handler, name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self._handler, name, value)
+
+    def get_current_time_display(self) -> Dict[str, str]:
+        return dict(_TIME_PLACEHOLDERS)
+
+
+def _state_snapshot(value):
+    """用于比较渲染前后的用户状态；无法规范化的值退化为 repr"""
+    try:
+        return freeze(value)
+    except TypeError:
+        return repr(value)
+
+
+def _fill_time(result, handler):
+    """把缓存文本中的时间占位符替换为当前时间"""
+    if not (isinstance(result, tuple) and result and isinstance(result[0], str)):
+        return result
+    text = result[0]
+    if "\x00time:" not in text:
+        return result
+    now = handler.get_current_time_display()
+    for k, placeholder in _TIME_PLACEHOLDERS.items():
+        text = text.replace(placeholder, str(now.get(k, "")))
+    return (text, *result[1:])
+
 
 class RankingRegistry:
     """自动扫描并注册排行榜卡片插件"""
@@ -79,7 +123,7 @@ class RankingRegistry:
             short = name.split(".")[-1]
 
             # 跳过内部模块
-            if short.startswith("_") or short in {"base", "registry"}:
+            if short.startswith("_") or short in {"base", "registry", "render_cache"}:
                 continue
 
             try:
@@ -92,6 +136,7 @@ class RankingRegistry:
             if isinstance(card, RankingCard):
                 self._hydrate_field_defaults(card)
                 self._wrap_field_settings(card)
+                self._wrap_render_cache(card)
                 if card.card_id in self.BLACKLIST:
                     self._logger.info("⏸️ 已跳过黑名单卡片: %s", card.card_id)
                     continue
@@ -137,7 +182,13 @@ class RankingRegistry:
         if not card:
             return False
 
-        return await card.handle_callback(update, context, services)
+        try:
+            return await card.handle_callback(update, context, services)
+        except BadRequest as exc:
+            # 数据与时间均未变化时文本完全相同，重复点击当前选项不再视为错误
+            if "message is not modified" in str(exc).lower():
+                return True
+            raise
 
     # ---------- 内部工具 ----------
     def _hydrate_field_defaults(self, card: RankingCard) -> None:
@@ -170,6 +221,58 @@ class RankingRegistry:
         except Exception as exc:  # pragma: no cover - 防御性日志
             self._logger.warning("⚠️ 补全字段默认状态失败 %s: %s", getattr(card, "card_id", "?"), exc)
 
+    # ---------- 渲染缓存 ----------
+    def _wrap_render_cache(self, card: RankingCard) -> None:
+        """数据来自排行榜 SQLite 的卡片：按 (卡片, 视图, 用户状态, 语言, 数据版本) 缓存渲染结果
+
+        用户状态只取卡片 default_state 声明的键（周期/排序/条数/字段开关等），
+        数据版本取 SnapshotCache.version()，任意写入后自动失效。
+        缓存的是不含时间的文本模板：渲染时时间取占位符，每次返回前填入当前时间；
+        渲染对 user_states 的修改（字段默认值、排序字段纠正等）一并缓存，命中时重放。
+        """
+        provider = getattr(card, "provider", None)
+        if not isinstance(provider, RankingDataProvider):
+            return
+        cache = get_render_cache()
+        if not cache.enabled:
+            return
+        state_keys = sorted(card.default_state)
+
+        def wrap(view: str, orig):
+            async def payload_wrapper(h, ensure, *args: Any, **kwargs: Any):
+                states = getattr(h, "user_states", None)
+                if not isinstance(states, dict):
+                    return await orig(h, ensure, *args, **kwargs)
+                lang = kwargs.get("lang", args[0] if args else None)
+                key = (
+                    card.card_id,
+                    view,
+                    tuple((k, freeze(states.get(k))) for k in state_keys),
+                    lang,
+                    provider.data_version(),
+                )
+
+                async def render():
+                    before = {k: _state_snapshot(v) for k, v in states.items()}
+                    result = await orig(_TemplateHandler(h), ensure, *args, **kwargs)
+                    changes = {
+                        k: copy.deepcopy(v) for k, v in states.items()
+                        if k not in before or before[k] != _state_snapshot(v)
+                    }
+                    return result, changes
+
+                result, changes = await cache.aget_or_render(key, render)
+                for k, v in changes.items():
+                    states[k] = copy.deepcopy(v)  # 卡片会原地修改状态（字段开关），不能共享缓存对象
+                return _fill_time(result, h)
+
+            return payload_wrapper
+
+        for attr, view in (("_build_payload", "main"), ("_build_settings_payload", "settings")):
+            orig = getattr(card, attr, None)
+            if callable(orig):
+                setattr(card, attr, wrap(view, orig))
+
     # ---------- 统一字段开关迁移到设置页 ----------
     def _wrap_field_settings(self, card: RankingCard) -> None:
         toggle_prefix = self._find_toggle_prefix(card)
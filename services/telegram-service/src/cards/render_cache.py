@@ -0,0 +1,114 @@
+"""渲染结果缓存 - (卡片, 视图状态, 语言, 数据版本) → (text, keyboard)
+
+同一数据版本内，相同视图状态 + 语言的请求直接返回已渲染的文本与键盘，
+不再读取 SQLite / 对齐 / 翻译 / 构建键盘。数据版本变化后旧条目自然不再命中，按 LRU 淘汰。
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+RENDER_CACHE_SIZE = int(os.environ.get("RENDER_CACHE_SIZE", "512") or 0)
+
+
+def freeze(value: object) -> Hashable:
+    """把用户状态（dict/list/set 嵌套）转换为可哈希的规范形式"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(freeze(v) for v in value))
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+class RenderCache:
+    """有界 LRU，带命中统计"""
+
+    def __init__(self, max_items: int = RENDER_CACHE_SIZE) -> None:
+        self.max_items = max_items
+        self._items: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_items > 0
+
+    def get(self, key: Hashable) -> Optional[object]:
+        with self._lock:
+            try:
+                value = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: object) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def get_or_render(self, key: Hashable, render: Callable[[], object]) -> object:
+        if not self.enabled:
+            return render()
+        value = self.get(key)
+        if value is None:
+            value = render()
+            self.put(key, value)
+        return value
+
+    async def aget_or_render(self, key: Hashable, render: Callable[[], Awaitable[object]]) -> object:
+        if not self.enabled:
+            return await render()
+        value = self.get(key)
+        if value is None:
+            value = await render()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._items),
+                "max_items": self.max_items,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_render_cache: Optional[RenderCache] = None
+_render_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> RenderCache:
+    """进程级共享的渲染缓存"""
+    global _render_cache
+    if _render_cache is None:
+        with _render_cache_lock:
+            if _render_cache is None:
+                _render_cache = RenderCache()
+    return _render_cache
+
+
+__all__ = ["RenderCache", "freeze", "get_render_cache", "RENDER_CACHE_SIZE"]
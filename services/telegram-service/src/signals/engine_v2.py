@@ -8,11 +8,16 @@ import time
 import logging
 import threading
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Optional, Set
 from dataclasses import dataclass, field
 
-from .rules import ALL_RULES, RULES_BY_TABLE, SignalRule
+from cards.data_provider import TableSnapshot, get_snapshot_cache
+
+from .rules import ALL_RULES, COLUMNAR_TYPES, RULES_BY_TABLE, SignalRule, evaluate_columnar
 from .formatter import get_formatter
+from .history import get_history
+from .write_behind import WriteBehindLog
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +64,31 @@ def _init_cooldown_db():
 _init_cooldown_db()
 
 
+def _apply_cooldowns(conn: sqlite3.Connection, ops: List[list]):
+    """后写队列回放：["set", key, ts] / ["prune", cutoff]"""
+    for op in ops:
+        if op[0] == "set":
+            conn.execute("INSERT OR REPLACE INTO cooldowns (key, timestamp) VALUES (?, ?)", (op[1], op[2]))
+        elif op[0] == "prune":
+            conn.execute("DELETE FROM cooldowns WHERE timestamp < ?", (op[1],))
+
+
+def _load_cooldowns(max_age: float) -> Dict[str, float]:
+    """启动时一次性载入未过期的冷却记录，并删除过期记录"""
+    cutoff = time.time() - max_age
+    try:
+        conn = sqlite3.connect(COOLDOWN_DB_PATH, timeout=10)
+        try:
+            conn.execute("DELETE FROM cooldowns WHERE timestamp < ?", (cutoff,))
+            conn.commit()
+            return dict(conn.execute("SELECT key, timestamp FROM cooldowns").fetchall())
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"加载冷却记录失败: {e}")
+        return {}
+
+
 @dataclass
 class Signal:
     """信号数据结构"""
@@ -74,6 +104,7 @@ class Signal:
     category: str = ""
     subcategory: str = ""
     priority: str = "medium"
+    table: str = ""
 
 
 class SignalEngine:
@@ -81,8 +112,14 @@ class SignalEngine:
 
     def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
+        self._snapshots = get_snapshot_cache(Path(db_path))
         self.baseline: Dict[str, Dict] = {}  # {table_symbol_tf: row_data}
-        self.cooldown: Dict[str, float] = {}  # {rule_symbol_tf: last_trigger_time}
+        self._seen: Dict[tuple, TableSnapshot] = {}  # {(table, tf): 上轮已检查的快照}
+        # 冷却全部常驻内存，写入经后写队列每轮一次事务落盘
+        self._max_cooldown = max((r.cooldown for r in ALL_RULES), default=0)
+        self._cooldown_log = WriteBehindLog(COOLDOWN_DB_PATH, "cooldowns", _apply_cooldowns)
+        self.cooldown: Dict[str, float] = _load_cooldowns(self._max_cooldown)  # {rule_symbol_tf: last_trigger_time}
+        self._last_prune = time.time()
         self.callbacks: List[callable] = []
         self.baseline_loaded = False
         self.formatter = get_formatter()
@@ -93,6 +130,8 @@ class SignalEngine:
             "checks": 0,
             "signals": 0,
             "errors": 0,
+            "skipped_tables": 0,
+            "changed_rows": 0,
         }
 
     def register_callback(self, callback: callable):
@@ -109,77 +148,71 @@ class SignalEngine:
         self.enabled_rules.discard(name)
         return True
 
-    def _get_conn(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
-
-    def _get_table_data(self, table: str, timeframe: str) -> Dict[str, Dict]:
-        """获取表中指定周期的所有数据"""
+    def _get_snapshot(self, table: str, timeframe: str) -> Optional[TableSnapshot]:
+        """与卡片/快照共用进程级最新批次缓存，数据版本未变时不再读库"""
         # 白名单验证防止SQL注入
         if table not in RULES_BY_TABLE:
             logger.warning(f"非法表名: {table}")
-            return {}
+            return None
         try:
-            conn = self._get_conn()
-            cursor = conn.cursor()
-            cursor.execute(f'SELECT * FROM "{table}" WHERE "周期" = ? OR "周期" IS NULL', (timeframe,))
-            rows = cursor.fetchall()
-            conn.close()
-
-            result = {}
-            for row in rows:
-                row_dict = dict(row)
-                symbol = row_dict.get("交易对", "")
-                if symbol:
-                    result[symbol] = row_dict
-            return result
+            return self._snapshots.get(table, timeframe)
         except Exception as e:
             logger.warning(f"读取表 {table} 失败: {e}")
+            return None
+
+    def _get_table_data(self, table: str, timeframe: str) -> Dict[str, Dict]:
+        """获取表中指定周期的所有数据 {交易对: 行}（共享对象，只读）"""
+        snap = self._get_snapshot(table, timeframe)
+        if snap is None:
             return {}
+        return snap.memo("by_pair", lambda: {row["交易对"]: row for row in snap.rows if row.get("交易对")})
 
     def _get_symbol_all_tables(self, symbol: str, timeframe: str) -> Dict[str, Dict]:
-        """获取单个币种所有表的数据"""
+        """获取单个币种所有表的数据（直接取快照索引，不重新读表）"""
         result = {}
         for table in RULES_BY_TABLE.keys():
-            data = self._get_table_data(table, timeframe)
-            if symbol in data:
-                result[table] = data[symbol]
+            snap = self._get_snapshot(table, timeframe)
+            row = snap.get(symbol) if snap else None
+            if row:
+                result[table] = row
         return result
 
     def _is_cooled_down(self, rule: SignalRule, symbol: str, timeframe: str) -> bool:
         """检查是否在冷却期"""
-        key = f"{rule.name}_{symbol}_{timeframe}"
-        # 先查内存缓存
-        last = self.cooldown.get(key)
-        if last is None:
-            # 从数据库加载
-            try:
-                conn = sqlite3.connect(COOLDOWN_DB_PATH)
-                row = conn.execute("SELECT timestamp FROM cooldowns WHERE key = ?", (key,)).fetchone()
-                conn.close()
-                last = row[0] if row else 0
-                self.cooldown[key] = last
-            except Exception:
-                last = 0
+        last = self.cooldown.get(f"{rule.name}_{symbol}_{timeframe}", 0)
         return time.time() - last > rule.cooldown
 
     def _set_cooldown(self, rule: SignalRule, symbol: str, timeframe: str):
-        """设置冷却"""
+        """设置冷却（内存立即生效，持久化随本轮批量写入）"""
         key = f"{rule.name}_{symbol}_{timeframe}"
         ts = time.time()
         self.cooldown[key] = ts
-        # 持久化
-        try:
-            conn = sqlite3.connect(COOLDOWN_DB_PATH)
-            conn.execute("INSERT OR REPLACE INTO cooldowns (key, timestamp) VALUES (?, ?)", (key, ts))
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            logger.warning(f"保存冷却失败: {e}")
+        self._cooldown_log.put(["set", key, ts])
+
+    def _prune_cooldowns(self, interval: float = 3600):
+        """定期清理已超过最长冷却时间的记录"""
+        now = time.time()
+        if now - self._last_prune < interval:
+            return
+        self._last_prune = now
+        cutoff = now - self._max_cooldown
+        expired = [k for k, ts in self.cooldown.items() if ts < cutoff]
+        for k in expired:
+            del self.cooldown[k]
+        if expired:
+            self._cooldown_log.put(["prune", cutoff])
+
+    def flush(self, wait: bool = False):
+        """提交本轮积压的冷却与历史记录"""
+        self._cooldown_log.flush(wait=wait)
+        get_history().flush(wait=wait)
 
     def check_signals(self) -> List[Signal]:
-        """检查所有规则"""
+        """检查所有规则
+
+        只处理快照发生变化的 (表, 周期)，且只对与上轮基线不同的币种求值；
+        STATE_CHANGE / 阈值穿越规则按列批量求值，其余规则逐行调用 check_condition。
+        """
         signals = []
         self.stats["checks"] += 1
 
@@ -196,85 +229,76 @@ class SignalEngine:
                 all_timeframes.update(r.timeframes)
 
             for timeframe in all_timeframes:
-                # 获取当前数据
-                current_data = self._get_table_data(table, timeframe)
-
-                for symbol, curr_row in current_data.items():
-                    # 成交额过滤
-                    volume = curr_row.get("成交额") or curr_row.get("成交额（USDT）") or 0
-
+                snap = self._get_snapshot(table, timeframe)
+                if snap is None:
+                    continue
+                # 数据版本未变时快照对象不变，整表跳过
+                if self._seen.get((table, timeframe)) is snap:
+                    self.stats["skipped_tables"] += 1
+                    continue
+                self._seen[(table, timeframe)] = snap
+
+                # 与基线比对，只保留变化的币种
+                changed: Dict[str, tuple] = {}
+                for symbol, curr_row in self._get_table_data(table, timeframe).items():
                     cache_key = f"{table}_{symbol}_{timeframe}"
                     prev_row = self.baseline.get(cache_key)
-
-                    # 第一次只缓存基线
-                    if not self.baseline_loaded:
-                        self.baseline[cache_key] = curr_row
+                    if prev_row is curr_row or prev_row == curr_row:
                         continue
+                    self.baseline[cache_key] = curr_row
+                    changed[symbol] = (prev_row, curr_row)
+
+                # 第一次只缓存基线
+                if not self.baseline_loaded or not changed:
+                    continue
+                self.stats["changed_rows"] += len(changed)
+
+                tf_rules = [r for r in active_rules if timeframe in r.timeframes]
+                columnar = [r for r in tf_rules if r.condition_type in COLUMNAR_TYPES]
+                fired = {id(r): hits for r, hits in zip(columnar, evaluate_columnar(columnar, changed))}
+                for rule in tf_rules:
+                    if rule.condition_type in COLUMNAR_TYPES:
+                        continue
+                    hits = set()
+                    for symbol, (prev_row, curr_row) in changed.items():
+                        try:
+                            if rule.check_condition(prev_row, curr_row):
+                                hits.add(symbol)
+                        except Exception as e:
+                            self.stats["errors"] += 1
+                            logger.warning(f"规则检查异常 {rule.name}: {e}")
+                    fired[id(rule)] = hits
 
-                    # 检查每条规则
-                    for rule in active_rules:
-                        if timeframe not in rule.timeframes:
+                for symbol, (prev_row, curr_row) in changed.items():
+                    # 成交额过滤
+                    volume = curr_row.get("成交额") or curr_row.get("成交额（USDT）") or 0
+                    for rule in tf_rules:
+                        if symbol not in fired[id(rule)] or volume < rule.min_volume:
                             continue
-                        if volume < rule.min_volume:
+                        if not self._is_cooled_down(rule, symbol, timeframe):
                             continue
-
                         try:
-                            if rule.check_condition(prev_row, curr_row):
-                                if self._is_cooled_down(rule, symbol, timeframe):
-                                    # 获取完整数据用于格式化
-                                    curr_all = self._get_symbol_all_tables(symbol, timeframe)
-                                    prev_all = {}
-                                    for t in RULES_BY_TABLE.keys():
-                                        pk = f"{t}_{symbol}_{timeframe}"
-                                        if pk in self.baseline:
-                                            prev_all[t] = self.baseline[pk]
-
-                                    # 格式化消息
-                                    rule_msg = rule.format_message(prev_row, curr_row)
-                                    price = curr_row.get("当前价格") or curr_row.get("价格") or curr_row.get("收盘价") or 0
-
-                                    full_msg = self.formatter.format_signal(
-                                        symbol=symbol,
-                                        direction=rule.direction,
-                                        rule_name=rule.name,
-                                        timeframe=timeframe,
-                                        strength=rule.strength,
-                                        curr_data=curr_all,
-                                        prev_data=prev_all,
-                                        rule_message=rule_msg
-                                    )
-
-                                    signal = Signal(
-                                        symbol=symbol,
-                                        direction=rule.direction,
-                                        strength=rule.strength,
-                                        rule_name=rule.name,
-                                        timeframe=timeframe,
-                                        price=price,
-                                        message=rule_msg,
-                                        full_message=full_msg,
-                                        category=rule.category,
-                                        subcategory=rule.subcategory,
-                                        priority=rule.priority
-                                    )
-                                    signals.append(signal)
-                                    self._set_cooldown(rule, symbol, timeframe)
-                                    self.stats["signals"] += 1
-
-                                    logger.info(f"信号触发: {symbol} {rule.direction} - {rule.name} ({timeframe})")
-                                    
-                                    # 保存到历史记录
-                                    try:
-                                        from .history import get_history
-                                        get_history().save(signal, source="sqlite")
-                                    except Exception as he:
-                                        logger.warning(f"保存历史记录失败: {he}")
+                            signal = self._build_signal(rule, symbol, timeframe, prev_row, curr_row)
                         except Exception as e:
                             self.stats["errors"] += 1
                             logger.warning(f"规则检查异常 {rule.name}: {e}")
+                            continue
+                        signals.append(signal)
+                        self._set_cooldown(rule, symbol, timeframe)
+                        self.stats["signals"] += 1
 
-                    # 更新缓存
-                    self.baseline[cache_key] = curr_row
+                        logger.info(f"信号触发: {symbol} {rule.direction} - {rule.name} ({timeframe})")
+
+                        # 保存到历史记录（后写）
+                        try:
+                            get_history().record(signal, source="sqlite")
+                        except Exception as he:
+                            logger.warning(f"保存历史记录失败: {he}")
+
+        # 本轮的冷却与历史记录一次性提交
+        self._prune_cooldowns()
+        if signals:
+            self.flush()
 
         # 标记基线加载完成
         if not self.baseline_loaded:
@@ -283,6 +307,51 @@ class SignalEngine:
 
         return signals
 
+    def _build_signal(self, rule: SignalRule, symbol: str, timeframe: str,
+                      prev_row: Optional[Dict], curr_row: Dict) -> Signal:
+        """组装信号：完整上下文取自共享快照，prev 取自基线"""
+        curr_all = self._get_symbol_all_tables(symbol, timeframe)
+        prev_all = {}
+        for t in RULES_BY_TABLE.keys():
+            pk = f"{t}_{symbol}_{timeframe}"
+            if pk in self.baseline:
+                prev_all[t] = self.baseline[pk]
+        # 当前表已写入本轮基线，prev 以比对前的行为准
+        if prev_row is not None:
+            prev_all[rule.table] = prev_row
+        else:
+            prev_all.pop(rule.table, None)
+
+        # 格式化消息
+        rule_msg = rule.format_message(prev_row, curr_row)
+        price = curr_row.get("当前价格") or curr_row.get("价格") or curr_row.get("收盘价") or 0
+
+        full_msg = self.formatter.format_signal(
+            symbol=symbol,
+            direction=rule.direction,
+            rule_name=rule.name,
+            timeframe=timeframe,
+            strength=rule.strength,
+            curr_data=curr_all,
+            prev_data=prev_all,
+            rule_message=rule_msg
+        )
+
+        return Signal(
+            symbol=symbol,
+            direction=rule.direction,
+            strength=rule.strength,
+            rule_name=rule.name,
+            timeframe=timeframe,
+            price=price,
+            message=rule_msg,
+            full_message=full_msg,
+            category=rule.category,
+            subcategory=rule.subcategory,
+            priority=rule.priority,
+            table=rule.table
+        )
+
     def notify(self, signals: List[Signal]):
         """通知回调"""
         for signal in signals:
@@ -319,6 +388,7 @@ class SignalEngine:
             **self.stats,
             "baseline_size": len(self.baseline),
             "cooldown_size": len(self.cooldown),
+            "cooldown_pending": self._cooldown_log.pending,
             "enabled_rules": len(self.enabled_rules),
             "total_rules": len(ALL_RULES),
         }
@@ -11,6 +11,8 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from contextlib import contextmanager
 
+from .write_behind import WriteBehindLog
+
 logger = logging.getLogger(__name__)
 
 # 数据库路径（支持环境变量配置）
@@ -26,6 +28,19 @@ def _get_db_path() -> str:
 _MAX_RETENTION_DAYS = int(os.environ.get("SIGNAL_HISTORY_RETENTION_DAYS", "30"))
 
 
+_COLUMNS = ("timestamp", "symbol", "signal_type", "direction", "strength",
+            "message", "timeframe", "price", "source", "extra")
+_INSERT_SQL = f"""
+    INSERT INTO signal_history ({", ".join(_COLUMNS)})
+    VALUES ({", ".join("?" * len(_COLUMNS))})
+"""
+
+
+def _apply_rows(conn: sqlite3.Connection, rows: List[list]):
+    """后写队列回放：批量插入"""
+    conn.executemany(_INSERT_SQL, rows)
+
+
 def _init_db(db_path: str):
     """初始化历史数据库"""
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
@@ -67,6 +82,7 @@ class SignalHistory:
         self.db_path = db_path or _get_db_path()
         self._lock = threading.Lock()
         self._initialized = False
+        self._log: Optional[WriteBehindLog] = None
         self._ensure_initialized()
     
     def _ensure_initialized(self):
@@ -75,6 +91,8 @@ class SignalHistory:
             with self._lock:
                 if not self._initialized:
                     _init_db(self.db_path)
+                    # 启动即重放上次未落盘的记录
+                    self._log = WriteBehindLog(self.db_path, "signal_history", _apply_rows)
                     self._initialized = True
     
     @contextmanager
@@ -92,51 +110,46 @@ class SignalHistory:
                 except Exception:
                     pass
     
+    @staticmethod
+    def _row(signal, source: str) -> list:
+        """信号对象 → signal_history 行（按列顺序）"""
+        # 处理不同类型的信号对象
+        if hasattr(signal, 'signal_type'):
+            # PGSignal
+            data = {
+                "timestamp": signal.timestamp.isoformat(),
+                "symbol": signal.symbol,
+                "signal_type": signal.signal_type,
+                "direction": signal.direction,
+                "strength": signal.strength,
+                "message": signal.message,
+                "timeframe": getattr(signal, 'timeframe', '5m'),
+                "price": getattr(signal, 'price', 0),
+                "source": source,
+                "extra": str(getattr(signal, 'extra', {})),
+            }
+        else:
+            # SQLite Signal
+            data = {
+                "timestamp": signal.timestamp.isoformat() if hasattr(signal, 'timestamp') else datetime.now().isoformat(),
+                "symbol": signal.symbol,
+                "signal_type": signal.rule_name,
+                "direction": signal.direction,
+                "strength": signal.strength,
+                "message": signal.message,
+                "timeframe": getattr(signal, 'timeframe', '1h'),
+                "price": getattr(signal, 'price', 0),
+                "source": source,
+                "extra": "",
+            }
+        return [data[c] for c in _COLUMNS]
+
     def save(self, signal, source: str = "sqlite", max_retries: int = 2) -> int:
-        """保存信号到历史记录（带重试）"""
+        """保存信号到历史记录（同步写入，带重试）"""
         for attempt in range(max_retries + 1):
             try:
                 with self._get_conn() as conn:
-                    # 处理不同类型的信号对象
-                    if hasattr(signal, 'signal_type'):
-                        # PGSignal
-                        data = {
-                            "timestamp": signal.timestamp.isoformat(),
-                            "symbol": signal.symbol,
-                            "signal_type": signal.signal_type,
-                            "direction": signal.direction,
-                            "strength": signal.strength,
-                            "message": signal.message,
-                            "timeframe": getattr(signal, 'timeframe', '5m'),
-                            "price": getattr(signal, 'price', 0),
-                            "source": source,
-                            "extra": str(getattr(signal, 'extra', {})),
-                        }
-                    else:
-                        # SQLite Signal
-                        data = {
-                            "timestamp": signal.timestamp.isoformat() if hasattr(signal, 'timestamp') else datetime.now().isoformat(),
-                            "symbol": signal.symbol,
-                            "signal_type": signal.rule_name,
-                            "direction": signal.direction,
-                            "strength": signal.strength,
-                            "message": signal.message,
-                            "timeframe": getattr(signal, 'timeframe', '1h'),
-                            "price": getattr(signal, 'price', 0),
-                            "source": source,
-                            "extra": "",
-                        }
-                    
-                    cursor = conn.execute("""
-                        INSERT INTO signal_history 
-                        (timestamp, symbol, signal_type, direction, strength, message, timeframe, price, source, extra)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        data["timestamp"], data["symbol"], data["signal_type"],
-                        data["direction"], data["strength"], data["message"],
-                        data["timeframe"], data["price"], data["source"], data["extra"]
-                    ))
-                    
+                    cursor = conn.execute(_INSERT_SQL, self._row(signal, source))
                     conn.commit()
                     return cursor.lastrowid
             except sqlite3.OperationalError as e:
@@ -151,9 +164,18 @@ class SignalHistory:
                 logger.error(f"保存信号历史失败: {e}")
                 return -1
         return -1
-    
+
+    def record(self, signal, source: str = "sqlite"):
+        """后写：只入队，由 flush() 与同轮其他信号合并为一个事务写入"""
+        self._log.put(self._row(signal, source))
+
+    def flush(self, wait: bool = False):
+        """提交已入队的历史记录"""
+        self._log.flush(wait=wait)
+
     def get_recent(self, limit: int = 20, symbol: str = None, direction: str = None) -> List[Dict]:
         """获取最近的信号记录"""
+        self.flush(wait=True)
         try:
             with self._get_conn() as conn:
                 query = "SELECT * FROM signal_history WHERE 1=1"
@@ -178,6 +200,7 @@ class SignalHistory:
     
     def get_by_symbol(self, symbol: str, days: int = 7, limit: int = 50) -> List[Dict]:
         """获取指定币种的信号历史"""
+        self.flush(wait=True)
         try:
             with self._get_conn() as conn:
                 since = (datetime.now() - timedelta(days=days)).isoformat()
@@ -196,6 +219,7 @@ class SignalHistory:
     
     def get_stats(self, days: int = 7) -> Dict:
         """获取信号统计"""
+        self.flush(wait=True)
         try:
             with self._get_conn() as conn:
                 since = (datetime.now() - timedelta(days=days)).isoformat()
@@ -3,7 +3,9 @@
 直接从 PostgreSQL 读取 candles_1m 和 binance_futures_metrics_5m 数据
 """
 import os
+import json
 import logging
+import select
 import threading
 import time
 from datetime import datetime, timedelta
@@ -369,6 +371,60 @@ def _get_default_symbols() -> List[str]:
     return ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT"]
 
 
+# 只查最近几个桶：按 (symbol, 时间) 索引定位，不扫描整个超表
+_CANDLE_LOOKBACK_MINUTES = int(os.environ.get("PG_SIGNAL_CANDLE_LOOKBACK_MINUTES", "10"))
+_METRIC_LOOKBACK_MINUTES = int(os.environ.get("PG_SIGNAL_METRIC_LOOKBACK_MINUTES", "30"))
+# candles_1m 主键为 (exchange, symbol, bucket_ts)，带上 exchange 才能走主键
+_CANDLE_EXCHANGE = os.environ.get("PG_SIGNAL_EXCHANGE", "binance_futures_um")
+
+_CANDLE_COLUMNS = (
+    "symbol", "bucket_ts", "open", "high", "low", "close", "volume",
+    "quote_volume", "trade_count", "taker_buy_volume", "taker_buy_quote_volume",
+)
+_METRIC_COLUMNS = (
+    "symbol", "create_time", "sum_open_interest", "sum_open_interest_value",
+    "count_toptrader_long_short_ratio", "sum_toptrader_long_short_ratio",
+    "count_long_short_ratio", "sum_taker_long_short_vol_ratio",
+)
+
+# 每个币种取时间窗口内最新两行（当前 + 前一个桶），一次往返；
+# 时间下界让超表只扫描最近的分块
+_CANDLES_QUERY = f"""
+    SELECT s.symbol, {", ".join("c." + c for c in _CANDLE_COLUMNS[1:])}
+    FROM unnest(%s::text[]) AS s(symbol)
+    CROSS JOIN LATERAL (
+        SELECT {", ".join(_CANDLE_COLUMNS[1:])}
+        FROM market_data.candles_1m
+        WHERE exchange = %s AND symbol = s.symbol
+          AND bucket_ts >= NOW() - make_interval(mins => %s)
+        ORDER BY bucket_ts DESC
+        LIMIT 2
+    ) c
+    ORDER BY s.symbol, c.bucket_ts DESC
+"""
+
+# create_time 为 UTC 无时区时间
+_METRICS_QUERY = f"""
+    SELECT s.symbol, {", ".join("m." + c for c in _METRIC_COLUMNS[1:])}
+    FROM unnest(%s::text[]) AS s(symbol)
+    CROSS JOIN LATERAL (
+        SELECT {", ".join(_METRIC_COLUMNS[1:])}
+        FROM market_data.binance_futures_metrics_5m
+        WHERE symbol = s.symbol
+          AND create_time >= (NOW() AT TIME ZONE 'UTC') - make_interval(mins => %s)
+        ORDER BY create_time DESC
+        LIMIT 2
+    ) m
+    ORDER BY s.symbol, m.create_time DESC
+"""
+
+# 采集水位通知：源表推进后立即唤醒检查（间隔仍作为最长等待）
+_LISTEN_ENABLED = os.environ.get("PG_SIGNAL_LISTEN", "1").lower() in ("1", "true", "yes")
+_NOTIFY_CHANNEL = "ingest_watermark"
+_NOTIFY_TABLES = {"candles_1m", "binance_futures_metrics_5m"}
+_MIN_CHECK_INTERVAL = float(os.environ.get("PG_SIGNAL_MIN_INTERVAL", "5"))
+
+
 class PGSignalEngine:
     """基于 TimescaleDB 的信号检测引擎"""
     
@@ -384,7 +440,8 @@ class PGSignalEngine:
         self.cooldowns: Dict[str, float] = {}
         self.cooldown_seconds = 300
         self._conn = None
-        self.stats = {"checks": 0, "signals": 0, "errors": 0}
+        self._listen_conn = None
+        self.stats = {"checks": 0, "signals": 0, "errors": 0, "wakeups": 0}
     
     def _get_conn(self):
         """获取数据库连接"""
@@ -392,6 +449,8 @@ class PGSignalEngine:
             try:
                 import psycopg2
                 self._conn = psycopg2.connect(self.db_url)
+                # 只读查询：不保持事务，NOW() 取每次查询的时间
+                self._conn.autocommit = True
             except ImportError:
                 logger.error("psycopg2 not installed, run: pip install psycopg2-binary")
                 return None
@@ -413,89 +472,40 @@ class PGSignalEngine:
         """设置冷却"""
         self.cooldowns[signal_key] = time.time()
     
-    def _fetch_latest_candles(self) -> Dict[str, Dict]:
-        """获取最新K线数据"""
-        conn = self._get_conn()
-        if not conn:
-            return {}
-        
-        result = {}
-        try:
-            # 参数化查询防止SQL注入
-            query = """
-                WITH ranked AS (
-                    SELECT symbol, bucket_ts, open, high, low, close, volume, 
-                           quote_volume, trade_count, taker_buy_volume, taker_buy_quote_volume,
-                           ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY bucket_ts DESC) as rn
-                    FROM market_data.candles_1m
-                    WHERE symbol = ANY(%s)
-                )
-                SELECT symbol, bucket_ts, open, high, low, close, volume, 
-                       quote_volume, trade_count, taker_buy_volume, taker_buy_quote_volume
-                FROM ranked WHERE rn = 1
-            """
-            with conn.cursor() as cur:
-                cur.execute(query, (self.symbols,))
-                for row in cur.fetchall():
-                    result[row[0]] = {
-                        "symbol": row[0],
-                        "bucket_ts": row[1],
-                        "open": row[2],
-                        "high": row[3],
-                        "low": row[4],
-                        "close": row[5],
-                        "volume": row[6],
-                        "quote_volume": row[7],
-                        "trade_count": row[8],
-                        "taker_buy_volume": row[9],
-                        "taker_buy_quote_volume": row[10],
-                    }
-        except Exception as e:
-            logger.error(f"Fetch candles error: {e}")
-            self.stats["errors"] += 1
-        return result
-    
-    def _fetch_latest_metrics(self) -> Dict[str, Dict]:
-        """获取最新期货指标数据"""
+    def _fetch_pairs(self, query: str, columns: tuple, params: tuple) -> Dict[str, tuple]:
+        """每个币种最近两行 → {symbol: (curr, prev)}，prev 可能为 None"""
         conn = self._get_conn()
         if not conn:
             return {}
-        
+
         result = {}
         try:
             # 参数化查询防止SQL注入
-            query = """
-                WITH ranked AS (
-                    SELECT symbol, create_time, sum_open_interest, sum_open_interest_value,
-                           count_toptrader_long_short_ratio, sum_toptrader_long_short_ratio,
-                           count_long_short_ratio, sum_taker_long_short_vol_ratio,
-                           ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY create_time DESC) as rn
-                    FROM market_data.binance_futures_metrics_5m
-                    WHERE symbol = ANY(%s)
-                )
-                SELECT symbol, create_time, sum_open_interest, sum_open_interest_value,
-                       count_toptrader_long_short_ratio, sum_toptrader_long_short_ratio,
-                       count_long_short_ratio, sum_taker_long_short_vol_ratio
-                FROM ranked WHERE rn = 1
-            """
             with conn.cursor() as cur:
-                cur.execute(query, (self.symbols,))
+                cur.execute(query, (self.symbols, *params))
                 for row in cur.fetchall():
-                    result[row[0]] = {
-                        "symbol": row[0],
-                        "create_time": row[1],
-                        "sum_open_interest": row[2],
-                        "sum_open_interest_value": row[3],
-                        "count_toptrader_long_short_ratio": row[4],
-                        "sum_toptrader_long_short_ratio": row[5],
-                        "count_long_short_ratio": row[6],
-                        "sum_taker_long_short_vol_ratio": row[7],
-                    }
+                    data = dict(zip(columns, row))
+                    curr, prev = result.get(row[0], (None, None))
+                    # 每个币种按时间倒序返回：第一行为当前，第二行为前一个桶
+                    result[row[0]] = (data, None) if curr is None else (curr, data)
         except Exception as e:
-            logger.error(f"Fetch metrics error: {e}")
+            logger.error(f"Fetch {columns[1]} rows error: {e}")
             self.stats["errors"] += 1
+            try:
+                conn.close()
+            except Exception:
+                pass
+            self._conn = None
         return result
-    
+
+    def _fetch_latest_candles(self) -> Dict[str, tuple]:
+        """获取最新两根K线 {symbol: (curr, prev)}"""
+        return self._fetch_pairs(_CANDLES_QUERY, _CANDLE_COLUMNS, (_CANDLE_EXCHANGE, _CANDLE_LOOKBACK_MINUTES))
+
+    def _fetch_latest_metrics(self) -> Dict[str, tuple]:
+        """获取最新两条期货指标 {symbol: (curr, prev)}"""
+        return self._fetch_pairs(_METRICS_QUERY, _METRIC_COLUMNS, (_METRIC_LOOKBACK_MINUTES,))
+
     def check_signals(self) -> List[PGSignal]:
         """检查所有信号"""
         signals = []
@@ -507,23 +517,32 @@ class PGSignalEngine:
         rules = PGSignalRules(lang=self.lang)
         
         for symbol in self.symbols:
-            curr_candle = candles.get(symbol)
-            prev_candle = self.baseline_candles.get(symbol)
-            curr_metric = metrics.get(symbol)
-            prev_metric = self.baseline_metrics.get(symbol)
+            curr_candle, prev_candle = candles.get(symbol, (None, None))
+            curr_metric, prev_metric = metrics.get(symbol, (None, None))
             
             if not curr_candle:
                 continue
             
-            checkers = [
-                (rules.check_price_surge, [curr_candle, prev_candle, 2.0]),
-                (rules.check_price_dump, [curr_candle, prev_candle, 2.0]),
-                (rules.check_volume_spike, [curr_candle, prev_candle, 5.0]),
-                (rules.check_taker_buy_dominance, [curr_candle, 0.7]),
-                (rules.check_taker_sell_dominance, [curr_candle, 0.7]),
-            ]
+            # 首轮只建立基线；之后只检查有新数据的部分（同一行不重复检查）
+            seen_candle = self.baseline_candles.get(symbol)
+            seen_metric = self.baseline_metrics.get(symbol)
+            candle_changed = seen_candle is not None and curr_candle != seen_candle
+            metric_changed = seen_metric is not None and curr_metric is not None and curr_metric != seen_metric
+            # 库中无前一个桶时退回上轮看到的数据
+            prev_candle = prev_candle or seen_candle
+            prev_metric = prev_metric or seen_metric
             
-            if curr_metric:
+            checkers = []
+            if candle_changed:
+                checkers.extend([
+                    (rules.check_price_surge, [curr_candle, prev_candle, 2.0]),
+                    (rules.check_price_dump, [curr_candle, prev_candle, 2.0]),
+                    (rules.check_volume_spike, [curr_candle, prev_candle, 5.0]),
+                    (rules.check_taker_buy_dominance, [curr_candle, 0.7]),
+                    (rules.check_taker_sell_dominance, [curr_candle, 0.7]),
+                ])
+            
+            if metric_changed:
                 checkers.extend([
                     (rules.check_oi_surge, [curr_metric, prev_metric, 3.0]),
                     (rules.check_oi_dump, [curr_metric, prev_metric, 3.0]),
@@ -546,7 +565,7 @@ class PGSignalEngine:
                             # 保存到历史记录
                             try:
                                 from .history import get_history
-                                get_history().save(signal, source="pg")
+                                get_history().record(signal, source="pg")
                             except Exception as he:
                                 logger.warning(f"Save history error: {he}")
                 except Exception as e:
@@ -556,6 +575,11 @@ class PGSignalEngine:
             self.baseline_candles[symbol] = curr_candle
             if curr_metric:
                 self.baseline_metrics[symbol] = curr_metric
+
+        # 本轮历史记录一次性提交
+        if signals:
+            from .history import get_history
+            get_history().flush()
         
         return signals
     
@@ -579,17 +603,77 @@ class PGSignalEngine:
             self.notify(signals)
         return signals
     
-    def run_loop(self, interval: int = 60):
-        """持续运行"""
-        logger.info(f"PG Signal Engine started, interval: {interval}s, symbols: {self.symbols}")
+    def _get_listen_conn(self):
+        """LISTEN 专用连接（autocommit）"""
+        if self._listen_conn is None or self._listen_conn.closed:
+            import psycopg2
+            conn = psycopg2.connect(self.db_url)
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {_NOTIFY_CHANNEL}")
+            self._listen_conn = conn
+            logger.info(f"PG signal engine listening on {_NOTIFY_CHANNEL}")
+        return self._listen_conn
+
+    def _wait_for_data(self, timeout: float) -> bool:
+        """等待源表水位推进通知，最长 timeout 秒；返回是否由通知唤醒"""
+        deadline = time.monotonic() + timeout
+        try:
+            conn = self._get_listen_conn()
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                if not select.select([conn], [], [], remaining)[0]:
+                    return False
+                conn.poll()
+                hit = False
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        hit = hit or json.loads(notify.payload).get("table") in _NOTIFY_TABLES
+                    except (ValueError, AttributeError):
+                        continue
+                if hit:
+                    self.stats["wakeups"] += 1
+                    return True
+        except Exception as e:
+            logger.warning(f"LISTEN {_NOTIFY_CHANNEL} failed, falling back to polling: {e}")
+            try:
+                if self._listen_conn is not None:
+                    self._listen_conn.close()
+            except Exception:
+                pass
+            self._listen_conn = None
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            return False
+
+    def run_loop(self, interval: int = 60, listen: Optional[bool] = None):
+        """持续运行
+
+        listen=True（默认取 PG_SIGNAL_LISTEN）时，源表水位推进即触发检查，
+        interval 为无通知时的最长间隔；两次检查至少间隔 PG_SIGNAL_MIN_INTERVAL 秒。
+        """
+        listen = _LISTEN_ENABLED if listen is None else listen
+        logger.info(f"PG Signal Engine started, interval: {interval}s, listen: {listen}, symbols: {self.symbols}")
         while True:
+            started = time.monotonic()
             try:
                 signals = self.run_once()
                 if signals:
                     logger.info(f"Found {len(signals)} PG signals")
             except Exception as e:
                 logger.error(f"Run loop error: {e}")
-            time.sleep(interval)
+            if not listen:
+                time.sleep(interval)
+                continue
+            self._wait_for_data(interval - (time.monotonic() - started))
+            # 通知密集时限制检查频率
+            rest = _MIN_CHECK_INTERVAL - (time.monotonic() - started)
+            if rest > 0:
+                time.sleep(rest)
     
     def get_stats(self) -> Dict:
         """获取统计"""
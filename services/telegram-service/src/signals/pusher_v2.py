@@ -1,40 +1,124 @@
 """
 信号推送服务 v2
 支持多用户订阅过滤、跳转键盘
+
+- 订阅索引常驻内存（表 → 用户），推送时不读 SQLite
+- 单个长期运行的投递队列，并发受全局速率与单聊天间隔双重限制
+- 同一用户短窗口内的多条信号合并为一条摘要消息
 """
 import asyncio
 import logging
+import os
 import threading
-from typing import Optional, List, Callable
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from telegram import InlineKeyboardMarkup
 
 from .engine_v2 import Signal, get_engine
-from .ui import is_table_enabled, get_signal_push_kb, SUBS_DB_PATH
+from .rules import ALL_RULES
+from .ui import get_signal_push_kb, subscribers_for
 
 logger = logging.getLogger(__name__)
 
+# Telegram 限制：全局约 30 条/秒，同一聊天约 1 条/秒
+PUSH_CONCURRENCY = int(os.environ.get("SIGNAL_PUSH_CONCURRENCY", "8"))
+PUSH_GLOBAL_RATE = float(os.environ.get("SIGNAL_PUSH_GLOBAL_RATE", "25"))
+PUSH_CHAT_INTERVAL = float(os.environ.get("SIGNAL_PUSH_CHAT_INTERVAL", "1.0"))
+# 摘要合并窗口（秒）：窗口内同一用户的多条信号合并发送
+DIGEST_WINDOW = float(os.environ.get("SIGNAL_DIGEST_WINDOW", "3"))
+PUSH_QUEUE_MAX = int(os.environ.get("SIGNAL_PUSH_QUEUE_MAX", "5000"))
+
+_MAX_TEXT = 4096
+_DIGEST_SEP = "\n\n━━━━━━━━━━━━\n\n"
+_DIGEST_KB_SYMBOLS = 4
+_MAX_RETRIES = 2
+
+# 规则名 → 表名（Signal 未携带 table 时兜底）
+_RULE_TABLE: Dict[str, str] = {}
+for _rule in ALL_RULES:
+    _RULE_TABLE.setdefault(_rule.name, _rule.table)
+
+Delivery = Tuple[int, str, Optional[InlineKeyboardMarkup]]
+
+
+def _truncate(text: str, limit: int = _MAX_TEXT) -> str:
+    return text if len(text) <= limit else text[:limit - 6] + "\n..."
+
 
 class SignalPusher:
     """信号推送器 - 支持多用户订阅"""
 
-    def __init__(self, send_func: Callable):
+    def __init__(
+        self,
+        send_func: Callable,
+        *,
+        concurrency: int = PUSH_CONCURRENCY,
+        global_rate: float = PUSH_GLOBAL_RATE,
+        chat_interval: float = PUSH_CHAT_INTERVAL,
+        digest_window: float = DIGEST_WINDOW,
+        queue_max: int = PUSH_QUEUE_MAX,
+    ):
         """
         Args:
-            send_func: 异步发送函数 async def send(user_id, text, reply_markup)
+            send_func: 异步发送函数 async def send(user_id, text, reply_markup)，
+                       异常会被捕获；带 retry_after 的异常（429）按提示等待后重试
         """
         self.send_func = send_func
-        self._subscribers: List[int] = []  # 订阅用户列表
-
-    def _get_subscribers(self) -> List[int]:
-        """获取所有订阅用户"""
-        import sqlite3
-        try:
-            conn = sqlite3.connect(SUBS_DB_PATH)
-            rows = conn.execute("SELECT user_id FROM signal_subs WHERE enabled = 1").fetchall()
-            conn.close()
-            return [r[0] for r in rows]
-        except Exception:
-            return []
+        self.concurrency = max(1, concurrency)
+        self.global_interval = 1.0 / global_rate if global_rate > 0 else 0.0
+        self.chat_interval = chat_interval
+        self.digest_window = digest_window
+        self.queue_max = queue_max
 
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # 以下仅在投递循环内访问
+        self._pending: Dict[int, List[Tuple[Signal, Optional[str]]]] = {}
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        self._global_next = 0.0
+        self._chat_next: Dict[int, float] = {}
+        self.stats = {
+            "signals": 0, "queued": 0, "sent": 0, "digests": 0,
+            "failed": 0, "dropped": 0, "retries": 0,
+        }
+
+    # ==================== 事件循环 ====================
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> bool:
+        """绑定到发送函数所属的事件循环（应在首个信号提交前调用）"""
+        with self._start_lock:
+            if self._loop is not None:
+                if self._loop is not loop:
+                    logger.warning("信号推送器已在其他事件循环上运行，忽略绑定")
+                return self._loop is loop
+            self._loop = loop
+            loop.call_soon_threadsafe(self._start_workers)
+            return True
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                # 未绑定时使用独立的投递线程
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="signal-push", daemon=True)
+                self._thread.start()
+                self._loop = loop
+                loop.call_soon_threadsafe(self._start_workers)
+        return self._loop
+
+    def _start_workers(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_max)
+        self._workers = [
+            asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)
+        ]
+        logger.info(f"信号投递队列已启动，并发: {self.concurrency}")
+
+    # ==================== 提交与合并 ====================
     def _format_signal(self, signal: Signal) -> str:
         """格式化信号消息"""
         if signal.full_message:
@@ -52,66 +136,147 @@ class SignalPusher:
 
 💬 {signal.message}"""
 
-    async def push_async(self, signal: Signal):
-        """异步推送信号到所有订阅用户"""
-        subscribers = self._get_subscribers()
-        if not subscribers:
+    def submit(self, signal, text: Optional[str] = None) -> int:
+        """提交信号（线程安全、不阻塞），返回接收用户数
+
+        text 为已格式化的消息（如 PG 信号），为空时按 Signal 格式化。
+        """
+        self.stats["signals"] += 1
+        table = getattr(signal, "table", "") or _RULE_TABLE.get(getattr(signal, "rule_name", ""), "")
+        uids = subscribers_for(table)
+        if not uids:
             logger.debug("无订阅用户，跳过推送")
+            return 0
+        self._ensure_loop().call_soon_threadsafe(self._collect, signal, text, uids)
+        logger.info(f"信号入队: {signal.symbol} {signal.direction} - {table or '全部'} ({len(uids)}人)")
+        return len(uids)
+
+    def _collect(self, signal, text: Optional[str], uids):
+        loop = asyncio.get_running_loop()
+        for uid in uids:
+            self._pending.setdefault(uid, []).append((signal, text))
+            if uid not in self._timers:
+                self._timers[uid] = loop.call_later(self.digest_window, self._flush_user, uid)
+
+    def _flush_user(self, uid: int):
+        self._timers.pop(uid, None)
+        items = self._pending.pop(uid, None)
+        if not items:
             return
+        for text, kb in self._compose(items):
+            try:
+                self._queue.put_nowait((uid, text, kb))
+                self.stats["queued"] += 1
+            except asyncio.QueueFull:
+                self.stats["dropped"] += 1
+                logger.warning(f"推送队列已满，丢弃发给 {uid} 的消息")
+
+    def _compose(self, items: List[Tuple[Signal, Optional[str]]]) -> List[Delivery]:
+        """单条信号原样发送；多条合并为摘要（超长时按条切分）"""
+        if len(items) == 1:
+            signal, text = items[0]
+            return [(_truncate(text or self._format_signal(signal)), get_signal_push_kb(signal.symbol))]
+
+        self.stats["digests"] += 1
+        symbols = list(dict.fromkeys(s.symbol for s, _ in items))
+        rows = []
+        for symbol in symbols[:_DIGEST_KB_SYMBOLS]:
+            rows.extend(get_signal_push_kb(symbol).inline_keyboard)
+        names = "、".join(s.replace("USDT", "") for s in symbols[:5])
+        header = f"📬 {len(items)} 条信号 | {names}{' 等' if len(symbols) > 5 else ''}"
+
+        chunks: List[str] = []
+        parts, size = [header], len(header)
+        for signal, text in items:
+            body = _truncate(text or self._format_signal(signal), _MAX_TEXT - len(header) - len(_DIGEST_SEP))
+            if parts and size + len(_DIGEST_SEP) + len(body) > _MAX_TEXT:
+                chunks.append(_DIGEST_SEP.join(parts))
+                parts, size = [], -len(_DIGEST_SEP)
+            parts.append(body)
+            size += len(_DIGEST_SEP) + len(body)
+        chunks.append(_DIGEST_SEP.join(parts))
+
+        # 键盘放在最后一条
+        kb = InlineKeyboardMarkup(rows)
+        return [(chunk, kb if i == len(chunks) - 1 else None) for i, chunk in enumerate(chunks)]
+
+    # ==================== 投递 ====================
+    async def _throttle(self, uid: int):
+        """先按聊天间隔、再按全局速率预约发送时刻"""
+        now = time.monotonic()
+        chat_slot = max(now, self._chat_next.get(uid, 0.0))
+        self._chat_next[uid] = chat_slot + self.chat_interval
+        if chat_slot > now:
+            await asyncio.sleep(chat_slot - now)
 
-        text = self._format_signal(signal)
-        if len(text) > 4096:
-            text = text[:4090] + "\n..."
-
-        kb = get_signal_push_kb(signal.symbol)
-
-        # 获取信号对应的表名
-        from .engine_v2 import get_engine
-        get_engine()
-        # 从规则名找表名
-        table = None
-        from .rules import ALL_RULES
-        for rule in ALL_RULES:
-            if rule.name == signal.rule_name:
-                table = rule.table
-                break
-
-        pushed = 0
-        for uid in subscribers:
-            # 检查用户是否订阅了该表
-            if table and not is_table_enabled(uid, table):
-                continue
+        now = time.monotonic()
+        slot = max(now, self._global_next)
+        self._global_next = slot + self.global_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+        if len(self._chat_next) > 10000:
+            self._chat_next = {k: v for k, v in self._chat_next.items() if v > now}
+
+    async def _deliver(self, uid: int, text: str, kb: Optional[InlineKeyboardMarkup]):
+        for attempt in range(_MAX_RETRIES + 1):
+            await self._throttle(uid)
             try:
                 await self.send_func(uid, text, kb)
-                pushed += 1
+                self.stats["sent"] += 1
+                return
             except Exception as e:
-                logger.warning(f"推送给用户 {uid} 失败: {e}")
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after is None or attempt >= _MAX_RETRIES:
+                    self.stats["failed"] += 1
+                    logger.warning(f"推送给用户 {uid} 失败: {e}")
+                    return
+                delay = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+                # 429 时整体暂停，避免其他并发请求继续触发限流
+                self._global_next = max(self._global_next, time.monotonic() + delay)
+                self.stats["retries"] += 1
 
-        if pushed > 0:
-            logger.info(f"信号已推送: {signal.symbol} {signal.direction} - {signal.rule_name} ({pushed}人)")
+    async def _worker(self):
+        while True:
+            uid, text, kb = await self._queue.get()
+            try:
+                await self._deliver(uid, text, kb)
+            except Exception as e:
+                logger.error(f"投递异常: {e}")
+            finally:
+                self._queue.task_done()
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "pending_users": len(self._pending),
+            "queue_size": self._queue.qsize() if self._queue else 0,
+        }
 
 
 # 全局推送器
 _pusher: Optional[SignalPusher] = None
 
 
+def get_pusher() -> Optional[SignalPusher]:
+    return _pusher
+
+
 def init_pusher(send_func: Callable):
     """初始化推送器"""
     global _pusher
     _pusher = SignalPusher(send_func)
 
-    # 注册到引擎
+    # 注册到引擎（引擎线程中只做入队，不等待发送）
     engine = get_engine()
 
     def on_signal(signal: Signal):
         if _pusher:
-            # 在新线程中运行异步推送
-            loop = asyncio.new_event_loop()
-            loop.run_until_complete(_pusher.push_async(signal))
-            loop.close()
+            _pusher.submit(signal)
 
     engine.register_callback(on_signal)
     logger.info("信号推送器已初始化")
+    return _pusher
 
 
 def start_signal_loop(interval: int = 60):
@@ -2,7 +2,7 @@
 信号规则汇总
 导出所有规则列表
 """
-from .base import SignalRule, ConditionType
+from .base import COLUMNAR_TYPES, SignalRule, ConditionType, evaluate_columnar
 from .momentum import MOMENTUM_RULES
 from .trend import TREND_RULES
 from .volatility import VOLATILITY_RULES
@@ -50,6 +50,8 @@ TABLE_COUNT = len(RULES_BY_TABLE)
 __all__ = [
     "SignalRule",
     "ConditionType",
+    "COLUMNAR_TYPES",
+    "evaluate_columnar",
     "ALL_RULES",
     "RULES_BY_CATEGORY",
     "RULES_BY_TABLE",
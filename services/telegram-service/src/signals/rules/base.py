@@ -2,9 +2,10 @@
 信号规则基础定义
 """
 import logging
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -157,3 +158,103 @@ class SignalRule:
         except Exception as e:
             logger.warning(f"消息格式化异常 {self.name}: {e}")
             return self.message_template
+
+
+# 可按列批量求值的条件类型
+COLUMNAR_TYPES = {
+    ConditionType.STATE_CHANGE,
+    ConditionType.THRESHOLD_CROSS_UP,
+    ConditionType.THRESHOLD_CROSS_DOWN,
+}
+
+RowPair = Tuple[Optional[Dict], Dict]
+
+
+def _numeric(val: Any) -> Optional[float]:
+    """与 check_condition 一致：空值按 0，非数值/NaN 视为不可比较"""
+    val = val or 0
+    if isinstance(val, (int, float)) and val == val:
+        return val
+    return None
+
+
+class _Columns:
+    """一批 (prev, curr) 行按字段抽取的列，同一字段只构建一次"""
+
+    def __init__(self, pairs: Dict[str, RowPair]):
+        self.pairs = {sym: (prev, curr) for sym, (prev, curr) in pairs.items() if prev}
+        self._states: Dict[str, Tuple[Dict[str, Set[str]], Dict[str, Set[str]]]] = {}
+        self._sorted: Dict[str, Tuple[List[float], List[str], List[float], List[str]]] = {}
+
+    def states(self, fld: str) -> Tuple[Dict[str, Set[str]], Dict[str, Set[str]]]:
+        """字段取值 → 币种集合（prev, curr 各一份）"""
+        if fld not in self._states:
+            prev_idx: Dict[str, Set[str]] = {}
+            curr_idx: Dict[str, Set[str]] = {}
+            for sym, (prev, curr) in self.pairs.items():
+                prev_idx.setdefault(str(prev.get(fld, "")), set()).add(sym)
+                curr_idx.setdefault(str(curr.get(fld, "")), set()).add(sym)
+            self._states[fld] = (prev_idx, curr_idx)
+        return self._states[fld]
+
+    def ordered(self, fld: str) -> Tuple[List[float], List[str], List[float], List[str]]:
+        """按数值排序的列 (prev 值, prev 币种, curr 值, curr 币种)，只含两侧都可比较的币种"""
+        if fld not in self._sorted:
+            prev_col: List[Tuple[float, str]] = []
+            curr_col: List[Tuple[float, str]] = []
+            for sym, (prev, curr) in self.pairs.items():
+                pv, cv = _numeric(prev.get(fld, 0)), _numeric(curr.get(fld, 0))
+                if pv is None or cv is None:
+                    continue
+                prev_col.append((pv, sym))
+                curr_col.append((cv, sym))
+            prev_col.sort()
+            curr_col.sort()
+            self._sorted[fld] = (
+                [v for v, _ in prev_col], [s for _, s in prev_col],
+                [v for v, _ in curr_col], [s for _, s in curr_col],
+            )
+        return self._sorted[fld]
+
+
+def evaluate_columnar(rules: List[SignalRule], pairs: Dict[str, RowPair]) -> List[Set[str]]:
+    """对整批币种按列求值 COLUMNAR_TYPES 规则，返回与 rules 顺序对应的触发币种集合
+
+    结果与逐行调用 check_condition 一致：STATE_CHANGE 用取值倒排索引求交集，
+    阈值穿越用排序列二分定位 prev/curr 两侧的币种再求交集。
+    """
+    cols = _Columns(pairs)
+    result: List[Set[str]] = []
+    for rule in rules:
+        hits: Set[str] = set()
+        cfg = rule.condition_config
+        ct = rule.condition_type
+        try:
+            if not rule.enabled or not cols.pairs:
+                pass
+            elif ct == ConditionType.STATE_CHANGE:
+                prev_idx, curr_idx = cols.states(cfg.get("field", ""))
+                to_syms = set().union(*(curr_idx.get(v, ()) for v in cfg.get("to_values", [])))
+                if to_syms:
+                    from_syms = set().union(*(prev_idx.get(v, ()) for v in cfg.get("from_values", [])))
+                    hits = to_syms & from_syms
+            elif ct in (ConditionType.THRESHOLD_CROSS_UP, ConditionType.THRESHOLD_CROSS_DOWN):
+                threshold = cfg.get("threshold", 0)
+                prev_vals, prev_syms, curr_vals, curr_syms = cols.ordered(cfg.get("field", ""))
+                if ct == ConditionType.THRESHOLD_CROSS_UP:
+                    # prev <= t < curr
+                    hits = set(curr_syms[bisect_right(curr_vals, threshold):])
+                    if hits:
+                        hits &= set(prev_syms[:bisect_right(prev_vals, threshold)])
+                else:
+                    # prev >= t > curr
+                    hits = set(curr_syms[:bisect_left(curr_vals, threshold)])
+                    if hits:
+                        hits &= set(prev_syms[bisect_left(prev_vals, threshold):])
+            else:
+                hits = {sym for sym, (prev, curr) in pairs.items() if rule.check_condition(prev, curr)}
+        except Exception as e:
+            logger.warning(f"规则检查异常 {rule.name}: {e}")
+            hits = set()
+        result.append(hits)
+    return result
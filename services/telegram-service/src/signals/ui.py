@@ -5,7 +5,8 @@ import os
 import json
 import sqlite3
 import logging
-from typing import Dict
+import threading
+from typing import Dict, FrozenSet, Set
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 from cards.i18n import btn as _btn, gettext as _t, resolve_lang
@@ -64,6 +65,11 @@ ALL_TABLES = list(RULES_BY_TABLE.keys())
 # 内存缓存
 _subs: Dict[int, Dict] = {}
 
+# 订阅索引：表 → 订阅且开启推送的用户（推送时直接查，不读 SQLite）
+_table_index: Dict[str, Set[int]] = {}
+_enabled_users: Set[int] = set()
+_index_lock = threading.Lock()
+
 
 def _init_db():
     """初始化订阅数据库"""
@@ -94,8 +100,39 @@ def _load_sub(uid: int) -> Dict:
     return None
 
 
+def _reindex(uid: int, sub: Dict):
+    """用户订阅变化后更新索引"""
+    with _index_lock:
+        for users in _table_index.values():
+            users.discard(uid)
+        _enabled_users.discard(uid)
+        if sub["enabled"]:
+            _enabled_users.add(uid)
+            for table in sub["tables"]:
+                _table_index.setdefault(table, set()).add(uid)
+
+
+def _load_all_subs():
+    """启动时载入全部订阅并建立索引"""
+    try:
+        conn = sqlite3.connect(SUBS_DB_PATH)
+        rows = conn.execute("SELECT user_id, enabled, tables FROM signal_subs").fetchall()
+        conn.close()
+    except Exception as e:
+        logger.warning(f"加载订阅失败: {e}")
+        return
+    for uid, enabled, tables in rows:
+        try:
+            table_set = set(json.loads(tables)) if tables else set(ALL_TABLES)
+        except ValueError:
+            table_set = set(ALL_TABLES)
+        _subs[uid] = {"enabled": bool(enabled), "tables": table_set}
+        _reindex(uid, _subs[uid])
+
+
 def _save_sub(uid: int, sub: Dict):
     """保存订阅到数据库"""
+    _reindex(uid, sub)
     try:
         conn = sqlite3.connect(SUBS_DB_PATH)
         conn.execute(
@@ -110,18 +147,21 @@ def _save_sub(uid: int, sub: Dict):
 
 # 初始化数据库
 _init_db()
+_load_all_subs()
 
 
 def _get_subscribers() -> list:
     """获取所有启用推送的用户ID列表"""
-    try:
-        conn = sqlite3.connect(SUBS_DB_PATH)
-        rows = conn.execute("SELECT user_id FROM signal_subs WHERE enabled = 1").fetchall()
-        conn.close()
-        return [r[0] for r in rows]
-    except Exception as e:
-        logger.warning(f"获取订阅用户失败: {e}")
-        return []
+    with _index_lock:
+        return list(_enabled_users)
+
+
+def subscribers_for(table: str) -> FrozenSet[int]:
+    """订阅了该表且开启推送的用户"""
+    with _index_lock:
+        if not table:
+            return frozenset(_enabled_users)
+        return frozenset(_table_index.get(table, ()))
 
 
 def get_sub(uid: int) -> Dict:
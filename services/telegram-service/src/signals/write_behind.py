@@ -0,0 +1,173 @@
+"""
+SQLite 后写队列 - 检测循环只写内存，后台线程每轮一次事务落盘
+
+- put() 只追加到内存队列和日志文件（<db>.journal，不 fsync），不打开数据库
+- flush() 唤醒后台线程：把积压记录放进一个事务写入，并记录已应用的序号
+- 启动时重放日志中序号大于已应用序号的记录（进程崩溃后不丢、不重复）
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 未显式 flush 时的兜底落盘间隔（秒）
+_FALLBACK_INTERVAL = float(os.environ.get("SIGNAL_WRITE_BEHIND_INTERVAL", "30"))
+
+ApplyFn = Callable[[sqlite3.Connection, List[Any]], None]
+
+
+class WriteBehindLog:
+    """单个 SQLite 库的后写队列（线程安全）"""
+
+    def __init__(self, db_path: str, name: str, apply: ApplyFn, interval: float = _FALLBACK_INTERVAL):
+        self.db_path = db_path
+        self.name = name
+        self.journal_path = db_path + ".journal"
+        self._apply = apply
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._pending: List[Tuple[int, Any]] = []
+        self._closed = False
+        self.stats = {"queued": 0, "batches": 0, "written": 0, "replayed": 0, "errors": 0}
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS write_behind_state (name TEXT PRIMARY KEY, seq INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+        self._applied = self._replay()
+        self._seq = self._applied
+        fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        self._journal = os.fdopen(fd, "a", encoding="utf-8")
+
+        self._thread = threading.Thread(target=self._run, name=f"write-behind-{name}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ==================== 重放 ====================
+    def _applied_seq(self) -> int:
+        row = self._conn.execute("SELECT seq FROM write_behind_state WHERE name = ?", (self.name,)).fetchone()
+        return row[0] if row else 0
+
+    def _replay(self) -> int:
+        """应用日志中尚未落库的记录，返回已应用序号"""
+        applied = self._applied_seq()
+        batch: List[Tuple[int, Any]] = []
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        seq, payload = json.loads(line)
+                    except ValueError:
+                        continue  # 崩溃时写了一半的行
+                    if seq > applied:
+                        batch.append((seq, payload))
+        except FileNotFoundError:
+            return applied
+        if batch:
+            self._commit(batch)
+            applied = batch[-1][0]
+            self.stats["replayed"] += len(batch)
+            logger.info(f"{self.name}: 重放未落盘记录 {len(batch)} 条")
+        open(self.journal_path, "w").close()
+        return applied
+
+    # ==================== 写入 ====================
+    def put(self, payload: Any) -> None:
+        """入队一条记录（payload 需可 JSON 序列化）"""
+        with self._lock:
+            self._seq += 1
+            self._pending.append((self._seq, payload))
+            try:
+                self._journal.write(json.dumps([self._seq, payload], ensure_ascii=False) + "\n")
+                self._journal.flush()
+            except (OSError, ValueError) as e:
+                logger.warning(f"{self.name}: 写日志失败: {e}")
+            self.stats["queued"] += 1
+
+    def flush(self, wait: bool = False, timeout: float = 5.0) -> bool:
+        """请求落盘；wait=True 时等待当前已入队的记录写入完成"""
+        with self._lock:
+            target = self._seq
+            if self._applied >= target:
+                return True
+        self._wake.set()
+        if not wait:
+            return True
+        with self._cond:
+            return self._cond.wait_for(lambda: self._applied >= target, timeout=timeout)
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _commit(self, batch: List[Tuple[int, Any]]) -> None:
+        conn = self._conn
+        try:
+            conn.execute("BEGIN")
+            self._apply(conn, [payload for _, payload in batch])
+            conn.execute(
+                "INSERT OR REPLACE INTO write_behind_state (name, seq) VALUES (?, ?)",
+                (self.name, batch[-1][0]),
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def _drain(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            self._commit(batch)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"{self.name}: 批量写入失败，下轮重试: {e}")
+            with self._lock:
+                self._pending[:0] = batch
+            return
+        with self._cond:
+            self._applied = batch[-1][0]
+            self.stats["batches"] += 1
+            self.stats["written"] += len(batch)
+            if not self._pending:
+                try:
+                    self._journal.truncate(0)
+                except (OSError, ValueError):
+                    pass
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            self._drain()
+
+    def close(self) -> None:
+        """写完剩余记录并停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self._drain()
+        with self._lock:
+            self._journal.close()
+            self._conn.close()
+
+
+__all__ = ["WriteBehindLog"]
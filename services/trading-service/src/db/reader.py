@@ -7,6 +7,7 @@
 3. 批量 SQL 查询（IN 子句）
 4. SQLite 连接复用 + WAL 模式
 5. 批量写入
+6. SQLite 交易对统一大写 + (周期, 数据时间, 交易对)/(交易对, 周期, 数据时间) 索引，读端最新批次与单币查询走索引
 """
 import sqlite3
 import threading
@@ -231,6 +232,18 @@ class DataReader:
             self._pool = None
 
 
+def _normalize_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """统一键列写法：交易对去空白转大写、周期去空白，读端可直接等值匹配"""
+    if "交易对" not in df.columns and "周期" not in df.columns:
+        return df
+    df = df.copy()
+    if "交易对" in df.columns:
+        df["交易对"] = df["交易对"].astype(str).str.strip().str.upper()
+    if "周期" in df.columns:
+        df["周期"] = df["周期"].astype(str).str.strip()
+    return df
+
+
 class DataWriter:
     """将指标结果写入 SQLite（优化版）"""
 
@@ -238,6 +251,7 @@ class DataWriter:
         self.sqlite_path = sqlite_path or config.sqlite_path
         self._conn = None
         self._lock = threading.Lock()
+        self._indexed: set = set()  # 本连接已确认建好索引的表
 
     def _get_conn(self) -> sqlite3.Connection:
         """获取或创建连接"""
@@ -250,10 +264,26 @@ class DataWriter:
             self._conn.execute("PRAGMA cache_size=10000")
         return self._conn
 
+    def _ensure_indexes(self, conn, table: str, cols: Sequence[str]):
+        """为含 交易对/周期/数据时间 的表建索引（每表每连接只执行一次）
+
+        - (周期, 数据时间, 交易对)：读端取最新批次 MAX(数据时间) 及整批读取
+        - (交易对, 周期, 数据时间)：单币查询、写入前去重删除、保留条数清理
+        建索引前将历史数据的交易对统一为大写。
+        """
+        if table in self._indexed:
+            return
+        if {"交易对", "周期", "数据时间"} <= set(cols):
+            conn.execute(f"UPDATE [{table}] SET 交易对 = upper(trim(交易对)) WHERE 交易对 != upper(trim(交易对))")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS [{table}:周期_数据时间_交易对] ON [{table}] (周期, 数据时间, 交易对)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS [{table}:交易对_周期_数据时间] ON [{table}] (交易对, 周期, 数据时间)")
+        self._indexed.add(table)
+
     def write(self, table: str, df: pd.DataFrame, interval: str = None):
         """写入单个表 - 批量 INSERT"""
         if df.empty:
             return
+        df = _normalize_keys(df)
 
         with self._lock:
             conn = self._get_conn()
@@ -271,6 +301,8 @@ class DataWriter:
                 conn.execute(f"DROP TABLE IF EXISTS [{table}]")
                 df.head(0).to_sql(table, conn, if_exists="replace", index=False)
                 existing_cols = df_cols
+                self._indexed.discard(table)
+            self._ensure_indexes(conn, table, df_cols)
 
             # 先删除同一 (交易对, 周期, 数据时间) 的旧数据
             if "交易对" in df_cols and "周期" in df_cols and "数据时间" in df_cols:
@@ -337,6 +369,7 @@ class DataWriter:
                 for table, df in data.items():
                     if df.empty:
                         continue
+                    df = _normalize_keys(df)
 
                     df_cols = list(df.columns)
 
@@ -349,6 +382,8 @@ class DataWriter:
                     if not existing_cols or set(df_cols) != set(existing_cols):
                         conn.execute(f"DROP TABLE IF EXISTS [{table}]")
                         df.head(0).to_sql(table, conn, if_exists="replace", index=False)
+                        self._indexed.discard(table)
+                    self._ensure_indexes(conn, table, df_cols)
 
                     # 批量 INSERT
                     placeholders = ",".join(["?"] * len(df_cols))
@@ -370,6 +405,7 @@ class DataWriter:
             if self._conn:
                 self._conn.close()
                 self._conn = None
+                self._indexed.clear()
 
 
 # 全局单例
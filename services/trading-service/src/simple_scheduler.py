@@ -15,7 +15,7 @@ import sqlite3
 import sys
 import time
 import atexit
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import psycopg
@@ -53,6 +53,15 @@ INDICATORS_ENABLED = [i.strip().lower() for i in os.environ.get("INDICATORS_ENAB
 INDICATORS_DISABLED = [i.strip().lower() for i in os.environ.get("INDICATORS_DISABLED", "").split(",") if i.strip()]
 
 last_computed = {i: None for i in INTERVALS}
+
+# 周期 → 桶宽（水位换算为最后一个已闭合桶的起点）
+INTERVAL_DELTAS = {
+    "1m": timedelta(minutes=1), "3m": timedelta(minutes=3), "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15), "30m": timedelta(minutes=30), "1h": timedelta(hours=1),
+    "2h": timedelta(hours=2), "4h": timedelta(hours=4), "6h": timedelta(hours=6),
+    "12h": timedelta(hours=12), "1d": timedelta(days=1), "1w": timedelta(weeks=1),
+}
+
 last_priority_update = None
 high_priority_symbols = []
 
@@ -211,12 +220,36 @@ def get_high_priority_symbols_fast(top_n: int = 30) -> set:
 # ============ 数据检查 ============
 
 def get_source_latest(interval: str) -> datetime:
-    """查询 TimescaleDB 该周期最新数据时间"""
+    """查询 TimescaleDB 该周期最新一根已闭合 K 线的 bucket_ts
+
+    返回值与指标库的 数据时间 同义（K 线桶的起点），check_need_calc 直接比较两者。
+    优先读取 data-service 发布的采集水位：closed_through 是最后一个已闭合桶的终点
+    （= 当前未闭合桶的起点），减去一个桶宽换算为桶起点；
+    水位落后超过一个周期（回补/手工导入写入了 K 线但未发布水位）时，与 MAX(bucket_ts) 取较新者；
+    水位表不存在、尚无记录或周期未知时回退到 MAX(bucket_ts)。
+    """
     table = f"candles_{interval}"
     try:
         with psycopg.connect(DB_URL, row_factory=dict_row) as conn:
+            delta = INTERVAL_DELTAS.get(interval)
+            watermark = None
+            if delta is not None:
+                try:
+                    row = conn.execute(
+                        "SELECT closed_through FROM market_data.ingest_watermarks WHERE table_name = %s",
+                        (table,),
+                    ).fetchone()
+                    if row:
+                        watermark = row["closed_through"] - delta
+                        if row["closed_through"] + delta > datetime.now(timezone.utc):
+                            return watermark
+                except psycopg.errors.UndefinedTable:
+                    conn.rollback()
             row = conn.execute(f"SELECT MAX(bucket_ts) as latest FROM market_data.{table}").fetchone()
-            return row["latest"] if row else None
+            latest = row["latest"] if row else None
+            if watermark is not None and (latest is None or watermark > latest):
+                return watermark
+            return latest
     except Exception as e:
         log(f"查询 {table} 最新时间失败: {e}")
         return None
@@ -239,7 +272,10 @@ def get_indicator_latest(interval: str) -> datetime:
 
 
 def check_need_calc() -> list:
-    """对比数据源和指标库，返回需要计算的周期"""
+    """对比数据源和指标库，返回需要计算的周期
+
+    两侧均为最新 K 线桶的起点：数据源出现比指标 数据时间 更新的已闭合桶时才计算。
+    """
     need_calc = []
 
     for interval in INTERVALS: